@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from kyra.bundle import BUNDLE_ALIGN, collect_files, write_bundles
+from kyra.timings import add_timing_arguments, instrument
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concatenate extracted assets into aligned bundles with a binary TOC for HTTP range reads")
+    parser.add_argument("root", help="Assets directory (e.g. public/assets)")
+    parser.add_argument("dst_dir", help="Output directory for <name>.kbnd")
+    parser.add_argument("--name", type=str, default="assets", help="Bundle base name")
+    parser.add_argument("--prefix", action="append", default=[], metavar="DIR", help="Only pack files under this directory (repeatable, e.g. intro)")
+    parser.add_argument("--max-size", type=int, default=None, metavar="BYTES", help="Start a new bundle file once this much data is packed")
+    parser.add_argument("--align", type=int, default=BUNDLE_ALIGN, help="Entry alignment in bytes")
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    with instrument(args, "asset_bundle"):
+        names = collect_files(root, args.prefix)
+        if not names:
+            parser.error(f"No files to pack in {root}")
+        paths = write_bundles(root, Path(args.dst_dir), args.name, names, args.max_size, args.align)
+    loose = sum((root / name).stat().st_size for name in names)
+    packed = sum(path.stat().st_size for path in paths)
+    print(f"Packed {len(names)} files ({loose} bytes) into {len(paths)} bundle(s), {packed} bytes: {', '.join(str(p) for p in paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from kyra.manifest import MANIFEST_NAME, build_manifest, write_manifest
+from kyra.timings import add_timing_arguments, instrument
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=f"Write content-hashed copies of every asset and {MANIFEST_NAME}")
+    parser.add_argument("root", help="Assets directory (e.g. public/assets)")
+    parser.add_argument("--keep-stale", action="store_true", help="Keep hashed copies that the new manifest no longer references")
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    with instrument(args, "asset_manifest"):
+        manifest = build_manifest(root, prune=not args.keep_stale)
+        path = write_manifest(root, manifest)
+    total = sum(entry["size"] for entry in manifest["assets"].values())
+    print(f"Wrote {path} ({len(manifest['assets'])} assets, {total} bytes, {manifest['removed']} stale copies removed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from kyra.report import build_report, compare, format_report
+from kyra.timings import add_timing_arguments, instrument
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Break down extracted asset sizes by class, scene and format, with transfer-size estimates")
+    parser.add_argument("root", help="Assets directory (e.g. public/assets)")
+    parser.add_argument("--source", action="append", default=[], metavar="DIR", help="Original CPS/MSC files (or unpacked PAKs) for source compression ratios (repeatable)")
+    parser.add_argument("--top", type=int, default=15, help="Largest files to list")
+    parser.add_argument("--rows", type=int, default=10, help="Rows per breakdown table")
+    parser.add_argument("--json", type=str, default=None, help="Write the full report to this JSON file")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against a previous --json report")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Allowed growth in percent vs the baseline")
+    parser.add_argument("--min-bytes", type=int, default=1024, help="Ignore classes smaller than this in both reports")
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        parser.error(f"Not a directory: {root}")
+    with instrument(args, "asset_report"):
+        report = build_report(root, [Path(s) for s in args.source], args.top)
+    print(format_report(report, args.rows))
+    if not report["brotli"]:
+        print("(brotli estimates need the optional brotli package)")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.json}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold, args.min_bytes)
+        if regressions:
+            print(f"Growth beyond {args.threshold:.0f}%:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No growth beyond {args.threshold:.0f}% vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from pathlib import Path
+
+from kyra.bundle import collect_files
+from kyra.serve import fetch_bundle, fetch_loose, format_log, make_server
+
+
+def bench(args: argparse.Namespace, root: Path) -> None:
+    # Cold loads of everything under --bench, first as loose files, then
+    # through range reads of the bundle; both against this server
+    server = make_server(root, args.host, 0, args.delay, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://{args.host}:{server.server_address[1]}"
+    log = server.request_log
+    names = collect_files(root, [args.bench])
+    loaded = {}
+    try:
+        for label, load in (
+            ("loose", lambda: fetch_loose(base, names, args.parallel)),
+            ("bundle", lambda: fetch_bundle(f"{base}/{args.bundle}", args.bench.strip("/") + "/", args.parallel))
+        ):
+            log.reset()
+            start = time.perf_counter()
+            files = load()
+            elapsed = time.perf_counter() - start
+            loaded[label] = files
+            missing = len(names) - len(files)
+            note = f", {missing} files missing" if missing else ""
+            print(f"{label:<7} {len(files)} files in {elapsed * 1000:.1f}ms: {format_log(log.stats())}{note}")
+    finally:
+        server.shutdown()
+    if any(loaded["bundle"].get(name) != data for name, data in loaded["loose"].items()):
+        raise SystemExit("Bundle contents differ from the loose files; rebuild it")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Static file server with HTTP range support and request logging (dev stand-in for a CDN)")
+    parser.add_argument("root", help="Directory to serve (e.g. public/assets)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0, metavar="MS", help="Simulated round-trip delay added to every request")
+    parser.add_argument("--quiet", action="store_true", help="No per-request log lines, only the summary")
+    parser.add_argument("--bench", type=str, default=None, metavar="DIR", help="Instead of serving, time a cold load of DIR loose vs. from --bundle")
+    parser.add_argument("--bundle", type=str, default="assets.kbnd", help="Bundle path relative to root for --bench")
+    parser.add_argument("--parallel", type=int, default=6, help="Concurrent requests in --bench (browsers use about 6 per host)")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if args.bench:
+        bench(args, root)
+        return
+    server = make_server(root, args.host, args.port, args.delay, args.quiet)
+    print(f"Serving {root} on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(format_log(server.request_log.stats()))
+
+
+if __name__ == "__main__":
+    main()
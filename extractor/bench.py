@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import struct
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from kyra import codecs, dat, emc, wsa
+from kyra.cps import encode_cps
+from kyra.output import IMAGE_FORMATS, encode_image_file
+from kyra.pak import parse_directory
+from kyra.palette import palette_from_bytes
+from kyra.synth import build_emc, build_scene_dat, build_wsa, synth_frames, synth_image, synth_mask, synth_palette
+
+# Decoded images kept for the writer benchmarks
+WRITER_SAMPLES = 300
+
+
+def load_backends() -> Dict[str, Dict[str, Callable]]:
+    backends = {
+        "python": {
+            "decode_frame1": codecs.decode_frame1,
+            "decode_frame3": codecs.decode_frame3,
+            "decode_frame4": codecs.decode_frame4,
+            "decode_frame_delta": codecs.decode_frame_delta
+        }
+    }
+    return backends
+
+
+def collect_files(game_dir: Path) -> Dict[str, bytes]:
+    files: Dict[str, bytes] = {}
+    for path in sorted(game_dir.iterdir()):
+        if not path.is_file():
+            continue
+        data = path.read_bytes()
+        if path.suffix.upper() == ".PAK":
+            entries = sorted(parse_directory(data), key=lambda e: e[1])
+            for i, (name, off) in enumerate(entries):
+                end = entries[i + 1][1] if i + 1 < len(entries) else len(data)
+                files.setdefault(name.upper(), data[off:end])
+        else:
+            files.setdefault(path.name.upper(), data)
+    return files
+
+
+def synthetic_files(seed: int, scenes: int, frames: int) -> Dict[str, bytes]:
+    rng = random.Random(seed)
+    files: Dict[str, bytes] = {}
+    for i in range(scenes):
+        image = synth_image(rng, 320, 200)
+        # One background per compression type so every codec gets work
+        comp_type = (4, 1, 3)[i % 3]
+        files[f"SCENE{i:02d}.CPS"] = encode_cps(image, comp_type)
+        files[f"SCENE{i:02d}.MSC"] = encode_cps(synth_mask(rng, 320, 144), 4)
+        files[f"SCENE{i:02d}.DAT"] = build_scene_dat(rng, 24, 8)
+        files[f"SCENE{i:02d}.EMC"] = build_emc(rng, 16, 6, loops=20)
+        files[f"SCENE{i:02d}.WSA"] = build_wsa(synth_frames(rng, 184, 128, frames), 184, 128)
+    files["PALETTE.COL"] = synth_palette(rng)
+    return files
+
+
+class Workload:
+    def __init__(self, files: Dict[str, bytes]) -> None:
+        # (comp_type, payload, size) for CPS/MSC images
+        self.images: List[tuple[int, bytes, int]] = []
+        # (frame_size, [decoded Format40 deltas]) per WSA
+        self.wsa: List[tuple[int, List[bytes]]] = []
+        self.emc: List[tuple[List[int], List[int]]] = []
+        self.dat: List[bytes] = []
+        # (width, height, indexed pixels) for the image writer benchmarks
+        self.frames: List[tuple[int, int, bytes]] = []
+        self.palette = palette_from_bytes(files["PALETTE.COL"]) if "PALETTE.COL" in files else None
+        for name, data in sorted(files.items()):
+            suffix = name.rsplit(".", 1)[-1]
+            try:
+                if suffix in ("CPS", "MSC"):
+                    self._add_image(data)
+                elif suffix == "WSA":
+                    self._add_wsa(data)
+                elif suffix == "EMC":
+                    self._add_emc(data)
+                elif suffix == "DAT":
+                    self.dat.append(data)
+            except (ValueError, struct.error, IndexError):
+                continue
+
+    def _add_image(self, data: bytes) -> None:
+        comp_type = data[2]
+        img_size = struct.unpack_from("<I", data, 4)[0]
+        pal_size = struct.unpack_from("<H", data, 8)[0]
+        payload = data[10 + pal_size:] + b"\x00" * 16
+        self.images.append((comp_type, payload, img_size))
+        if img_size % 320 == 0 and len(self.frames) < WRITER_SAMPLES:
+            self.frames.append((320, img_size // 320, bytes(codecs.decode_image(comp_type, payload, img_size))))
+
+    def _add_wsa(self, data: bytes) -> None:
+        parsed = wsa.parse_wsa(data, use_flags=False) or wsa.parse_wsa(data, use_flags=True)
+        if parsed is None:
+            return
+        num_frames, width, height, delta_size, _flags, offsets, frame_data, first_frame = parsed
+        deltas = []
+        frame = bytearray(width * height)
+        start = 0 if first_frame else 1
+        for i in range(start, num_frames):
+            if i == 0 or offsets[i]:
+                stream = frame_data[offsets[i]:]
+                # Frame deltas are Format80 too, so they feed decode_frame4 as well
+                self.images.append((4, stream, delta_size))
+                deltas.append(bytes(codecs.decode_frame4(stream, delta_size)))
+                codecs.decode_frame_delta(frame, deltas[-1], False)
+                if len(self.frames) < WRITER_SAMPLES:
+                    self.frames.append((width, height, bytes(frame)))
+        self.wsa.append((width * height, deltas))
+
+    def _add_emc(self, data: bytes) -> None:
+        chunks: Dict[str, bytes] = {}
+        pos = 12
+        while pos + 8 <= len(data):
+            tag = data[pos:pos + 4].decode("ascii", "replace")
+            size = struct.unpack_from(">I", data, pos + 4)[0]
+            chunks[tag] = data[pos + 8:pos + 8 + size]
+            pos += 8 + size + (size & 1)
+        if "ORDR" in chunks and "DATA" in chunks:
+            self.emc.append((emc.to_u16_list_be(chunks["DATA"]), emc.to_u16_list_be(chunks["ORDR"])))
+
+
+def bench_image(decode: Callable, comp_type: int, work: Workload) -> tuple[int, int]:
+    total = 0
+    count = 0
+    for ctype, payload, size in work.images:
+        if ctype != comp_type:
+            continue
+        if comp_type == 3:
+            decode(payload, size, False)
+        else:
+            decode(payload, size)
+        total += size
+        count += 1
+    return total, count
+
+
+def bench_delta(apply_delta: Callable, work: Workload) -> tuple[int, int]:
+    total = 0
+    count = 0
+    for frame_size, deltas in work.wsa:
+        frame = bytearray(frame_size)
+        for delta in deltas:
+            apply_delta(frame, delta, False)
+            total += frame_size
+            count += 1
+    return total, count
+
+
+def bench_emc(work: Workload) -> tuple[int, int]:
+    total = 0
+    steps = 0
+    for data, ordr in work.emc:
+        extractor = emc.EMCExtractor(data, ordr)
+        for fn_index, offset in enumerate(ordr):
+            if offset != 0xFFFF:
+                steps += extractor.run_function(fn_index)
+        total += len(data) * 2
+    return total, steps
+
+
+def bench_dat(work: Workload) -> tuple[int, int]:
+    total = 0
+    for data in work.dat:
+        dat.parse_scene_body(data)
+        total += len(data)
+    return total, len(work.dat)
+
+
+def bench_writer(fmt: str, work: Workload, sizes: Dict[str, int]) -> tuple[int, int]:
+    total = 0
+    out = 0
+    for width, height, pixels in work.frames:
+        out += len(encode_image_file(fmt, width, height, pixels, work.palette, 0))
+        total += width * height
+    sizes[fmt] = out
+    return total, len(work.frames)
+
+
+def writer_formats() -> List[str]:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return [name for name, fmt in IMAGE_FORMATS.items() if fmt.source == "raw"]
+    return list(IMAGE_FORMATS)
+
+
+def measure(fn: Callable[[], tuple[int, int]], repeat: int, memory: bool) -> Optional[dict]:
+    best = None
+    total = count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total, count = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    if count == 0:
+        return None
+    result = {
+        "seconds": best,
+        "bytes": total,
+        "items": count,
+        "mbPerSec": total / best / 1e6 if best else 0.0,
+        "itemsPerSec": count / best if best else 0.0
+    }
+    if memory:
+        tracemalloc.start()
+        fn()
+        result["peakKiB"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(work: Workload, backends: Dict[str, Dict[str, Callable]], repeat: int, memory: bool) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+
+    def record(name: str, unit: str, backend: str, fn: Callable[[], tuple[int, int]]) -> None:
+        result = measure(fn, repeat, memory)
+        if result is None:
+            return
+        result["unit"] = unit
+        results.setdefault(name, {})[backend] = result
+
+    for backend_name, backend in backends.items():
+        for comp_type, fn_name in ((1, "decode_frame1"), (3, "decode_frame3"), (4, "decode_frame4")):
+            if fn_name in backend:
+                record(fn_name, "images", backend_name, lambda f=backend[fn_name], c=comp_type: bench_image(f, c, work))
+        if "decode_frame_delta" in backend:
+            record("decode_frame_delta", "frames", backend_name, lambda f=backend["decode_frame_delta"]: bench_delta(f, work))
+    record("EMCExtractor.run_function", "steps", "python", lambda: bench_emc(work))
+    record("parse_scene_body", "files", "python", lambda: bench_dat(work))
+
+    sizes: Dict[str, int] = {}
+    for fmt in writer_formats():
+        record("write_image", "images", fmt, lambda f=fmt: bench_writer(f, work, sizes))
+        if fmt in results.get("write_image", {}):
+            results["write_image"][fmt]["outBytes"] = sizes[fmt]
+    return results
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    header = f"{'benchmark':<28} {'backend':<12} {'MB/s':>9} {'items/s':>12} {'unit':<7} {'peak KiB':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, by_backend in results.items():
+        for backend, r in by_backend.items():
+            peak = f"{r['peakKiB']:.0f}" if "peakKiB" in r else "-"
+            print(f"{name:<28} {backend:<12} {r['mbPerSec']:>9.2f} {r['itemsPerSec']:>12.1f} {r['unit']:<7} {peak:>9}")
+    writers = results.get("write_image", {})
+    if writers:
+        print()
+        print(f"{'writer':<12} {'out KiB':>10} {'ratio':>7} {'ms/image':>9}")
+        for backend, r in writers.items():
+            ms = r["seconds"] / r["items"] * 1000
+            print(f"{backend:<12} {r['outBytes'] / 1024:>10.1f} {r['outBytes'] / r['bytes']:>7.1%} {ms:>9.2f}")
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    regressions = []
+    for name, by_backend in baseline.get("results", {}).items():
+        for backend, base in by_backend.items():
+            cur = results.get(name, {}).get(backend)
+            if cur is None or not base.get("itemsPerSec"):
+                continue
+            change = (cur["itemsPerSec"] - base["itemsPerSec"]) / base["itemsPerSec"] * 100
+            if change < -threshold:
+                regressions.append(f"{name} [{backend}]: {change:+.1f}% ({base['itemsPerSec']:.1f} -> {cur['itemsPerSec']:.1f} {cur['unit']}/s)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Kyra decoders and parsers")
+    parser.add_argument("--game", type=str, default=None, help="Directory with original files (PAKs are read in memory)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic corpus")
+    parser.add_argument("--scenes", type=int, default=6, help="Synthetic scenes")
+    parser.add_argument("--frames", type=int, default=30, help="Synthetic frames per WSA")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass")
+    parser.add_argument("--json", type=str, default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against a previous --json result")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent vs the baseline")
+    args = parser.parse_args()
+
+    if args.game and Path(args.game).is_dir():
+        files = collect_files(Path(args.game))
+        source = f"game:{args.game}"
+    else:
+        files = synthetic_files(args.seed, args.scenes, args.frames)
+        source = f"synthetic:seed={args.seed},scenes={args.scenes},frames={args.frames}"
+
+    work = Workload(files)
+    backends = load_backends()
+    print(f"Corpus: {source}; backends: {', '.join(backends)}")
+    results = run_benchmarks(work, backends, args.repeat, not args.no_memory)
+    print_table(results)
+
+    if args.json:
+        payload = {
+            "format": "kyra-bench",
+            "source": source,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results
+        }
+        Path(args.json).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Wrote {args.json}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0f}%:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0f}% vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from kyra.batch import BatchRunner, add_batch_arguments
+from kyra.cache import add_cache_arguments, cache_key, open_cache
+from kyra.cps import CPS_WRITERS, cps_output_paths, export_cps
+from kyra.timings import add_timing_arguments, instrument
+
+
+def load_sprite_defs(meta_path: Optional[Path], name: str) -> List[dict]:
+    if meta_path is None:
+        return []
+    if meta_path.is_dir():
+        meta_path = meta_path / f"{name}.json"
+        if not meta_path.exists():
+            return []
+    data = json.loads(meta_path.read_text(encoding="utf-8"))
+    return data.get("spriteDefs", [])
+
+
+def export(path: Path, data: bytes, dst_dir: Path, outputs: List[str], options: dict, palette_path: Optional[Path]) -> None:
+    export_cps(path, dst_dir, outputs, options["width"], options["height"], palette_path, options["sprites"], options["level"], options["trim"], data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Decode Kyra .CPS once and write several outputs")
+    parser.add_argument("src", help="Path to .CPS or a directory with .CPS files")
+    parser.add_argument("dst_dir", help="Output directory")
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    parser.add_argument("--palette", type=str, default=None, help="Optional .COL palette")
+    for name in CPS_WRITERS:
+        parser.add_argument(f"--{name}", action="append_const", const=name, dest="outputs", help=f"Write {name} output")
+    parser.add_argument(
+        "--sprites",
+        type=str,
+        default=None,
+        help="Scene meta JSON (or directory of them, matched by name) whose spriteDefs are cropped to PNGs"
+    )
+    parser.add_argument("--trim", action="store_true", help="Trim transparent borders off sprites and write offsets to sprites.json")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=None, metavar="0-9", help="PNG zlib level / WebP effort (default: encoder default)")
+    add_batch_arguments(parser)
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    outputs = args.outputs or []
+    if "json" in outputs and "json-bin" in outputs:
+        parser.error("--json and --json-bin both write <name>.json")
+    if "bin" in outputs and "json-bin" in outputs:
+        parser.error("--bin and --json-bin both write <name>.bin")
+    if not outputs and not args.sprites:
+        parser.error("Nothing to do: pick at least one output")
+
+    src = Path(args.src)
+    dst_dir = Path(args.dst_dir)
+    palette_path = Path(args.palette) if args.palette else None
+    sprites_path = Path(args.sprites) if args.sprites else None
+    paths = sorted(src.glob("*.CPS")) if src.is_dir() else [src]
+    cache = open_cache(args)
+    options: Dict[Path, dict] = {}
+    keys: Dict[Path, str] = {}
+
+    def inputs(path: Path) -> List[Path]:
+        return [path] + ([palette_path] if palette_path else [])
+
+    def out_paths(path: Path) -> List[Path]:
+        return cps_output_paths(dst_dir, path.stem.upper(), outputs, bool(options[path]["sprites"]))
+
+    def skip(path: Path) -> bool:
+        sprite_defs = load_sprite_defs(sprites_path, path.stem.upper())
+        options[path] = {"width": args.width, "height": args.height, "outputs": outputs, "sprites": sprite_defs, "level": args.compress_level, "trim": args.trim}
+        if cache is None:
+            return False
+        keys[path] = cache_key(cache, __file__, inputs(path), options[path], out_paths(path))
+        return cache.restore(keys[path])
+
+    def done(path: Path, result: object) -> None:
+        if cache is not None:
+            cache.store(keys[path], out_paths(path))
+
+    runner = BatchRunner(args.jobs, args.prefetch)
+    with instrument(args, "cps_export"):
+        runner.run(paths, export, lambda path: (dst_dir, outputs, options[path], palette_path), skip, done)
+
+    print(f"Decoded CPS files into {dst_dir} ({', '.join(outputs) or 'sprites'}): {runner.summary()}")
+    if runner.failed:
+        runner.report_failures()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import struct
+import time
+from pathlib import Path
+
+from kyra.cps import encode_cps, png_to_indices
+from kyra.palette import load_palette, palette_from_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack a PNG back into a Kyra .CPS")
+    parser.add_argument("src", help="Input PNG (indexed, or RGB(A) mapped through --palette)")
+    parser.add_argument("dst", help="Output .CPS file")
+    parser.add_argument("--palette", type=str, default=None, help=".COL palette for RGB(A) input")
+    parser.add_argument("--embed-palette", action="store_true", help="Store the --palette bytes inside the CPS")
+    parser.add_argument("--like", type=str, default=None, help="Original .CPS: reuse its compression type and embedded palette, report size vs it")
+    parser.add_argument("--comp", type=int, choices=(0, 1, 3, 4), default=None, help="Compression type (default 4)")
+    parser.add_argument("--effort", type=int, default=4, help="Format80 effort 0-8 (higher is smaller and slower)")
+    parser.add_argument("--transparent-index", type=int, default=0, help="Index for fully transparent pixels")
+    args = parser.parse_args()
+
+    src = Path(args.src)
+    dst = Path(args.dst)
+    palette_path = Path(args.palette) if args.palette else None
+    comp_type = 4
+    palette_raw = b""
+    original = b""
+    if args.like:
+        original = Path(args.like).read_bytes()
+        comp_type = original[2]
+        pal_size = struct.unpack_from("<H", original, 8)[0]
+        palette_raw = original[10:10 + pal_size]
+    if args.comp is not None:
+        comp_type = args.comp
+    if args.embed_palette:
+        if palette_path is None:
+            parser.error("--embed-palette needs --palette")
+        palette_raw = palette_path.read_bytes()[:768]
+
+    palette = load_palette(palette_path) if palette_path else None
+    if palette is None and palette_raw:
+        palette = palette_from_bytes(palette_raw)
+
+    width, height, pixels = png_to_indices(src, palette, args.transparent_index)
+    start = time.perf_counter()
+    data = encode_cps(pixels, comp_type, palette_raw, args.effort)
+    elapsed = time.perf_counter() - start
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.write_bytes(data)
+
+    print(f"Wrote {dst} ({width}x{height}, type {comp_type}, {len(data)} bytes, {len(data) / len(pixels):.1%} of raw, {elapsed * 1000:.1f}ms)")
+    if original:
+        print(f"Original {args.like}: {len(original)} bytes ({(len(data) - len(original)) / len(original):+.1%})")
+
+
+if __name__ == "__main__":
+    main()
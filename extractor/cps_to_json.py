@@ -2,241 +2,11 @@
 from __future__ import annotations
 
 import argparse
-import base64
-import json
-import struct
 from pathlib import Path
-from typing import List
 
-
-def decode_ega_get_code(src: bytes, pos: int, nib: int) -> tuple[int, int, int]:
-    res = struct.unpack_from(">H", src, pos)[0]
-    if (nib + 1) & 1:
-        res >>= 4
-        return res & 0xFFF, pos + 1, nib + 1
-    return res & 0xFFF, pos + 2, nib + 1
-
-
-def decode_frame1(src: bytes, size: int) -> bytearray:
-    dst = bytearray(size)
-    dst_end = size
-
-    patterns: List[tuple[int, int]] = []
-    num_patterns = 0
-    nib = 0
-    pos = 0
-
-    code, pos, nib = decode_ega_get_code(src, pos, nib)
-    last = code & 0xFF
-
-    dst_pos = 0
-    dst_prev = 0
-    count = 1
-    count_prev = 1
-
-    dst[dst_pos] = last
-    dst_pos += 1
-
-    while dst_pos < dst_end:
-        code, pos, nib = decode_ega_get_code(src, pos, nib)
-        cmd = (code >> 8) & 0xFF
-
-        if cmd:
-            cmd -= 1
-            code = (cmd << 8) | (code & 0xFF)
-            tmp_dst = dst_pos
-
-            if code < num_patterns:
-                src_pos = patterns[code][0]
-                count_prev = patterns[code][1]
-                last = dst[src_pos]
-                for _ in range(count_prev):
-                    dst[dst_pos] = dst[src_pos]
-                    dst_pos += 1
-                    src_pos += 1
-            else:
-                src_pos = dst_prev
-                count = count_prev
-                for _ in range(count_prev):
-                    dst[dst_pos] = dst[src_pos]
-                    dst_pos += 1
-                    src_pos += 1
-                dst[dst_pos] = last
-                dst_pos += 1
-                count_prev += 1
-
-            if num_patterns < 3840:
-                patterns.append((dst_prev, count + 1))
-                num_patterns += 1
-
-            dst_prev = tmp_dst
-            count = count_prev
-        else:
-            last = code & 0xFF
-            dst[dst_pos] = last
-            dst_pos += 1
-
-            if num_patterns < 3840:
-                patterns.append((dst_prev, count + 1))
-                num_patterns += 1
-
-            dst_prev = dst_pos - 1
-            count = 1
-            count_prev = 1
-
-    return dst
-
-
-def decode_frame3(src: bytes, size: int, is_amiga: bool = False) -> bytearray:
-    dst = bytearray(size)
-    dst_pos = 0
-    src_pos = 0
-    dst_end = size
-
-    while dst_pos < dst_end:
-        code = struct.unpack_from("b", src, src_pos)[0]
-        src_pos += 1
-        if code == 0:
-            if is_amiga:
-                sz = struct.unpack_from("<H", src, src_pos)[0]
-            else:
-                sz = struct.unpack_from(">H", src, src_pos)[0]
-            src_pos += 2
-            val = src[src_pos]
-            src_pos += 1
-            dst[dst_pos:dst_pos + sz] = bytes([val]) * sz
-            dst_pos += sz
-        elif code < 0:
-            val = src[src_pos]
-            src_pos += 1
-            dst[dst_pos:dst_pos - code] = bytes([val]) * (-code)
-            dst_pos -= code
-        else:
-            dst[dst_pos:dst_pos + code] = src[src_pos:src_pos + code]
-            dst_pos += code
-            src_pos += code
-
-    return dst
-
-
-def decode_frame4(src: bytes, size: int) -> bytearray:
-    dst = bytearray(size)
-    dst_pos = 0
-    src_pos = 0
-    dst_end = size
-
-    def read_le16(pos: int) -> int:
-        return src[pos] | (src[pos + 1] << 8)
-
-    while True:
-        count = dst_end - dst_pos
-        if count == 0:
-            break
-        code = src[src_pos]
-        src_pos += 1
-
-        if not (code & 0x80):
-            length = min(count, (code >> 4) + 3)
-            offs = ((code & 0x0F) << 8) | src[src_pos]
-            src_pos += 1
-            from_pos = dst_pos - offs
-            for _ in range(length):
-                dst[dst_pos] = dst[from_pos]
-                dst_pos += 1
-                from_pos += 1
-        elif code & 0x40:
-            length = (code & 0x3F) + 3
-            if code == 0xFE:
-                length = read_le16(src_pos)
-                src_pos += 2
-                if length > count:
-                    length = count
-                val = src[src_pos]
-                src_pos += 1
-                dst[dst_pos:dst_pos + length] = bytes([val]) * length
-                dst_pos += length
-            else:
-                if code == 0xFF:
-                    length = read_le16(src_pos)
-                    src_pos += 2
-                offs = read_le16(src_pos)
-                src_pos += 2
-                if length > count:
-                    length = count
-                from_pos = offs
-                for _ in range(length):
-                    dst[dst_pos] = dst[from_pos]
-                    dst_pos += 1
-                    from_pos += 1
-        elif code != 0x80:
-            length = min(count, code & 0x3F)
-            dst[dst_pos:dst_pos + length] = src[src_pos:src_pos + length]
-            src_pos += length
-            dst_pos += length
-        else:
-            break
-
-    return dst
-
-
-def decode_cps(path: Path, width: int | None, height: int | None, palette_path: Path | None) -> dict:
-    data = path.read_bytes()
-    if len(data) < 10:
-        raise ValueError("CPS too small")
-
-    comp_type = data[2]
-    img_size = struct.unpack_from("<I", data, 4)[0]
-    pal_size = struct.unpack_from("<H", data, 8)[0]
-
-    if img_size == 64000 and (width is None or height is None):
-        width = 320
-        height = 200
-
-    if width is None or height is None:
-        raise ValueError("Width/height must be provided for CPS decode")
-
-    src_ptr = 10 + pal_size
-    payload = data[src_ptr:src_ptr + img_size + 16]
-
-    if comp_type == 0:
-        pixels = bytearray(payload[:img_size])
-    elif comp_type == 1:
-        pixels = decode_frame1(payload, img_size)
-    elif comp_type == 3:
-        pixels = decode_frame3(payload, img_size, is_amiga=False)
-    elif comp_type == 4:
-        pixels = decode_frame4(payload, img_size)
-    else:
-        raise ValueError(f"Unsupported CPS compression: {comp_type}")
-
-    palette_bytes = None
-    if pal_size:
-        palette_bytes = data[10:10 + pal_size]
-    elif palette_path:
-        palette_bytes = palette_path.read_bytes()
-
-    palette = []
-    if palette_bytes:
-        for i in range(0, min(len(palette_bytes), 768), 3):
-            r = palette_bytes[i]
-            g = palette_bytes[i + 1]
-            b = palette_bytes[i + 2]
-            if r <= 63 and g <= 63 and b <= 63:
-                r *= 4
-                g *= 4
-                b *= 4
-            palette.extend([r, g, b])
-
-    return {
-        "format": "kyra-cps",
-        "width": width,
-        "height": height,
-        "compType": comp_type,
-        "imgSize": img_size,
-        "palSize": pal_size,
-        "palette": palette,
-        "rawBase64": base64.b64encode(bytes(pixels)).decode("ascii")
-    }
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.cps import cps_json_payload, read_cps, write_bin, write_json, write_json_bin
+from kyra.timings import add_timing_arguments, instrument
 
 
 def main() -> None:
@@ -246,14 +16,38 @@ def main() -> None:
     parser.add_argument("--width", type=int, default=None)
     parser.add_argument("--height", type=int, default=None)
     parser.add_argument("--palette", type=str, default=None, help="Optional .COL palette")
+    parser.add_argument(
+        "--format",
+        choices=("json", "bin", "both"),
+        default="json",
+        help="json: pixels as rawBase64; bin: aligned binary file; both: JSON header + .bin next to it"
+    )
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
     args = parser.parse_args()
 
+    src = Path(args.src)
     palette_path = Path(args.palette) if args.palette else None
-    payload = decode_cps(Path(args.src), args.width, args.height, palette_path)
     dst = Path(args.dst)
     dst.parent.mkdir(parents=True, exist_ok=True)
-    dst.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
-    print(f"Wrote {dst}")
+
+    def build() -> None:
+        image = read_cps(src, args.width, args.height, palette_path)
+        if args.format == "json":
+            write_json(image, dst)
+        elif args.format == "bin":
+            write_bin(image, dst)
+        else:
+            write_json_bin(image, dst)
+
+    inputs = [src] + ([palette_path] if palette_path else [])
+    outputs = [dst] + ([dst.with_suffix(".bin")] if args.format == "both" else [])
+    options = {"width": args.width, "height": args.height, "format": args.format}
+    with instrument(args, "cps_to_json"):
+        if run_cached(open_cache(args), __file__, inputs, options, outputs, build):
+            print(f"Up to date: {dst}")
+        else:
+            print(f"Wrote {', '.join(str(p) for p in outputs)}")
 
 
 if __name__ == "__main__":
@@ -2,157 +2,57 @@
 from __future__ import annotations
 
 import argparse
-import json
+import sys
 from pathlib import Path
+from typing import Dict, List
 
-OP_BODY_START = 0xFF81
-OP_BODY_UNK = 0xFF82
-OP_BODY_END = 0xFF83
-OP_SPRITE_DEFS = 0xFF84
-OP_SPRITE_DEFS_END = 0xFF85
-OP_ANIM_START = 0xFF86
-OP_ANIM_END = 0xFF87
+from kyra.batch import BatchRunner, add_batch_arguments
+from kyra.cache import add_cache_arguments, cache_key, open_cache
+from kyra.dat import decode_scene_dat
+from kyra.output import write_json_file
+from kyra.timings import add_timing_arguments, instrument
 
 
-def decode_scene_dat(path: Path) -> dict:
-    data = path.read_bytes()
-    if len(data) < 0x15:
-        raise ValueError(f"Scene dat too small: {path}")
-    draw_layer_table = list(data[0x0D:0x15])
-    sprite_defs, anims = parse_scene_body(data)
-    return {
-        "format": "kyra-scene-meta",
-        "scene": path.stem.upper(),
-        "drawLayerTable": draw_layer_table,
-        "spriteDefs": sprite_defs,
-        "anims": anims
-    }
+def convert(path: Path, data: bytes, out_path: Path) -> None:
+    write_json_file(out_path, decode_scene_dat(path, data), path.stem.upper())
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Convert Kyra .DAT scene metadata to JSON (batch)")
     parser.add_argument("src_dir", help="Directory with .DAT files")
     parser.add_argument("dst_dir", help="Output directory for JSON files")
+    add_batch_arguments(parser)
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
     args = parser.parse_args()
 
     src_dir = Path(args.src_dir)
     dst_dir = Path(args.dst_dir)
     dst_dir.mkdir(parents=True, exist_ok=True)
-
-    count = 0
-    for path in sorted(src_dir.glob("*.DAT")):
-        payload = decode_scene_dat(path)
-        out_path = dst_dir / f"{path.stem.upper()}.json"
-        out_path.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
-        count += 1
-
-    print(f"Wrote {count} JSON files to {dst_dir}")
-
-
-def parse_scene_body(data: bytes) -> tuple[list[dict], list[dict]]:
-    if len(data) <= 0x6D:
-        return [], []
-
-    pos = 0x6B
-    length = int.from_bytes(data[pos:pos + 2], "little")
-    pos += 2
-    end = min(pos + length, len(data))
-
-    sprite_defs: list[dict] = []
-    anims: list[dict] = []
-
-    while pos + 2 <= end:
-        code = int.from_bytes(data[pos:pos + 2], "little")
-        if code == OP_BODY_END:
-            pos += 2
-            break
-        if code in (OP_BODY_START, OP_BODY_UNK):
-            pos += 2
-            continue
-        if code == OP_SPRITE_DEFS:
-            pos += 2
-            while pos + 2 <= end:
-                sprite_num = int.from_bytes(data[pos:pos + 2], "little")
-                if sprite_num == OP_SPRITE_DEFS_END:
-                    pos += 2
-                    break
-                x = int.from_bytes(data[pos + 2:pos + 4], "little") * 8
-                y = int.from_bytes(data[pos + 4:pos + 6], "little")
-                w = int.from_bytes(data[pos + 6:pos + 8], "little") * 8
-                h = int.from_bytes(data[pos + 8:pos + 10], "little")
-                sprite_defs.append({
-                    "id": sprite_num,
-                    "x": x,
-                    "y": y,
-                    "w": w,
-                    "h": h
-                })
-                pos += 10
-            continue
-        if code == OP_ANIM_START:
-            anim, new_pos = parse_anim_block(data, pos, end)
-            anims.append(anim)
-            pos = new_pos
-            continue
-        pos += 2
-
-    return sprite_defs, anims
-
-
-def parse_anim_block(data: bytes, start: int, end: int) -> tuple[dict, int]:
-    p = start + 4
-    def read16_pad() -> int:
-        nonlocal p
-        v = int.from_bytes(data[p:p + 2], "little")
-        p += 4
-        return v
-
-    disable = read16_pad()
-    unk2 = read16_pad()
-    draw_y = read16_pad()
-    p += 4
-    default_x = read16_pad()
-    default_y = read16_pad()
-    width = data[p - 4]
-    p += 4
-    height = data[p - 4]
-    p += 4
-    sprite = read16_pad()
-    flip_x = read16_pad()
-    width2 = data[p - 4]
-    p += 4
-    height2 = data[p - 4]
-    p += 4
-    unk1 = read16_pad()
-    play = int.from_bytes(data[p:p + 2], "little")
-    p += 2
-
-    script: list[int] = []
-    while p + 2 <= end:
-        v = int.from_bytes(data[p:p + 2], "little")
-        script.append(v)
-        p += 2
-        if v == OP_ANIM_END:
-            break
-
-    anim = {
-        "disable": disable != 0,
-        "unk2": unk2,
-        "drawY": draw_y,
-        "defaultX": default_x,
-        "defaultY": default_y,
-        "width": width,
-        "height": height,
-        "sprite": sprite,
-        "flipX": flip_x != 0,
-        "width2": width2,
-        "height2": height2,
-        "unk1": unk1 != 0,
-        "play": play != 0,
-        "script": script
-    }
-
-    return anim, p
+    cache = open_cache(args)
+    keys: Dict[Path, str] = {}
+
+    def outputs(path: Path) -> List[Path]:
+        return [dst_dir / f"{path.stem.upper()}.json"]
+
+    def skip(path: Path) -> bool:
+        if cache is None:
+            return False
+        keys[path] = cache_key(cache, __file__, [path], {}, outputs(path))
+        return cache.restore(keys[path])
+
+    def done(path: Path, result: object) -> None:
+        if cache is not None:
+            cache.store(keys[path], outputs(path))
+
+    runner = BatchRunner(args.jobs, args.prefetch)
+    with instrument(args, "dat_batch_to_json"):
+        runner.run(sorted(src_dir.glob("*.DAT")), convert, lambda path: (outputs(path)[0],), skip, done)
+
+    print(f"Wrote JSON files to {dst_dir}: {runner.summary()}")
+    if runner.failed:
+        runner.report_failures()
+        sys.exit(1)
 
 
 if __name__ == "__main__":
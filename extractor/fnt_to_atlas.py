@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.fnt import read_fnt, write_font
+from kyra.output import IMAGE_FORMATS
+from kyra.timings import add_timing_arguments, instrument
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert a Kyra .FNT bitmap font to a glyph atlas and metrics JSON")
+    parser.add_argument("src", help="Path to .FNT")
+    parser.add_argument("dst_dir", help="Output directory")
+    parser.add_argument("--format", choices=list(IMAGE_FORMATS), default="png", help="Atlas image backend (indexed-png keeps the raw colour numbers)")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=None, metavar="0-9", help="PNG zlib level / WebP effort (default: encoder default)")
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    src = Path(args.src)
+    dst_dir = Path(args.dst_dir)
+    name = src.stem.upper()
+
+    def build() -> None:
+        write_font(read_fnt(src), dst_dir, args.format, args.compress_level)
+
+    options = {"format": args.format, "level": args.compress_level}
+    out_paths = [dst_dir / f"{name}{IMAGE_FORMATS[args.format].suffix}", dst_dir / f"{name}.json"]
+    with instrument(args, "fnt_to_atlas"):
+        if run_cached(open_cache(args), __file__, [src], options, out_paths, build):
+            print(f"Up to date: {dst_dir / name}")
+        else:
+            print(f"Wrote {out_paths[0]} and {out_paths[1]}")
+
+
+if __name__ == "__main__":
+    main()
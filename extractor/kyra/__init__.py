@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import importlib
+
+__all__ = [
+    "atlas",
+    "batch",
+    "bundle",
+    "cache",
+    "codecs",
+    "cps",
+    "dat",
+    "emc",
+    "encoders",
+    "fades",
+    "fnt",
+    "frames",
+    "graph",
+    "layout",
+    "manifest",
+    "msc",
+    "output",
+    "pak",
+    "palette",
+    "pixels",
+    "report",
+    "serve",
+    "shp",
+    "store",
+    "synth",
+    "tiles",
+    "timings",
+    "watch",
+    "wsa"
+]
+
+
+# Submodules load on first access (kyra.wsa, kyra.cps, ...) and Pillow only
+# when an image is written, so the CLI tools start without unused decoders.
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .output import IMAGE_FORMATS, write_image, write_json_file
+from .palette import Palette
+from .pixels import blit, rect_bounds
+from .timings import stage
+
+
+def pack_pages(
+    sizes: List[tuple[int, int]],
+    max_width: int = 512,
+    max_height: Optional[int] = None,
+    padding: int = 1
+) -> tuple[List[tuple[int, int, int]], List[tuple[int, int]]]:
+    # Shelf packing: tallest rectangles first, left to right, a new shelf
+    # whenever the row is full and a new page once a shelf would pass
+    # max_height. Returns (page, x, y) in input order plus each page's size.
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0], i))
+    placements: List[tuple[int, int, int]] = [(0, 0, 0)] * len(sizes)
+    pages: List[tuple[int, int]] = []
+    page = 0
+    x = 0
+    y = 0
+    shelf_h = 0
+    used_w = 0
+    for i in order:
+        w, h = sizes[i]
+        if x and x + w > max_width:
+            y += shelf_h + padding
+            x = 0
+            shelf_h = 0
+        if max_height is not None and y and y + h > max_height:
+            pages.append((used_w, y - padding))
+            page += 1
+            y = 0
+            used_w = 0
+        placements[i] = (page, x, y)
+        used_w = max(used_w, x + w)
+        shelf_h = max(shelf_h, h)
+        x += w + padding
+    if sizes:
+        pages.append((used_w, y + shelf_h))
+    return placements, pages
+
+
+def pack_shelves(sizes: List[tuple[int, int]], max_width: int = 512, padding: int = 1) -> tuple[List[tuple[int, int]], int, int]:
+    placements, pages = pack_pages(sizes, max_width, None, padding)
+    width, height = pages[0] if pages else (0, 0)
+    return [(x, y) for _page, x, y in placements], width, height
+
+
+def build_sheet_atlas(
+    image: dict,
+    sprite_defs: List[dict],
+    transparent_index: Optional[int] = 0,
+    max_width: int = 512,
+    padding: int = 1
+) -> dict:
+    # Slices every spriteDef rectangle out of a decoded CPS sheet into one
+    # packed atlas. With a transparent index each sprite is trimmed to its
+    # opaque box first; sprites sharing a rectangle share one atlas cell.
+    width = image["width"]
+    height = image["height"]
+    pixels = image["pixels"]
+    regions: List[tuple[int, int, int, int]] = []
+    region_index: Dict[tuple[int, int, int, int], int] = {}
+    frames: List[dict] = []
+
+    with stage("parse", image["name"]):
+        for sprite in sprite_defs:
+            x, y = sprite["x"], sprite["y"]
+            w = max(0, min(sprite["w"], width - x))
+            h = max(0, min(sprite["h"], height - y))
+            frame = {"id": sprite["id"], "x": 0, "y": 0, "w": 0, "h": 0, "offsetX": 0, "offsetY": 0, "fullWidth": w, "fullHeight": h}
+            frames.append(frame)
+            if w == 0 or h == 0:
+                continue
+            bounds = (0, 0, w, h)
+            if transparent_index is not None:
+                bounds = rect_bounds(pixels, width, x, y, w, h, transparent_index)
+                if bounds is None:
+                    continue
+            bx, by, bw, bh = bounds
+            region = (x + bx, y + by, bw, bh)
+            frame.update(offsetX=bx, offsetY=by, w=bw, h=bh)
+            frame["region"] = region_index.setdefault(region, len(regions))
+            if frame["region"] == len(regions):
+                regions.append(region)
+
+    positions, atlas_w, atlas_h = pack_shelves([(w, h) for _x, _y, w, h in regions], max_width, padding)
+    fill = transparent_index if transparent_index is not None else 0
+    atlas = bytearray([fill]) * (atlas_w * atlas_h)
+    with stage("encode", image["name"], len(pixels)) as st:
+        for (sx, sy, w, h), (dx, dy) in zip(regions, positions):
+            blit(atlas, atlas_w, dx, dy, pixels, width, sx, sy, w, h)
+        st["bytesOut"] = len(atlas)
+    for frame in frames:
+        region = frame.pop("region", None)
+        if region is not None:
+            frame["x"], frame["y"] = positions[region]
+
+    return {
+        "name": image["name"],
+        "width": atlas_w,
+        "height": atlas_h,
+        "pixels": bytes(atlas),
+        "palette": image["palette"],
+        "frames": frames,
+        "cells": len(regions)
+    }
+
+
+def write_atlas(atlas: dict, dst_dir: Path, fmt: str = "png", transparent_index: Optional[int] = 0, level: Optional[int] = None) -> List[Path]:
+    name = atlas["name"]
+    image_path = dst_dir / f"{name}_atlas{IMAGE_FORMATS[fmt].suffix}"
+    table_path = dst_dir / f"{name}_atlas.json"
+    write_image(fmt, image_path, atlas["width"], atlas["height"], atlas["pixels"], atlas["palette"], transparent_index, level, name)
+    # x/y/w/h locate the (trimmed) sprite in the atlas, offsetX/offsetY place
+    # it inside the original fullWidth x fullHeight spriteDef rectangle.
+    payload = {
+        "format": "kyra-scene-atlas",
+        "scene": name,
+        "image": image_path.name,
+        "width": atlas["width"],
+        "height": atlas["height"],
+        "frames": atlas["frames"]
+    }
+    write_json_file(table_path, payload, name)
+    return [image_path, table_path]
+
+
+def build_shape_atlas(
+    sources: List[tuple[str, List[Optional[dict]]]],
+    transparent_index: Optional[int] = 0,
+    max_width: int = 512,
+    max_height: Optional[int] = 512,
+    padding: int = 1
+) -> dict:
+    # Packs decoded shapes (kyra.shp) of one or more shape files into atlas
+    # pages. Offsets are relative to the bottom-centre of the untrimmed shape,
+    # the anchor characters are drawn from.
+    cells: List[tuple[int, int, bytes]] = []
+    frames: List[dict] = []
+    for source, shapes in sources:
+        for index, shape in enumerate(shapes):
+            if shape is None:
+                continue
+            width, height, pixels = shape["width"], shape["height"], shape["pixels"]
+            bounds = (0, 0, width, height)
+            if transparent_index is not None:
+                bounds = rect_bounds(pixels, width, 0, 0, width, height, transparent_index)
+                if bounds is None:
+                    continue
+            x, y, w, h = bounds
+            frames.append({
+                "source": source,
+                "shapeIndex": index,
+                "w": w,
+                "h": h,
+                "xOffset": x - width // 2,
+                "yOffset": y - height
+            })
+            cells.append((x, y, shape))
+
+    placements, page_sizes = pack_pages([(f["w"], f["h"]) for f in frames], max_width, max_height, padding)
+    fill = transparent_index if transparent_index is not None else 0
+    pages = [(w, h, bytearray([fill]) * (w * h)) for w, h in page_sizes]
+    for frame, (sx, sy, shape), (page, dx, dy) in zip(frames, cells, placements):
+        page_w, _page_h, page_pixels = pages[page]
+        blit(page_pixels, page_w, dx, dy, shape["pixels"], shape["width"], sx, sy, frame["w"], frame["h"])
+        frame.update(imageIndex=page, x=dx, y=dy)
+    return {"pages": pages, "frames": frames}
+
+
+def write_shape_atlas(
+    atlas: dict,
+    dst_dir: Path,
+    name: str,
+    palette: Optional[Palette],
+    fmt: str = "png",
+    transparent_index: Optional[int] = 0,
+    level: Optional[int] = None
+) -> List[Path]:
+    written: List[Path] = []
+    images: List[str] = []
+    for i, (width, height, pixels) in enumerate(atlas["pages"]):
+        dst = dst_dir / f"{name}_{i}{IMAGE_FORMATS[fmt].suffix}"
+        write_image(fmt, dst, width, height, bytes(pixels), palette, transparent_index, level, name)
+        images.append(dst.name)
+        written.append(dst)
+    # Same frame layout as src/engine/data/brandonShapes.json, plus the
+    # shape file each frame came from
+    frames = [
+        {key: frame[key] for key in ("imageIndex", "x", "y", "w", "h", "xOffset", "yOffset", "shapeIndex", "source")}
+        for frame in atlas["frames"]
+    ]
+    payload = {"imageIndex": 0, "imageName": images[0] if images else "", "images": images, "frames": frames}
+    table_path = dst_dir / f"{name}.json"
+    write_json_file(table_path, payload, name, indent=2)
+    written.append(table_path)
+    return written
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .output import capture_writes, write_bytes
+from .timings import stage
+
+BATCH_PREFETCH = 4
+
+
+def _work(func: Callable, path: Path, data: bytes, args: tuple) -> Tuple[object, List[Tuple[Path, bytes]]]:
+    # Runs in the executor: decode and encode as usual, but hand the output
+    # files back instead of writing them from the worker
+    with capture_writes() as writes:
+        result = func(path, data, *args)
+    return result, writes
+
+
+class BatchRunner:
+    # read -> decode/encode -> write as three overlapping stages: a reader
+    # keeps up to `prefetch` inputs in memory ahead of the workers, `jobs`
+    # executor slots do the CPU work and finished outputs are written from a
+    # thread while the next file decodes.
+    def __init__(self, jobs: Optional[int] = None, prefetch: int = BATCH_PREFETCH, progress: bool = False) -> None:
+        self.jobs = jobs or os.cpu_count() or 1
+        self.prefetch = max(1, prefetch)
+        self.progress = progress
+        self.results: Dict[str, object] = {}
+        self.failed: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    def run(
+        self,
+        paths: Iterable[Path],
+        func: Callable,
+        args: Callable[[Path], tuple] = lambda path: (),
+        skip: Optional[Callable[[Path], bool]] = None,
+        done: Optional[Callable[[Path, object], None]] = None
+    ) -> Dict[str, object]:
+        # func(path, data, *args(path)) must be a module-level function so it
+        # can run in a worker process; skip and done run in the driver
+        start = time.perf_counter()
+        if self.jobs == 1:
+            # One thread still overlaps decoding with reads and writes
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                asyncio.run(self._run(pool, list(paths), func, args, skip, done))
+        else:
+            with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+                asyncio.run(self._run(pool, list(paths), func, args, skip, done))
+        self.elapsed = time.perf_counter() - start
+        return self.results
+
+    async def _run(
+        self,
+        pool: Executor,
+        paths: List[Path],
+        func: Callable,
+        args: Callable[[Path], tuple],
+        skip: Optional[Callable[[Path], bool]],
+        done: Optional[Callable[[Path, object], None]]
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+        # Outputs not yet on disk; bounds memory when writing is the bottleneck
+        writing = asyncio.Semaphore(self.jobs + self.prefetch)
+        writes: List[asyncio.Task] = []
+
+        def read(path: Path) -> bytes:
+            with stage("read", path.stem.upper()) as st:
+                data = path.read_bytes()
+                st["bytesOut"] = len(data)
+            return data
+
+        def flush(path: Path, result: object, files: List[Tuple[Path, bytes]]) -> None:
+            for dst, data in files:
+                write_bytes(dst, data, path.stem.upper())
+            if done is not None:
+                done(path, result)
+
+        async def reader() -> None:
+            for path in paths:
+                try:
+                    if skip is not None and await asyncio.to_thread(skip, path):
+                        self.skipped.append(path.name)
+                        continue
+                    data = await asyncio.to_thread(read, path)
+                except Exception as exc:
+                    self._fail(path, exc)
+                    continue
+                self.bytes_read += len(data)
+                await queue.put((path, data))
+            for _ in range(self.jobs):
+                await queue.put(None)
+
+        async def write(path: Path, result: object, files: List[Tuple[Path, bytes]]) -> None:
+            try:
+                await asyncio.to_thread(flush, path, result, files)
+            except Exception as exc:
+                self._fail(path, exc)
+            else:
+                self.bytes_written += sum(len(data) for _dst, data in files)
+                self._complete(path, result)
+            finally:
+                writing.release()
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                path, data = item
+                try:
+                    result, files = await loop.run_in_executor(pool, _work, func, path, data, args(path))
+                except Exception as exc:
+                    self._fail(path, exc)
+                    continue
+                await writing.acquire()
+                writes.append(asyncio.create_task(write(path, result, files)))
+
+        await asyncio.gather(reader(), *(worker() for _ in range(self.jobs)))
+        await asyncio.gather(*writes)
+
+    def _complete(self, path: Path, result: object) -> None:
+        self.results[path.name] = result
+        if self.progress:
+            print(f"[{len(self.results) + len(self.failed)}] {path.name}", flush=True)
+
+    def _fail(self, path: Path, exc: BaseException) -> None:
+        message = f"{type(exc).__name__}: {exc}"
+        self.failed[path.name] = message
+        if self.progress:
+            print(f"[{len(self.results) + len(self.failed)}] {path.name} FAILED: {message}", flush=True)
+            traceback.print_exception(type(exc), exc, exc.__traceback__, file=sys.stderr)
+
+    def summary(self) -> str:
+        mb = 1e6 * max(self.elapsed, 1e-9)
+        return (
+            f"{len(self.results)} converted, {len(self.skipped)} up to date, {len(self.failed)} failed in {self.elapsed:.2f}s "
+            f"({self.bytes_read / mb:.1f} MB/s read, {self.bytes_written / mb:.1f} MB/s written)"
+        )
+
+    def report_failures(self) -> None:
+        for name, error in sorted(self.failed.items()):
+            print(f"  {name}: {error}", file=sys.stderr)
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Decode/encode worker processes (1 uses one thread)")
+    parser.add_argument("--prefetch", type=int, default=BATCH_PREFETCH, help="Input files read ahead of the workers")
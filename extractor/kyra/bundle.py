@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .manifest import MANIFEST_NAME, hashed_urls, load_manifest
+from .timings import stage
+
+BUNDLE_MAGIC = b"KBND"
+BUNDLE_VERSION = 1
+# magic, version, align, entry count, TOC size (entries + names), data offset
+BUNDLE_HEADER = struct.Struct("<4sHHIII")
+# offset, length, name offset, name length, type, hash (first 8 bytes of SHA-256)
+BUNDLE_ENTRY = struct.Struct("<IIIHH8s")
+BUNDLE_ALIGN = 16
+
+ENTRY_TYPES = {".json": 1, ".png": 2, ".webp": 3, ".bin": 4, ".raw": 5, ".txt": 6, ".otf": 7}
+
+
+def entry_type(name: str) -> int:
+    return ENTRY_TYPES.get(Path(name).suffix.lower(), 0)
+
+
+def _aligned(value: int, align: int) -> int:
+    return (value + align - 1) // align * align
+
+
+def collect_files(root: Path, prefixes: Iterable[str] = ()) -> List[str]:
+    # Logical paths in sorted order, so a scene or the intro ends up in one
+    # contiguous run that a single range request covers
+    prefixes = [p.strip("/") + "/" for p in prefixes]
+    # Hashed copies from asset_manifest.py are the same bytes again
+    hashed = hashed_urls(load_manifest(root))
+    names = []
+    for path in sorted(root.rglob("*")):
+        if not path.is_file():
+            continue
+        rel = path.relative_to(root).as_posix()
+        if rel == MANIFEST_NAME or rel in hashed or path.name.startswith(".") or path.suffix == ".kbnd":
+            continue
+        if prefixes and not any(rel.startswith(p) for p in prefixes):
+            continue
+        names.append(rel)
+    return names
+
+
+def split_bundles(root: Path, names: List[str], max_size: Optional[int]) -> List[List[str]]:
+    groups: List[List[str]] = [[]]
+    size = 0
+    for name in names:
+        file_size = (root / name).stat().st_size
+        if max_size and groups[-1] and size + file_size > max_size:
+            groups.append([])
+            size = 0
+        groups[-1].append(name)
+        size += file_size
+    return [g for g in groups if g]
+
+
+def build_bundle(root: Path, names: List[str], align: int = BUNDLE_ALIGN) -> bytes:
+    blobs: List[bytes] = []
+    for name in names:
+        with stage("read", name) as st:
+            blobs.append((root / name).read_bytes())
+            st["bytesOut"] = len(blobs[-1])
+
+    with stage("write", "bundle") as st:
+        name_table = bytearray()
+        name_offsets = []
+        for name in names:
+            name_offsets.append((len(name_table), len(name.encode("utf-8"))))
+            name_table += name.encode("utf-8")
+        toc_size = BUNDLE_ENTRY.size * len(names) + len(name_table)
+        data_offset = _aligned(BUNDLE_HEADER.size + toc_size, align)
+
+        toc = bytearray()
+        data = bytearray()
+        for name, blob, (name_off, name_len) in zip(names, blobs, name_offsets):
+            data += bytes(_aligned(len(data), align) - len(data))
+            digest = hashlib.sha256(blob).digest()[:8]
+            toc += BUNDLE_ENTRY.pack(data_offset + len(data), len(blob), name_off, name_len, entry_type(name), digest)
+            data += blob
+
+        out = bytearray(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, align, len(names), toc_size, data_offset))
+        out += toc
+        out += name_table
+        out += bytes(data_offset - len(out))
+        out += data
+        st["bytesOut"] = len(out)
+    return bytes(out)
+
+
+def parse_header(data: bytes) -> Tuple[int, int, int, int]:
+    if len(data) < BUNDLE_HEADER.size:
+        raise ValueError("Bundle too small")
+    magic, version, align, count, toc_size, data_offset = BUNDLE_HEADER.unpack_from(data, 0)
+    if magic != BUNDLE_MAGIC:
+        raise ValueError("Not an asset bundle")
+    if version != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle version: {version}")
+    return align, count, toc_size, data_offset
+
+
+def parse_toc(data: bytes) -> Dict[str, dict]:
+    # data only needs to hold the header and the TOC, i.e. the first
+    # BUNDLE_HEADER.size + toc_size bytes
+    _align, count, toc_size, _data_offset = parse_header(data)
+    if len(data) < BUNDLE_HEADER.size + toc_size:
+        raise ValueError("Bundle TOC truncated")
+    names_start = BUNDLE_HEADER.size + BUNDLE_ENTRY.size * count
+    entries: Dict[str, dict] = {}
+    for i in range(count):
+        offset, length, name_off, name_len, kind, digest = BUNDLE_ENTRY.unpack_from(data, BUNDLE_HEADER.size + i * BUNDLE_ENTRY.size)
+        name = bytes(data[names_start + name_off:names_start + name_off + name_len]).decode("utf-8")
+        entries[name] = {"offset": offset, "length": length, "type": kind, "hash": digest.hex()}
+    return entries
+
+
+def coalesce_ranges(entries: Iterable[dict], gap: int = 0) -> List[Tuple[int, int]]:
+    # Merge entries that are adjacent (up to `gap` bytes of padding apart)
+    # into inclusive (first, last) byte ranges
+    ranges: List[Tuple[int, int]] = []
+    for entry in sorted(entries, key=lambda e: e["offset"]):
+        first = entry["offset"]
+        last = first + entry["length"] - 1
+        if ranges and first - ranges[-1][1] - 1 <= gap:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], last))
+        else:
+            ranges.append((first, last))
+    return ranges
+
+
+def write_bundles(root: Path, dst: Path, name: str, names: List[str], max_size: Optional[int], align: int = BUNDLE_ALIGN) -> List[Path]:
+    dst.mkdir(parents=True, exist_ok=True)
+    groups = split_bundles(root, names, max_size)
+    paths = []
+    for i, group in enumerate(groups):
+        path = dst / (f"{name}.kbnd" if len(groups) == 1 else f"{name}.{i:02d}.kbnd")
+        data = build_bundle(root, group, align)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+CACHE_ENV = "KYRA_CACHE_DIR"
+CACHE_FORMAT = 1
+_HASH_CHUNK = 1 << 20
+
+_version_memo: Dict[str, str] = {}
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def tool_version(tool_path: str) -> str:
+    # A tool's version is the hash of its own source plus the shared kyra
+    # package, so editing a decoder invalidates every entry it produced.
+    version = _version_memo.get(tool_path)
+    if version is None:
+        h = hashlib.sha256()
+        sources = [Path(tool_path)] + sorted(Path(__file__).parent.glob("*.py"))
+        for src in sources:
+            h.update(src.name.encode("utf-8"))
+            h.update(src.read_bytes())
+        version = h.hexdigest()[:16]
+        _version_memo[tool_path] = version
+    return version
+
+
+def _output_files(outputs: Iterable[Path]) -> List[Path]:
+    files: List[Path] = []
+    for out in outputs:
+        if out.is_dir():
+            files.extend(sorted(p for p in out.rglob("*") if p.is_file()))
+        elif out.is_file():
+            files.append(out)
+    return files
+
+
+class BuildCache:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.entries_dir = root / "entries"
+        self.objects_dir = root / "objects"
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, tool_path: str, inputs: Iterable[Path], options: dict) -> str:
+        material = {
+            "cache": CACHE_FORMAT,
+            "tool": Path(tool_path).stem,
+            "version": tool_version(tool_path),
+            "inputs": [hash_file(p) for p in inputs],
+            "options": options
+        }
+        blob = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / key[:2] / f"{key}.json"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def restore(self, key: str) -> bool:
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            return False
+        entry = json.loads(entry_path.read_text(encoding="utf-8"))
+
+        for item in entry["outputs"]:
+            dst = Path(item["path"])
+            if dst.is_file():
+                stat = dst.stat()
+                if stat.st_size == item["size"] and stat.st_mtime_ns == item["mtime"]:
+                    continue
+                if stat.st_size == item["size"] and hash_file(dst) == item["hash"]:
+                    continue
+            obj = self._object_path(item["hash"])
+            if not obj.exists():
+                return False
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(obj, dst)
+            item["mtime"] = dst.stat().st_mtime_ns
+
+        self._write_entry(key, entry)
+        return True
+
+    def store(self, key: str, outputs: Iterable[Path]) -> None:
+        items = []
+        for path in _output_files(outputs):
+            digest = hash_file(path)
+            obj = self._object_path(digest)
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_name(f"{digest}.{os.getpid()}.tmp")
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, obj)
+            stat = path.stat()
+            items.append({
+                "path": str(path.resolve()),
+                "hash": digest,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns
+            })
+        self._write_entry(key, {"outputs": items})
+
+    def _write_entry(self, key: str, entry: dict) -> None:
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry_path.with_name(f"{key}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entry, indent=1), encoding="utf-8")
+        os.replace(tmp, entry_path)
+
+
+def cache_key(cache: BuildCache, tool_path: str, inputs: List[Path], options: dict, outputs: List[Path]) -> str:
+    return cache.make_key(tool_path, inputs, dict(options, targets=[str(p.resolve()) for p in outputs]))
+
+
+def run_cached(
+    cache: Optional[BuildCache],
+    tool_path: str,
+    inputs: List[Path],
+    options: dict,
+    outputs: List[Path],
+    build: Callable[[], None],
+    extra_outputs: Optional[Callable[[], List[Path]]] = None
+) -> bool:
+    # extra_outputs lists files only known after the build (shared store
+    # objects); they are cached and restored with the entry but are not part
+    # of the key
+    if cache is None:
+        build()
+        return False
+    key = cache_key(cache, tool_path, inputs, options, outputs)
+    if cache.restore(key):
+        cache.hits += 1
+        return True
+    build()
+    cache.store(key, list(outputs) + (extra_outputs() if extra_outputs else []))
+    cache.misses += 1
+    return False
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=os.environ.get(CACHE_ENV),
+        help=f"Build cache directory; skips unchanged inputs (default: ${CACHE_ENV})"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the build cache")
+
+
+def open_cache(args: argparse.Namespace) -> Optional[BuildCache]:
+    if args.no_cache or not args.cache:
+        return None
+    return BuildCache(Path(args.cache))
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import struct
+from typing import List
+
+
+def decode_ega_get_code(src: bytes, pos: int, nib: int) -> tuple[int, int, int]:
+    res = struct.unpack_from(">H", src, pos)[0]
+    if (nib + 1) & 1:
+        res >>= 4
+        return res & 0xFFF, pos + 1, nib + 1
+    return res & 0xFFF, pos + 2, nib + 1
+
+
+def decode_frame1(src: bytes, size: int) -> bytearray:
+    dst = bytearray(size)
+    dst_end = size
+
+    patterns: List[tuple[int, int]] = []
+    num_patterns = 0
+    nib = 0
+    pos = 0
+
+    code, pos, nib = decode_ega_get_code(src, pos, nib)
+    last = code & 0xFF
+
+    dst_pos = 0
+    dst_prev = 0
+    count = 1
+    count_prev = 1
+
+    dst[dst_pos] = last
+    dst_pos += 1
+
+    while dst_pos < dst_end:
+        code, pos, nib = decode_ega_get_code(src, pos, nib)
+        cmd = (code >> 8) & 0xFF
+
+        if cmd:
+            cmd -= 1
+            code = (cmd << 8) | (code & 0xFF)
+            tmp_dst = dst_pos
+
+            if code < num_patterns:
+                src_pos = patterns[code][0]
+                count_prev = patterns[code][1]
+                last = dst[src_pos]
+                for _ in range(count_prev):
+                    dst[dst_pos] = dst[src_pos]
+                    dst_pos += 1
+                    src_pos += 1
+            else:
+                src_pos = dst_prev
+                count = count_prev
+                for _ in range(count_prev):
+                    dst[dst_pos] = dst[src_pos]
+                    dst_pos += 1
+                    src_pos += 1
+                dst[dst_pos] = last
+                dst_pos += 1
+                count_prev += 1
+
+            if num_patterns < 3840:
+                patterns.append((dst_prev, count + 1))
+                num_patterns += 1
+
+            dst_prev = tmp_dst
+            count = count_prev
+        else:
+            last = code & 0xFF
+            dst[dst_pos] = last
+            dst_pos += 1
+
+            if num_patterns < 3840:
+                patterns.append((dst_prev, count + 1))
+                num_patterns += 1
+
+            dst_prev = dst_pos - 1
+            count = 1
+            count_prev = 1
+
+    return dst
+
+
+def decode_frame2(src: bytes, size: int) -> bytearray:
+    # Westwood Format2 (shape data): 0x00 followed by a count is that many
+    # transparent zeros, every other byte is a literal pixel.
+    src = bytes(src)
+    dst = bytearray()
+    pos = 0
+    end = len(src)
+    while pos < end and len(dst) < size:
+        zero = src.find(0, pos)
+        if zero < 0:
+            dst += src[pos:]
+            break
+        dst += src[pos:zero]
+        if zero + 1 >= end:
+            break
+        dst += bytes(src[zero + 1])
+        pos = zero + 2
+    del dst[size:]
+    dst.extend(bytes(size - len(dst)))
+    return dst
+
+
+def decode_frame3(src: bytes, size: int, is_amiga: bool = False) -> bytearray:
+    dst = bytearray(size)
+    dst_pos = 0
+    src_pos = 0
+    dst_end = size
+
+    while dst_pos < dst_end:
+        code = struct.unpack_from("b", src, src_pos)[0]
+        src_pos += 1
+        if code == 0:
+            if is_amiga:
+                sz = struct.unpack_from("<H", src, src_pos)[0]
+            else:
+                sz = struct.unpack_from(">H", src, src_pos)[0]
+            src_pos += 2
+            val = src[src_pos]
+            src_pos += 1
+            dst[dst_pos:dst_pos + sz] = bytes([val]) * sz
+            dst_pos += sz
+        elif code < 0:
+            val = src[src_pos]
+            src_pos += 1
+            dst[dst_pos:dst_pos - code] = bytes([val]) * (-code)
+            dst_pos -= code
+        else:
+            dst[dst_pos:dst_pos + code] = src[src_pos:src_pos + code]
+            dst_pos += code
+            src_pos += code
+
+    return dst
+
+
+def decode_frame4(src: bytes, size: int) -> bytearray:
+    dst = bytearray(size)
+    dst_pos = 0
+    src_pos = 0
+    dst_end = size
+
+    def read_le16(pos: int) -> int:
+        return src[pos] | (src[pos + 1] << 8)
+
+    while True:
+        count = dst_end - dst_pos
+        if count == 0:
+            break
+        code = src[src_pos]
+        src_pos += 1
+
+        if not (code & 0x80):
+            length = min(count, (code >> 4) + 3)
+            offs = ((code & 0x0F) << 8) | src[src_pos]
+            src_pos += 1
+            from_pos = dst_pos - offs
+            for _ in range(length):
+                dst[dst_pos] = dst[from_pos]
+                dst_pos += 1
+                from_pos += 1
+        elif code & 0x40:
+            length = (code & 0x3F) + 3
+            if code == 0xFE:
+                length = read_le16(src_pos)
+                src_pos += 2
+                if length > count:
+                    length = count
+                val = src[src_pos]
+                src_pos += 1
+                dst[dst_pos:dst_pos + length] = bytes([val]) * length
+                dst_pos += length
+            else:
+                if code == 0xFF:
+                    length = read_le16(src_pos)
+                    src_pos += 2
+                offs = read_le16(src_pos)
+                src_pos += 2
+                if length > count:
+                    length = count
+                from_pos = offs
+                for _ in range(length):
+                    dst[dst_pos] = dst[from_pos]
+                    dst_pos += 1
+                    from_pos += 1
+        elif code != 0x80:
+            length = min(count, code & 0x3F)
+            dst[dst_pos:dst_pos + length] = src[src_pos:src_pos + length]
+            src_pos += length
+            dst_pos += length
+        else:
+            break
+
+    return dst
+
+
+def decode_frame_delta(dst: bytearray, src: bytes, no_xor: bool = False) -> None:
+    pos = 0
+    dst_pos = 0
+    dst_len = len(dst)
+    while pos < len(src):
+        code = src[pos]
+        pos += 1
+        if code == 0:
+            if pos + 2 > len(src):
+                break
+            length = src[pos]
+            pos += 1
+            val = src[pos]
+            pos += 1
+            end = min(dst_pos + length, dst_len)
+            if no_xor:
+                for i in range(dst_pos, end):
+                    dst[i] = val
+            else:
+                for i in range(dst_pos, end):
+                    dst[i] ^= val
+            dst_pos = end
+        elif code & 0x80:
+            code -= 0x80
+            if code != 0:
+                dst_pos += code
+            else:
+                if pos + 2 > len(src):
+                    break
+                subcode = struct.unpack_from("<H", src, pos)[0]
+                pos += 2
+                if subcode == 0:
+                    break
+                if subcode & 0x8000:
+                    subcode -= 0x8000
+                    if subcode & 0x4000:
+                        length = subcode - 0x4000
+                        val = src[pos]
+                        pos += 1
+                        end = min(dst_pos + length, dst_len)
+                        if no_xor:
+                            for i in range(dst_pos, end):
+                                dst[i] = val
+                        else:
+                            for i in range(dst_pos, end):
+                                dst[i] ^= val
+                        dst_pos = end
+                    else:
+                        end = min(dst_pos + subcode, dst_len)
+                        if no_xor:
+                            dst[dst_pos:end] = src[pos:pos + (end - dst_pos)]
+                        else:
+                            for i in range(dst_pos, end):
+                                dst[i] ^= src[pos + (i - dst_pos)]
+                        pos += end - dst_pos
+                        dst_pos = end
+                else:
+                    dst_pos += subcode
+        else:
+            end = min(dst_pos + code, dst_len)
+            if no_xor:
+                dst[dst_pos:end] = src[pos:pos + (end - dst_pos)]
+            else:
+                for i in range(dst_pos, end):
+                    dst[i] ^= src[pos + (i - dst_pos)]
+            pos += end - dst_pos
+            dst_pos = end
+
+
+def decode_image(comp_type: int, src: bytes, size: int) -> bytearray:
+    if comp_type == 0:
+        return bytearray(src[:size])
+    if comp_type == 1:
+        return decode_frame1(src, size)
+    if comp_type == 3:
+        return decode_frame3(src, size, is_amiga=False)
+    if comp_type == 4:
+        return decode_frame4(src, size)
+    raise ValueError(f"Unsupported compression type: {comp_type}")
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import base64
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .codecs import decode_image
+from .output import IMAGE_FORMATS, write_bytes, write_image, write_json_file
+from .palette import Palette, load_palette, palette_from_bytes
+from .pixels import crop, trim_bounds
+from .timings import stage
+
+CPS_BIN_MAGIC = b"KCPS"
+CPS_BIN_VERSION = 1
+# magic, version, width, height, compType, flags, palSize, imgSize, paletteOffset, pixelsOffset
+CPS_BIN_HEADER = struct.Struct("<4sHHHBBHIII")
+CPS_BIN_ALIGN = 32
+CPS_BIN_FLAG_PALETTE = 0x01
+
+
+def encode_cps(pixels: bytes, comp_type: int = 4, palette_raw: bytes = b"", effort: int = 4) -> bytes:
+    from .encoders import encode_image
+
+    payload = encode_image(comp_type, pixels, effort)
+    body = struct.pack("<HIH", comp_type, len(pixels), len(palette_raw)) + bytes(palette_raw) + payload
+    return struct.pack("<H", len(body)) + body
+
+
+def read_cps(path: Path, width: Optional[int], height: Optional[int], palette_path: Optional[Path], data: Optional[bytes] = None) -> dict:
+    name = path.stem.upper()
+    if data is None:
+        with stage("read", name) as st:
+            data = path.read_bytes()
+            st["bytesOut"] = len(data)
+    if len(data) < 10:
+        raise ValueError("CPS too small")
+
+    comp_type = data[2]
+    img_size = struct.unpack_from("<I", data, 4)[0]
+    pal_size = struct.unpack_from("<H", data, 8)[0]
+
+    if img_size == 64000 and (width is None or height is None):
+        width = 320
+        height = 200
+
+    if width is None or height is None:
+        raise ValueError("Width/height must be provided for CPS decode")
+
+    if comp_type not in (0, 1, 3, 4):
+        raise ValueError(f"Unsupported CPS compression: {comp_type}")
+
+    src_ptr = 10 + pal_size
+    payload = data[src_ptr:src_ptr + img_size + 16]
+    # Explicit dimensions win over the header size so a cropped or padded
+    # decode always yields exactly width * height indices.
+    decode_size = width * height
+    with stage("decompress", name, len(payload)) as st:
+        pixels = decode_image(comp_type, payload, decode_size)
+        st["bytesOut"] = len(pixels)
+
+    palette: Optional[Palette] = None
+    with stage("palette", name, pal_size):
+        if pal_size:
+            palette = palette_from_bytes(data[10:10 + pal_size])
+        elif palette_path:
+            palette = load_palette(palette_path)
+
+    return {
+        "name": name,
+        "width": width,
+        "height": height,
+        "compType": comp_type,
+        "imgSize": img_size,
+        "palSize": pal_size,
+        "palette": palette,
+        "pixels": pixels
+    }
+
+
+def cps_json_payload(image: dict) -> dict:
+    return {
+        "format": "kyra-cps",
+        "width": image["width"],
+        "height": image["height"],
+        "compType": image["compType"],
+        "imgSize": image["imgSize"],
+        "palSize": image["palSize"],
+        "palette": image["palette"].as_list() if image["palette"] else [],
+        "rawBase64": base64.b64encode(bytes(image["pixels"])).decode("ascii")
+    }
+
+
+def align_up(value: int, align: int) -> int:
+    return (value + align - 1) // align * align
+
+
+def encode_cps_bin(image: dict) -> bytes:
+    # Fixed 768-byte 8-bit palette followed by the indexed pixels, both aligned
+    # so the engine can view them as Uint8Array without copying.
+    palette = image["palette"].rgb.ljust(768, b"\x00") if image["palette"] else bytes(768)
+    pixels = bytes(image["pixels"])
+    palette_offset = align_up(CPS_BIN_HEADER.size, CPS_BIN_ALIGN)
+    pixels_offset = align_up(palette_offset + len(palette), CPS_BIN_ALIGN)
+    flags = CPS_BIN_FLAG_PALETTE if image["palette"] else 0
+
+    out = bytearray(pixels_offset + len(pixels))
+    CPS_BIN_HEADER.pack_into(
+        out,
+        0,
+        CPS_BIN_MAGIC,
+        CPS_BIN_VERSION,
+        image["width"],
+        image["height"],
+        image["compType"],
+        flags,
+        image["palSize"],
+        image["imgSize"],
+        palette_offset,
+        pixels_offset
+    )
+    out[palette_offset:palette_offset + len(palette)] = palette
+    out[pixels_offset:] = pixels
+    return bytes(out)
+
+
+def cps_bin_header_json(image: dict, bin_name: str, bin_data: bytes) -> dict:
+    header = CPS_BIN_HEADER.unpack_from(bin_data, 0)
+    return {
+        "format": "kyra-cps-bin",
+        "width": image["width"],
+        "height": image["height"],
+        "compType": image["compType"],
+        "imgSize": image["imgSize"],
+        "palSize": image["palSize"],
+        "hasPalette": bool(header[5] & CPS_BIN_FLAG_PALETTE),
+        "raw": {
+            "file": bin_name,
+            "paletteOffset": header[8],
+            "pixelsOffset": header[9],
+            "size": len(bin_data)
+        }
+    }
+
+
+def png_to_indices(path: Path, palette: Optional[Palette], transparent_index: int = 0) -> tuple[int, int, bytes]:
+    # Indexed PNGs keep their indices; RGB(A) ones are mapped back through the
+    # palette (exact colour first, nearest otherwise, alpha 0 -> transparent_index).
+    from PIL import Image
+
+    img = Image.open(path)
+    width, height = img.size
+    if img.mode == "P":
+        return width, height, img.tobytes()
+    if palette is None:
+        raise ValueError(f"{path.name} is not an indexed PNG, a palette is required")
+
+    rgb = palette.rgb.ljust(768, b"\x00")
+    colors = [tuple(rgb[i:i + 3]) for i in range(0, 768, 3)]
+    lookup: Dict[bytes, int] = {}
+    for index in range(255, -1, -1):
+        lookup[bytes(colors[index]) + b"\xff"] = index
+
+    def nearest(key: bytes) -> int:
+        if key[3] == 0:
+            return transparent_index
+        r, g, b = key[0], key[1], key[2]
+        return min(range(256), key=lambda i: (colors[i][0] - r) ** 2 + (colors[i][1] - g) ** 2 + (colors[i][2] - b) ** 2)
+
+    data = img.convert("RGBA").tobytes()
+    out = bytearray(width * height)
+    for i in range(width * height):
+        key = data[i * 4:i * 4 + 4]
+        index = lookup.get(key)
+        if index is None:
+            index = lookup[key] = nearest(key)
+        out[i] = index
+    return width, height, bytes(out)
+
+
+def write_cps_image(fmt: str, image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_image(fmt, dst, image["width"], image["height"], image["pixels"], image["palette"], level=level, asset=image["name"])
+
+
+def write_png(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_cps_image("png", image, dst, level)
+
+
+def write_indexed_png(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_cps_image("indexed-png", image, dst, level)
+
+
+def write_webp(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_cps_image("webp", image, dst, level)
+
+
+def write_raw(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_cps_image("raw", image, dst, level)
+
+
+def write_json(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_json_file(dst, cps_json_payload(image), image["name"])
+
+
+def _encode_bin(image: dict) -> bytes:
+    with stage("encode", image["name"], len(image["pixels"])) as st:
+        data = encode_cps_bin(image)
+        st["bytesOut"] = len(data)
+    return data
+
+
+def write_bin(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    write_bytes(dst, _encode_bin(image), image["name"])
+
+
+def write_json_bin(image: dict, dst: Path, level: Optional[int] = None) -> None:
+    bin_path = dst.with_suffix(".bin")
+    bin_data = _encode_bin(image)
+    write_bytes(bin_path, bin_data, image["name"])
+    write_json_file(dst, cps_bin_header_json(image, bin_path.name, bin_data), image["name"])
+
+
+def crop_rows(image: dict, x: int, y: int, w: int, h: int) -> bytes:
+    return crop(image["pixels"], image["width"], image["height"], x, y, w, h)
+
+
+def write_sprites(
+    image: dict,
+    dst_dir: Path,
+    sprite_defs: List[dict],
+    fmt: str = "png",
+    level: Optional[int] = None,
+    trim: bool = False
+) -> None:
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    palette = image["palette"]
+    entries = []
+    for sprite in sprite_defs:
+        x, y, w, h = sprite["x"], sprite["y"], sprite["w"], sprite["h"]
+        w = max(0, min(w, image["width"] - x))
+        h = max(0, min(h, image["height"] - y))
+        if w == 0 or h == 0:
+            continue
+        pixels = crop_rows(image, x, y, w, h)
+        entry = {"id": sprite["id"], "x": 0, "y": 0, "w": w, "h": h, "fullWidth": w, "fullHeight": h}
+        if trim:
+            # Scene shapes use index 0 as the transparent colour
+            bounds = trim_bounds(pixels, w, h, 0)
+            if bounds is None:
+                continue
+            tx, ty, tw, th = bounds
+            pixels = crop(pixels, w, h, tx, ty, tw, th)
+            entry.update(x=tx, y=ty, w=tw, h=th)
+            w, h = tw, th
+        dst = dst_dir / f"{sprite['id']:03d}{IMAGE_FORMATS[fmt].suffix}"
+        write_image(fmt, dst, w, h, pixels, palette, 0, level, image["name"])
+        entries.append({"file": dst.name, **entry})
+    if trim:
+        # x/y are the offsets of the trimmed box inside the spriteDef rectangle
+        write_json_file(dst_dir / "sprites.json", {"sprites": entries}, image["name"])
+
+
+CPS_WRITERS: Dict[str, tuple[str, Callable[..., None]]] = {
+    "png": (".png", write_png),
+    "indexed-png": ("_indexed.png", write_indexed_png),
+    "webp": (".webp", write_webp),
+    "raw": ("_indexed.bin", write_raw),
+    "json": (".json", write_json),
+    "bin": (".bin", write_bin),
+    "json-bin": (".json", write_json_bin)
+}
+
+
+def cps_output_paths(dst_dir: Path, name: str, outputs: List[str], sprites: bool) -> List[Path]:
+    paths = [dst_dir / f"{name}{CPS_WRITERS[output][0]}" for output in outputs]
+    if "json-bin" in outputs:
+        paths.append(dst_dir / f"{name}.bin")
+    if sprites:
+        paths.append(dst_dir / f"{name}_sprites")
+    return list(dict.fromkeys(paths))
+
+
+def export_cps(
+    path: Path,
+    dst_dir: Path,
+    outputs: List[str],
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    palette_path: Optional[Path] = None,
+    sprite_defs: Optional[List[dict]] = None,
+    level: Optional[int] = None,
+    trim: bool = False,
+    data: Optional[bytes] = None
+) -> List[Path]:
+    image = read_cps(path, width, height, palette_path, data)
+    written: List[Path] = []
+    for output in outputs:
+        suffix, writer = CPS_WRITERS[output]
+        dst = dst_dir / f"{image['name']}{suffix}"
+        writer(image, dst, level)
+        written.append(dst)
+    if sprite_defs:
+        sprite_dir = dst_dir / f"{image['name']}_sprites"
+        write_sprites(image, sprite_dir, sprite_defs, level=level, trim=trim)
+        written.append(sprite_dir)
+    return written
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+
+def encode_frame1(src: bytes) -> bytes:
+    # Westwood EGA LZW: 12-bit big-endian codes, 0-255 are literals and
+    # 256 + n refers to dictionary entry n (at most 3840 entries).
+    if not src:
+        return b""
+    codes: List[int] = []
+    patterns: Dict[bytes, int] = {}
+    num_patterns = 0
+    pos = 0
+    size = len(src)
+    while pos < size:
+        end = pos + 1
+        while end < size and bytes(src[pos:end + 1]) in patterns:
+            end += 1
+        word = bytes(src[pos:end])
+        codes.append(word[0] if len(word) == 1 else 256 + patterns[word])
+        pos = end
+        # The decoder adds "previous word + first byte of this one" for every
+        # code, duplicates included, so the numbering has to follow it exactly.
+        if pos < size and num_patterns < 3840:
+            patterns.setdefault(word + src[pos:pos + 1], num_patterns)
+            num_patterns += 1
+
+    out = bytearray()
+    for i in range(0, len(codes), 2):
+        a = codes[i]
+        b = codes[i + 1] if i + 1 < len(codes) else 0
+        out.extend(bytes(((a >> 4) & 0xFF, ((a & 0x0F) << 4) | ((b >> 8) & 0x0F), b & 0xFF)))
+    # The decoder always reads a 16-bit word
+    out.extend(b"\x00\x00")
+    return bytes(out)
+
+
+def encode_frame2(src: bytes) -> bytes:
+    # Format2: literals, with zero runs stored as 0x00 <count> (max 255)
+    src = bytes(src)
+    out = bytearray()
+    pos = 0
+    size = len(src)
+    while pos < size:
+        zero = src.find(0, pos)
+        if zero < 0:
+            out += src[pos:]
+            break
+        out += src[pos:zero]
+        run = src[zero:zero + 255]
+        count = len(run) - len(run.lstrip(b"\x00"))
+        out += bytes((0, count))
+        pos = zero + count
+    return bytes(out)
+
+
+def encode_frame3(src: bytes, is_amiga: bool = False) -> bytes:
+    out = bytearray()
+    size = len(src)
+    pos = 0
+    literal_start = 0
+
+    def flush_literals(end: int) -> None:
+        start = literal_start
+        while start < end:
+            count = min(127, end - start)
+            out.append(count)
+            out.extend(src[start:start + count])
+            start += count
+
+    while pos < size:
+        val = src[pos]
+        run = 1
+        while pos + run < size and src[pos + run] == val and run < 0xFFFF:
+            run += 1
+        if run < 3:
+            pos += run
+            continue
+        flush_literals(pos)
+        if run <= 128:
+            out.append((-run) & 0xFF)
+            out.append(val)
+        else:
+            out.append(0)
+            out.extend(run.to_bytes(2, "little" if is_amiga else "big"))
+            out.append(val)
+        pos += run
+        literal_start = pos
+    flush_literals(size)
+    return bytes(out)
+
+
+def _match_length(src: bytes, a: int, b: int, limit: int) -> int:
+    # Compare in growing slices first; Python-level byte loops only for the
+    # final partial block.
+    length = 0
+    step = 16
+    while length < limit:
+        n = min(step, limit - length)
+        if src[a + length:a + length + n] == src[b + length:b + length + n]:
+            length += n
+            step <<= 1
+            continue
+        while length < limit and src[a + length] == src[b + length]:
+            length += 1
+        break
+    return length
+
+
+def _find_match(src: bytes, pos: int, size: int, head: Dict[bytes, int], chain: List[int], max_chain: int) -> tuple[int, int]:
+    best_len = 0
+    best_pos = -1
+    if pos + 3 > size:
+        return best_pos, best_len
+    limit = min(size - pos, 0xFFFF)
+    cand = head.get(src[pos:pos + 3], -1)
+    tries = max_chain
+    while cand >= 0 and tries:
+        tries -= 1
+        # Absolute copies only address the first 64K of output, beyond that
+        # only short relative copies reach back.
+        if cand > 0xFFFF:
+            if pos - cand <= 0xFFF and best_len < 10:
+                length = _match_length(src, cand, pos, min(limit, 10))
+                if length > best_len:
+                    best_len = length
+                    best_pos = cand
+        elif best_len < limit and src[cand + best_len] == src[pos + best_len]:
+            length = _match_length(src, cand, pos, limit)
+            if length > best_len:
+                best_len = length
+                best_pos = cand
+                if length == limit:
+                    break
+        cand = chain[cand]
+    return best_pos, best_len
+
+
+def encode_frame4(src: bytes, effort: int = 4) -> bytes:
+    # Format80 (LCW) with hash-chain match finding. effort 0 only emits fills
+    # and literals, higher levels walk 2**(effort-1) chain entries, from 5 up
+    # hash every copied position and from 6 up also try one-byte lazy matching.
+    src = bytes(src)
+    size = len(src)
+    out = bytearray()
+    literals = bytearray()
+    head: Dict[bytes, int] = {}
+    chain = [-1] * size
+    max_chain = (1 << (effort - 1)) if effort > 0 else 0
+    lazy = effort >= 6
+    # Positions hashed from inside a copy; low levels only keep its tail
+    insert_limit = 0xFFFF if effort >= 5 else 8
+    pos = 0
+
+    def flush_literals() -> None:
+        for start in range(0, len(literals), 63):
+            chunk = literals[start:start + 63]
+            out.append(0x80 | len(chunk))
+            out.extend(chunk)
+        literals.clear()
+
+    def insert(start: int, end: int) -> None:
+        if not max_chain:
+            return
+        start = max(start, end - insert_limit)
+        for i in range(start, min(end, size - 2)):
+            key = src[i:i + 3]
+            chain[i] = head.get(key, -1)
+            head[key] = i
+
+    def cost(offs: int, length: int) -> int:
+        if offs <= 0xFFF and length <= 10:
+            return 2
+        return 3 if length <= 64 else 5
+
+    while pos < size:
+        run = 1 + _match_length(src, pos, pos + 1, min(size - pos - 1, 0xFFFE)) if pos + 1 < size else 1
+        match_pos, match_len = (-1, 0)
+        if max_chain:
+            match_pos, match_len = _find_match(src, pos, size, head, chain, max_chain)
+        if match_len >= 3 and cost(pos - match_pos, match_len) >= match_len:
+            match_len = 0
+        if lazy and match_len >= 3 and run < 4:
+            _next_pos, next_len = _find_match(src, pos + 1, size, head, chain, max_chain)
+            if next_len > match_len + 1:
+                literals.append(src[pos])
+                insert(pos, pos + 1)
+                pos += 1
+                continue
+
+        if run >= 4 and run >= match_len:
+            flush_literals()
+            out.append(0xFE)
+            out.extend(run.to_bytes(2, "little"))
+            out.append(src[pos])
+            insert(pos + run - 3, pos + run)
+            pos += run
+        elif match_len >= 3:
+            flush_literals()
+            offs = pos - match_pos
+            if offs <= 0xFFF and match_len <= 10:
+                out.append(((match_len - 3) << 4) | (offs >> 8))
+                out.append(offs & 0xFF)
+            elif match_len <= 64:
+                out.append(0xC0 | (match_len - 3))
+                out.extend(match_pos.to_bytes(2, "little"))
+            else:
+                out.append(0xFF)
+                out.extend(match_len.to_bytes(2, "little"))
+                out.extend(match_pos.to_bytes(2, "little"))
+            insert(pos, pos + match_len)
+            pos += match_len
+        else:
+            literals.append(src[pos])
+            insert(pos, pos + 1)
+            pos += 1
+    flush_literals()
+    out.append(0x80)
+    return bytes(out)
+
+
+def encode_frame_delta(prev: bytes, cur: bytes) -> bytes:
+    # Format40: XOR delta against the previous frame with skip, fill and copy
+    # commands, terminated by 0x80 0x0000.
+    xor = bytes(a ^ b for a, b in zip(prev, cur))
+    out = bytearray()
+    size = len(xor)
+    pos = 0
+
+    def skip(count: int) -> None:
+        while count:
+            if count <= 0x7F:
+                out.append(0x80 | count)
+                return
+            step = min(count, 0x7FFF)
+            out.append(0x80)
+            out.extend(step.to_bytes(2, "little"))
+            count -= step
+
+    def fill(count: int, val: int) -> None:
+        while count:
+            if count <= 0xFF:
+                out.extend(bytes((0, count, val)))
+                return
+            step = min(count, 0x3FFF)
+            out.append(0x80)
+            out.extend((0xC000 | step).to_bytes(2, "little"))
+            out.append(val)
+            count -= step
+
+    def copy(start: int, end: int) -> None:
+        while start < end:
+            count = end - start
+            if count <= 0x7F:
+                out.append(count)
+            else:
+                count = min(count, 0x3FFF)
+                out.append(0x80)
+                out.extend((0x8000 | count).to_bytes(2, "little"))
+            out.extend(xor[start:start + count])
+            start += count
+
+    while pos < size:
+        val = xor[pos]
+        run = 1
+        while pos + run < size and xor[pos + run] == val:
+            run += 1
+        if val == 0:
+            if pos + run < size:
+                skip(run)
+            pos += run
+            continue
+        if run >= 3:
+            fill(run, val)
+            pos += run
+            continue
+        start = pos
+        while pos < size:
+            val = xor[pos]
+            run = 1
+            while pos + run < size and xor[pos + run] == val:
+                run += 1
+            if val == 0 or run >= 3:
+                break
+            pos += run
+        copy(start, pos)
+
+    out.extend(b"\x80\x00\x00")
+    return bytes(out)
+
+
+def encode_image(comp_type: int, pixels: bytes, effort: int = 4) -> bytes:
+    if comp_type == 0:
+        return bytes(pixels)
+    if comp_type == 1:
+        return encode_frame1(pixels)
+    if comp_type == 3:
+        return encode_frame3(pixels)
+    if comp_type == 4:
+        return encode_frame4(pixels, effort)
+    raise ValueError(f"Unsupported compression type: {comp_type}")
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import struct
+from typing import Optional
+
+from .palette import PALETTE_SIZE, Palette
+
+FADE_MAGIC = b"KFAD"
+FADE_VERSION = 1
+# magic, version, steps, flags, colours, toBlackOffset, toTargetOffset
+FADE_HEADER = struct.Struct("<4sHHHHII")
+FADE_ALIGN = 32
+FADE_FLAG_TARGET = 0x01
+FADE_STEPS = 16
+
+
+def fade_steps(src: bytes, dst: bytes, steps: int) -> bytes:
+    # Steps 1..N of a linear RGB blend from src to dst; step N equals dst.
+    out = bytearray()
+    for step in range(1, steps + 1):
+        out.extend((a * (steps - step) + b * step + steps // 2) // steps for a, b in zip(src, dst))
+    return bytes(out)
+
+
+def build_fade_table(palette: Palette, target: Optional[Palette] = None, steps: int = FADE_STEPS) -> bytes:
+    # Header, the source palette, N steps toward black and, with a target,
+    # N steps toward it. Every block is 768 bytes of 8-bit RGB, so the engine
+    # can take Uint8Array views without copying.
+    base = palette.rgb.ljust(PALETTE_SIZE, b"\x00")
+    to_black = fade_steps(base, bytes(PALETTE_SIZE), steps)
+    to_target = fade_steps(base, target.rgb.ljust(PALETTE_SIZE, b"\x00"), steps) if target else b""
+    base_offset = (FADE_HEADER.size + FADE_ALIGN - 1) // FADE_ALIGN * FADE_ALIGN
+    black_offset = base_offset + PALETTE_SIZE
+    target_offset = black_offset + len(to_black) if target else 0
+    flags = FADE_FLAG_TARGET if target else 0
+    header = FADE_HEADER.pack(FADE_MAGIC, FADE_VERSION, steps, flags, PALETTE_SIZE // 3, black_offset, target_offset)
+    return header.ljust(base_offset, b"\x00") + base + to_black + to_target
+
+
+def parse_fade_table(data: bytes) -> dict:
+    magic, version, steps, flags, colors, black_offset, target_offset = FADE_HEADER.unpack_from(data, 0)
+    if magic != FADE_MAGIC or version != FADE_VERSION:
+        raise ValueError("Not a kyra fade table")
+    size = colors * 3
+
+    def block(offset: int) -> list:
+        return [data[offset + i * size:offset + (i + 1) * size] for i in range(steps)]
+
+    return {
+        "steps": steps,
+        "base": data[black_offset - size:black_offset],
+        "toBlack": block(black_offset),
+        "toTarget": block(target_offset) if flags & FADE_FLAG_TARGET else []
+    }
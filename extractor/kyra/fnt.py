@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import List, Optional
+
+from .output import IMAGE_FORMATS, write_image, write_json_file
+from .palette import Palette
+from .timings import stage
+
+FNT_SIGNATURE = 0x500
+FNT_HEADER = struct.Struct("<HHHHHHH")
+# Glyph pixels are 4-bit colour numbers: 0 is transparent, 1 the text colour
+# and the rest shades the game remaps per call. The RGBA atlas renders them
+# as a white-to-grey ramp so the engine can tint it.
+FONT_PALETTE = Palette(bytes(c for v in range(256) for c in (max(0, 255 - max(0, v - 1) * 17),) * 3), "font", scale=False)
+
+_LOW = bytes(v & 0x0F for v in range(256))
+_HIGH = bytes(v >> 4 for v in range(256))
+
+
+def parse_fnt(data: bytes) -> dict:
+    if len(data) < FNT_HEADER.size:
+        raise ValueError("Font file too small")
+    _size, signature, desc, bitmaps, widths, _unused, heights = FNT_HEADER.unpack_from(data, 0)
+    if signature != FNT_SIGNATURE:
+        raise ValueError(f"Not a Westwood font (signature 0x{signature:04X})")
+    count = data[desc + 3] + 1
+    height = data[desc + 4]
+    max_width = data[desc + 5]
+
+    glyphs: List[Optional[bytes]] = []
+    glyph_widths: List[int] = []
+    for code in range(count):
+        width = data[widths + code]
+        glyph_widths.append(width)
+        if not width:
+            glyphs.append(None)
+            continue
+        offset = struct.unpack_from("<H", data, bitmaps + code * 2)[0]
+        top = data[heights + code * 2]
+        rows = data[heights + code * 2 + 1]
+        pitch = (width + 1) // 2
+        pixels = bytearray(width * height)
+        for row in range(min(rows, height - top)):
+            packed = data[offset + row * pitch:offset + (row + 1) * pitch]
+            line = bytearray(pitch * 2)
+            line[0::2] = packed.translate(_LOW)
+            line[1::2] = packed.translate(_HIGH)
+            start = (top + row) * width
+            pixels[start:start + width] = line[:width]
+        glyphs.append(bytes(pixels))
+    return {"height": height, "maxWidth": max_width, "widths": glyph_widths, "glyphs": glyphs}
+
+
+def read_fnt(path: Path) -> dict:
+    name = path.stem.upper()
+    with stage("read", name) as st:
+        data = path.read_bytes()
+        st["bytesOut"] = len(data)
+    with stage("decompress", name, len(data)) as st:
+        font = parse_fnt(data)
+        st["bytesOut"] = sum(len(g) for g in font["glyphs"] if g)
+    font["name"] = name
+    return font
+
+
+def build_font_atlas(font: dict, max_width: int = 256, padding: int = 1) -> dict:
+    # Glyph cells keep the full font height, so every glyph is drawn from
+    # its (x, y) with the same height and blank rows need no offset table.
+    height = font["height"]
+    cells: List[List[int]] = []
+    x = 0
+    y = 0
+    used_w = 0
+    for width, glyph in zip(font["widths"], font["glyphs"]):
+        if glyph is None or glyph.count(0) == len(glyph):
+            # Blank glyphs (space) only advance the pen
+            cells.append([-1, 0, width])
+            continue
+        if x and x + width > max_width:
+            x = 0
+            y += height + padding
+        cells.append([x, y, width])
+        used_w = max(used_w, x + width)
+        x += width + padding
+    atlas_h = y + height if used_w else 0
+    pixels = bytearray(used_w * atlas_h)
+    for (gx, gy, width), glyph in zip(cells, font["glyphs"]):
+        if glyph is None or glyph.count(0) == len(glyph):
+            continue
+        for row in range(height):
+            start = (gy + row) * used_w + gx
+            pixels[start:start + width] = glyph[row * width:(row + 1) * width]
+    return {"width": used_w, "height": atlas_h, "pixels": bytes(pixels), "glyphs": cells}
+
+
+def write_font(font: dict, dst_dir: Path, fmt: str = "png", level: Optional[int] = None) -> List[Path]:
+    name = font["name"]
+    atlas = build_font_atlas(font)
+    image_path = dst_dir / f"{name}{IMAGE_FORMATS[fmt].suffix}"
+    table_path = dst_dir / f"{name}.json"
+    write_image(fmt, image_path, atlas["width"], atlas["height"], atlas["pixels"], FONT_PALETTE, 0, level, name)
+    # glyphs[code] = [x, y, width] in the atlas; width is also the advance
+    # and x is -1 for glyphs with nothing to draw.
+    # Codes follow the latin-1 strings from emc_text_to_json.py.
+    payload = {
+        "format": "kyra-font",
+        "image": image_path.name,
+        "height": font["height"],
+        "maxWidth": font["maxWidth"],
+        "glyphs": atlas["glyphs"]
+    }
+    write_json_file(table_path, payload, name)
+    return [image_path, table_path]
+
+
+def build_fnt(glyphs: List[Optional[tuple[int, bytes]]], height: int) -> bytes:
+    # glyphs[code] = (width, width * height colour numbers) or None
+    count = len(glyphs)
+    desc = FNT_HEADER.size
+    bitmaps = desc + 6
+    widths = bitmaps + count * 2
+    heights = widths + count
+    body_start = heights + count * 2
+    offsets: List[int] = []
+    width_table = bytearray()
+    height_table = bytearray()
+    body = bytearray()
+    for glyph in glyphs:
+        if glyph is None:
+            offsets.append(0)
+            width_table.append(0)
+            height_table.extend(b"\x00\x00")
+            continue
+        width, pixels = glyph
+        rows = [pixels[r * width:(r + 1) * width] for r in range(height)]
+        used = [r for r, line in enumerate(rows) if any(line)]
+        top = used[0] if used else 0
+        count_rows = used[-1] - top + 1 if used else 0
+        offsets.append(body_start + len(body))
+        width_table.append(width)
+        height_table.extend((top, count_rows))
+        for line in rows[top:top + count_rows]:
+            line = bytes(line) + b"\x00"
+            body.extend((line[i] & 0x0F) | ((line[i + 1] & 0x0F) << 4) for i in range(0, width, 2))
+    max_width = max((g[0] for g in glyphs if g), default=0)
+    out = bytearray(FNT_HEADER.pack(0, FNT_SIGNATURE, desc, bitmaps, widths, 0, heights))
+    out.extend(bytes((0, 0, 0, count - 1, height, max_width)))
+    out.extend(struct.pack(f"<{count}H", *offsets))
+    out.extend(width_table)
+    out.extend(height_table)
+    out.extend(body)
+    struct.pack_into("<H", out, 0, len(out))
+    return bytes(out)
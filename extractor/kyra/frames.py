@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import weakref
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from .palette import PALETTE_SIZE, Palette
+from .timings import stage
+
+FRAMES_MAGIC = b"KFRM"
+FRAMES_VERSION = 1
+FRAMES_SUFFIX = ".frames"
+# magic, version, flags, frame count, width, height, data offset, index table
+# offset, SHA-1 of the source file, palette key (ASCII, zero padded)
+FRAMES_HEADER = struct.Struct("<4sHHIHHII20s40s")
+FLAG_PALETTE = 1
+# Frames start on this boundary so a raw view of one never straddles pages
+# more than needed
+FRAMES_ALIGN = 64
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def source_digest(data: bytes) -> bytes:
+    return hashlib.sha1(data).digest()
+
+
+class FramesWriter:
+    # Streams frames as they are decoded: header and palette first, frames
+    # back to back, then the table of WSA frame indices; the header is
+    # rewritten with the final count on close.
+    def __init__(self, path: Path, width: int, height: int, palette: Optional[Palette], source: bytes) -> None:
+        self.path = path
+        self.width = width
+        self.height = height
+        self.palette = palette
+        self.source = source
+        self.indices: List[int] = []
+        self.data_offset = (FRAMES_HEADER.size + PALETTE_SIZE + FRAMES_ALIGN - 1) // FRAMES_ALIGN * FRAMES_ALIGN
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self.file: BinaryIO = open(self.tmp, "wb")
+        self.file.write(bytes(self.data_offset))
+
+    def add(self, index: int, pixels: Buffer) -> None:
+        if len(pixels) != self.width * self.height:
+            raise ValueError(f"Frame {index} has {len(pixels)} pixels, expected {self.width * self.height}")
+        self.indices.append(index)
+        self.file.write(pixels)
+
+    def close(self) -> None:
+        table_offset = self.data_offset + len(self.indices) * self.width * self.height
+        self.file.write(struct.pack(f"<{len(self.indices)}H", *self.indices))
+        flags = FLAG_PALETTE if self.palette is not None else 0
+        key = self.palette.key.encode("ascii")[:40] if self.palette is not None else b""
+        header = FRAMES_HEADER.pack(
+            FRAMES_MAGIC, FRAMES_VERSION, flags, len(self.indices), self.width, self.height, self.data_offset, table_offset, self.source, key
+        )
+        rgb = self.palette.rgb.ljust(PALETTE_SIZE, b"\x00") if self.palette is not None else bytes(PALETTE_SIZE)
+        self.file.seek(0)
+        self.file.write(header + rgb)
+        self.file.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self) -> None:
+        self.file.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+class FrameFile:
+    # Random access to the frames of a .frames buffer: an mmap (open_frames)
+    # or bytes already in memory. frame() copies one frame, view() does not:
+    # views are only valid until close(), which releases them before
+    # unmapping. Slices taken from a view must be released first.
+    def __init__(self, buffer: Buffer, name: str = "") -> None:
+        if len(buffer) < FRAMES_HEADER.size + PALETTE_SIZE:
+            raise ValueError(f"Frames file too small: {name}")
+        magic, version, flags, count, width, height, data_offset, table_offset, source, key = FRAMES_HEADER.unpack_from(buffer, 0)
+        if magic != FRAMES_MAGIC:
+            raise ValueError(f"Not a frames file: {name}")
+        if version != FRAMES_VERSION:
+            raise ValueError(f"Unsupported frames version {version}: {name}")
+        frame_size = width * height
+        if table_offset != data_offset + count * frame_size or len(buffer) < table_offset + 2 * count:
+            raise ValueError(f"Truncated frames file: {name}")
+        self.buffer = buffer
+        self.name = name
+        self.count = count
+        self.width = width
+        self.height = height
+        self.frame_size = frame_size
+        self.data_offset = data_offset
+        self.source = source
+        self.views: weakref.WeakSet = weakref.WeakSet()
+        self.indices = list(struct.unpack_from(f"<{count}H", buffer, table_offset))
+        self.palette: Optional[Palette] = None
+        if flags & FLAG_PALETTE:
+            rgb = bytes(buffer[FRAMES_HEADER.size:FRAMES_HEADER.size + PALETTE_SIZE])
+            self.palette = Palette(rgb, key.rstrip(b"\x00").decode("ascii"), scale=False)
+
+    def matches(self, data: bytes) -> bool:
+        return self.source == source_digest(data)
+
+    def _span(self, slot: int) -> Tuple[int, int]:
+        if not 0 <= slot < self.count:
+            raise IndexError(f"Frame slot {slot} out of range ({self.count} frames)")
+        start = self.data_offset + slot * self.frame_size
+        return start, start + self.frame_size
+
+    def frame(self, slot: int) -> bytes:
+        start, end = self._span(slot)
+        return bytes(self.buffer[start:end])
+
+    def view(self, slot: int) -> memoryview:
+        start, end = self._span(slot)
+        with memoryview(self.buffer) as whole:
+            view = whole[start:end]
+        self.views.add(view)
+        return view
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int, bytes]]:
+        # Same shape as iter_wsa_frames: (WSA frame index, width, height, pixels)
+        for slot, index in enumerate(self.indices):
+            yield index, self.width, self.height, self.frame(slot)
+
+    def close(self) -> None:
+        for view in list(self.views):
+            view.release()
+        self.views.clear()
+        if isinstance(self.buffer, mmap.mmap) and not self.buffer.closed:
+            try:
+                self.buffer.close()
+            except BufferError:
+                raise BufferError(f"{self.name}: a slice of a frame view is still alive, release it before close()") from None
+
+    def __enter__(self) -> "FrameFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_frames(path: Path) -> FrameFile:
+    name = path.stem.upper()
+    with stage("read", name) as st:
+        with open(path, "rb") as f:
+            # mmap refuses empty files with a bare ValueError
+            if os.fstat(f.fileno()).st_size < FRAMES_HEADER.size + PALETTE_SIZE:
+                raise ValueError(f"Frames file too small: {name}")
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        st["bytesOut"] = FRAMES_HEADER.size
+    try:
+        return FrameFile(buffer, name)
+    except ValueError:
+        buffer.close()
+        raise
+
+
+def is_frames_file(path: Path) -> bool:
+    return path.suffix.lower() == FRAMES_SUFFIX
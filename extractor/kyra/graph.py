@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class Task:
+    def __init__(
+        self,
+        key: str,
+        func: Callable,
+        args: tuple = (),
+        deps: Iterable[str] = (),
+        scene: Optional[str] = None,
+        then: Optional[Callable[[object], List["Task"]]] = None
+    ) -> None:
+        self.key = key
+        self.func = func
+        self.args = args
+        self.deps = list(deps)
+        self.scene = scene
+        # Runs in the driver process with the task result and may add tasks
+        self.then = then
+
+
+def _timed_call(func: Callable, args: tuple) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class GraphRunner:
+    def __init__(self, jobs: Optional[int] = None, progress: bool = True, pool: Optional[Executor] = None) -> None:
+        self.jobs = jobs
+        self.progress = progress
+        # A long-lived pool (watch mode) is reused instead of spawning one per run
+        self.pool = pool
+        self.pending: Dict[str, Task] = {}
+        self.results: Dict[str, object] = {}
+        self.failed: Dict[str, str] = {}
+        self.finished = 0
+        self.in_flight = 0
+
+    def add(self, tasks: Iterable[Task]) -> None:
+        for task in tasks:
+            if task.key in self.pending or task.key in self.results or task.key in self.failed:
+                continue
+            self.pending[task.key] = task
+
+    def _ready(self) -> List[Task]:
+        ready = []
+        for task in self.pending.values():
+            if any(dep in self.failed for dep in task.deps):
+                continue
+            if all(dep in self.results for dep in task.deps):
+                ready.append(task)
+        return ready
+
+    def _skip_blocked(self) -> None:
+        # Anything depending on a failed task can never run
+        changed = True
+        while changed:
+            changed = False
+            for key, task in list(self.pending.items()):
+                bad = [dep for dep in task.deps if dep in self.failed]
+                if bad:
+                    del self.pending[key]
+                    self.failed[key] = f"dependency failed: {bad[0]}"
+                    changed = True
+
+    def _report(self, task: Task, elapsed: float, error: Optional[str] = None) -> None:
+        self.finished += 1
+        if not self.progress:
+            return
+        total = self.finished + self.in_flight + len(self.pending)
+        width = len(str(total))
+        status = f"FAILED: {error}" if error else f"{elapsed:.2f}s"
+        print(f"[{self.finished:{width}d}/{total}] {task.key} {status}", flush=True)
+
+    def _complete(self, task: Task, result: object, elapsed: float) -> None:
+        self.results[task.key] = result
+        self._report(task, elapsed)
+        if task.then is not None:
+            self.add(task.then(result))
+
+    def _fail(self, task: Task, exc: BaseException) -> None:
+        message = f"{type(exc).__name__}: {exc}"
+        self.failed[task.key] = message
+        self._report(task, 0.0, message)
+        if self.progress:
+            traceback.print_exception(type(exc), exc, exc.__traceback__, file=sys.stderr)
+        self._skip_blocked()
+
+    def run(self) -> Dict[str, object]:
+        if self.pool is not None:
+            self._run_pool(self.pool)
+        elif self.jobs == 1:
+            self._run_inline()
+        else:
+            with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+                self._run_pool(pool)
+        for key, task in self.pending.items():
+            self.failed[key] = f"unresolved dependencies: {[d for d in task.deps if d not in self.results]}"
+        self.pending.clear()
+        return self.results
+
+    def _run_inline(self) -> None:
+        while True:
+            ready = self._ready()
+            if not ready:
+                return
+            for task in ready:
+                del self.pending[task.key]
+                try:
+                    result, elapsed = _timed_call(task.func, task.args)
+                except Exception as exc:
+                    self._fail(task, exc)
+                    continue
+                self._complete(task, result, elapsed)
+
+    def _run_pool(self, pool: Executor) -> None:
+        running: Dict[Future, Task] = {}
+        while True:
+            for task in self._ready():
+                del self.pending[task.key]
+                running[pool.submit(_timed_call, task.func, task.args)] = task
+            self.in_flight = len(running)
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                self.in_flight = len(running)
+                try:
+                    result, elapsed = future.result()
+                except Exception as exc:
+                    self._fail(task, exc)
+                    continue
+                self._complete(task, result, elapsed)
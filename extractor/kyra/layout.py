@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import List
+
+from .fnt import read_fnt
+from .timings import stage
+
+# Original talk text limits (TextDisplayer::preprocessString): strings wider
+# than one box are split into two, or three above twice the width, measured
+# with glyphs drawn 2 pixels tighter than normal.
+TALK_WIDTH = 176
+MEASURE_SPACING = -2
+
+
+def load_font_widths(path: Path) -> tuple[List[int], int]:
+    # Advance per character code and line height, from a .FNT or the JSON
+    # table written by fnt_to_atlas.py
+    if path.suffix.upper() == ".FNT":
+        font = read_fnt(path)
+        return font["widths"], font["height"]
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [glyph[2] for glyph in data["glyphs"]], data["height"]
+
+
+def text_width(text: str, widths: List[int], spacing: int = 0) -> int:
+    total = 0
+    for ch in text:
+        code = ord(ch)
+        total += (widths[code] if code < len(widths) else 0) + spacing
+    return total
+
+
+def _char_count(text: str, widths: List[int], limit: int) -> int:
+    # Characters that fit before the measured width passes `limit`
+    count = 0
+    width = 0
+    for ch in text:
+        if width > limit:
+            break
+        code = ord(ch)
+        width += (widths[code] if code < len(widths) else 0) + MEASURE_SPACING
+        count += 1
+    return count
+
+
+def break_lines(text: str, widths: List[int], max_width: int = TALK_WIDTH) -> List[tuple[int, int]]:
+    # (start, end) character ranges of each line; the break spaces are
+    # dropped from the lines like the original carriage returns.
+    measured = text_width(text, widths, MEASURE_SPACING)
+    if measured <= max_width:
+        return [(0, len(text))]
+    parts = 3 if measured > max_width * 2 else 2
+    lines: List[tuple[int, int]] = []
+    start = 0
+    for part in range(parts - 1, 0, -1):
+        rest = text[start:]
+        target = text_width(rest, widths, MEASURE_SPACING) // (part + 1)
+        # The first space at or after the measured position becomes the break
+        split = text.find(" ", start + _char_count(rest, widths, target))
+        if split < 0:
+            break
+        lines.append((start, split))
+        start = split + 1
+    lines.append((start, len(text)))
+    return lines
+
+
+def layout_string(text: str, widths: List[int], max_width: int = TALK_WIDTH) -> dict:
+    lines = []
+    xs = [0] * len(text)
+    for start, end in break_lines(text, widths, max_width):
+        x = 0
+        for i in range(start, end):
+            xs[i] = x
+            code = ord(text[i])
+            x += widths[code] if code < len(widths) else 0
+        lines.append([start, end, x])
+    return {"lines": lines, "x": xs}
+
+
+def layout_strings(
+    strings: List[str],
+    widths: List[int],
+    line_height: int,
+    max_width: int = TALK_WIDTH,
+    source: str = "",
+    font: str = ""
+) -> dict:
+    asset = Path(source).stem.upper()
+    with stage("parse", asset):
+        laid_out = [layout_string(text, widths, max_width) for text in strings]
+    # lines = [start, end, width] into the source string, x = pen position of
+    # every character relative to the start of its line
+    return {
+        "format": "kyra-text-layout",
+        "source": source,
+        "font": font,
+        "maxWidth": max_width,
+        "lineHeight": line_height,
+        "strings": laid_out
+    }
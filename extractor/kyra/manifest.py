@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+
+from .timings import stage
+
+MANIFEST_NAME = "asset-manifest.json"
+HASH_LENGTH = 10
+# Content store files are already named by their digest
+_DIGEST_NAME = re.compile(r"^[0-9a-f]{40}$")
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hashed_name(name: str, digest: str) -> str:
+    stem, dot, suffix = name.partition(".")
+    return f"{stem}.{digest[:HASH_LENGTH]}{dot}{suffix}"
+
+
+def load_manifest(root: Path) -> dict:
+    path = root / MANIFEST_NAME
+    if not path.exists():
+        return {"version": 1, "assets": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def hashed_urls(manifest: dict) -> Set[str]:
+    # The "<stem>.<hash>.<ext>" twins, as paths relative to the root
+    return {entry["url"] for rel, entry in manifest.get("assets", {}).items() if entry["url"] != rel}
+
+
+def _logical_files(root: Path, hashed: set) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            rel = path.relative_to(root).as_posix()
+            if filename.startswith(".") or filename.endswith(".tmp") or rel == MANIFEST_NAME or rel in hashed:
+                continue
+            yield path
+
+
+def build_manifest(root: Path, prune: bool = True) -> dict:
+    # Every file under root gets an immutable "<stem>.<hash>.<ext>" twin next
+    # to it; the manifest maps the logical path to that URL. Twins written by
+    # the previous run are recognised through the old manifest and skipped,
+    # and the ones that are no longer referenced get removed.
+    old_urls = hashed_urls(load_manifest(root))
+    assets: Dict[str, dict] = {}
+    for path in _logical_files(root, old_urls):
+        rel = path.relative_to(root).as_posix()
+        size = path.stat().st_size
+        with stage("read", rel, size) as st:
+            digest = file_digest(path)
+            st["bytesOut"] = size
+        if _DIGEST_NAME.match(path.name.partition(".")[0]):
+            url = rel
+        else:
+            url = (Path(rel).parent / hashed_name(path.name, digest)).as_posix()
+            target = root / url
+            if not target.exists():
+                with stage("write", rel, size) as st:
+                    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                    tmp.write_bytes(path.read_bytes())
+                    os.replace(tmp, target)
+                    st["bytesOut"] = size
+        assets[rel] = {"url": url, "size": size, "hash": digest[:HASH_LENGTH]}
+
+    live = {entry["url"] for entry in assets.values()}
+    removed = 0
+    if prune:
+        for url in sorted(old_urls - live):
+            stale = root / url
+            if stale.exists():
+                stale.unlink()
+                removed += 1
+    return {"version": 1, "assets": assets, "removed": removed}
+
+
+def write_manifest(root: Path, manifest: dict) -> Path:
+    path = root / MANIFEST_NAME
+    payload = {"version": manifest["version"], "assets": manifest["assets"]}
+    with stage("json", MANIFEST_NAME) as st:
+        data = json.dumps(payload, indent=2, sort_keys=True).encode("utf-8")
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        st["bytesOut"] = len(data)
+    return path
+
+
+def resolve(manifest: dict, logical: str) -> Optional[str]:
+    entry = manifest.get("assets", {}).get(logical)
+    return entry["url"] if entry else None
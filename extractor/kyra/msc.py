@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import base64
+import struct
+from pathlib import Path
+
+from .codecs import decode_image
+from .timings import stage
+
+
+def decode_msc(path: str) -> dict:
+    name = Path(path).stem.upper()
+    with stage("read", name) as st:
+        with open(path, "rb") as f:
+            raw = f.read()
+        st["bytesOut"] = len(raw)
+
+    comp_type = raw[2]
+    img_size = struct.unpack_from("<I", raw, 4)[0]
+    pal_size = struct.unpack_from("<H", raw, 8)[0]
+    src_ptr = 10 + pal_size
+    src = raw[src_ptr:]
+
+    with stage("decompress", name, len(src)) as st:
+        pixels = decode_image(comp_type, src, img_size)
+        st["bytesOut"] = len(pixels)
+
+    # MSC in DOS is 320x144 (mask for the playfield)
+    width = 320
+    height = img_size // width
+
+    return {
+        "format": "kyra-msc",
+        "width": width,
+        "height": height,
+        "compType": comp_type,
+        "imgSize": img_size,
+        "palSize": pal_size,
+        "rawBase64": base64.b64encode(raw).decode("ascii"),
+        "pixels": list(pixels)
+    }
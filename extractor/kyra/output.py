@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import io
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .palette import Palette, expand_rgba
+from .timings import stage
+
+
+def rgba_image(width: int, height: int, pixels: bytes, palette: Optional[Palette], transparent_index: Optional[int] = None, asset: str = ""):
+    from PIL import Image
+
+    with stage("palette", asset, len(pixels)) as st:
+        rgba = bytes(expand_rgba(pixels, palette, transparent_index))
+        st["bytesOut"] = len(rgba)
+    return Image.frombytes("RGBA", (width, height), rgba)
+
+
+def indexed_image(width: int, height: int, pixels: bytes, palette: Optional[Palette]):
+    from PIL import Image
+
+    img = Image.frombytes("P", (width, height), bytes(pixels))
+    if palette:
+        img.putpalette(palette.padded())
+    return img
+
+
+def _save_pil(img, fmt: str, **params) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **params)
+    return buf.getvalue()
+
+
+def _encode_png(img, transparent_index: Optional[int], level: Optional[int]) -> bytes:
+    params = {}
+    if level is not None:
+        params["compress_level"] = level
+    if img.mode == "P" and transparent_index is not None:
+        params["transparency"] = transparent_index
+    return _save_pil(img, "PNG", **params)
+
+
+def _encode_webp(img, transparent_index: Optional[int], level: Optional[int]) -> bytes:
+    # Lossless WebP; the 0-9 zlib-style level maps onto WebP's 0-6 method
+    method = 4 if level is None else round(max(0, min(level, 9)) * 6 / 9)
+    return _save_pil(img, "WEBP", lossless=True, quality=100, method=method, exact=True)
+
+
+def _encode_raw(pixels: bytes, transparent_index: Optional[int], level: Optional[int]) -> bytes:
+    return bytes(pixels)
+
+
+class ImageFormat:
+    # source: "rgba" (palette applied), "indexed" (PIL "P" image) or "raw"
+    # (the index bytes as they are)
+    def __init__(self, name: str, suffix: str, source: str, encode: Callable[[object, Optional[int], Optional[int]], bytes]) -> None:
+        self.name = name
+        self.suffix = suffix
+        self.source = source
+        self.encode = encode
+
+
+IMAGE_FORMATS: Dict[str, ImageFormat] = {
+    "png": ImageFormat("png", ".png", "rgba", _encode_png),
+    "indexed-png": ImageFormat("indexed-png", ".png", "indexed", _encode_png),
+    "webp": ImageFormat("webp", ".webp", "rgba", _encode_webp),
+    "raw": ImageFormat("raw", ".bin", "raw", _encode_raw)
+}
+
+
+def encode_image_file(
+    fmt: str,
+    width: int,
+    height: int,
+    pixels: bytes,
+    palette: Optional[Palette],
+    transparent_index: Optional[int] = None,
+    level: Optional[int] = None,
+    asset: str = ""
+) -> bytes:
+    image_format = IMAGE_FORMATS[fmt]
+    if image_format.source == "rgba":
+        src = rgba_image(width, height, pixels, palette, transparent_index, asset)
+    elif image_format.source == "indexed":
+        src = indexed_image(width, height, pixels, palette)
+    else:
+        src = pixels
+    # Encoding into memory first keeps compression apart from disk I/O, and
+    # the stage name carries the backend so traces compare size and time.
+    with stage(f"encode:{fmt}", asset, width * height) as st:
+        data = image_format.encode(src, transparent_index, level)
+        st["bytesOut"] = len(data)
+    return data
+
+
+def write_image(
+    fmt: str,
+    dst: Path,
+    width: int,
+    height: int,
+    pixels: bytes,
+    palette: Optional[Palette],
+    transparent_index: Optional[int] = None,
+    level: Optional[int] = None,
+    asset: str = ""
+) -> int:
+    data = encode_image_file(fmt, width, height, pixels, palette, transparent_index, level, asset)
+    write_bytes(dst, data, asset)
+    return len(data)
+
+
+# Per thread, so a batch worker thread can collect its outputs while another
+# thread of the same process writes earlier ones
+_capture = threading.local()
+
+
+@contextmanager
+def capture_writes() -> Iterator[List[Tuple[Path, bytes]]]:
+    writes: List[Tuple[Path, bytes]] = []
+    _capture.writes = writes
+    try:
+        yield writes
+    finally:
+        _capture.writes = None
+
+
+def write_bytes(dst: Path, data: bytes, asset: str = "") -> None:
+    writes = getattr(_capture, "writes", None)
+    if writes is not None:
+        writes.append((dst, data))
+        return
+    with stage("write", asset, len(data)) as st:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.write_bytes(data)
+        st["bytesOut"] = len(data)
+
+
+def write_json_file(dst: Path, payload, asset: str = "", indent: Optional[int] = None) -> None:
+    with stage("json", asset) as st:
+        data = json.dumps(payload, ensure_ascii=True, indent=indent).encode("utf-8")
+        st["bytesOut"] = len(data)
+    write_bytes(dst, data, asset)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PALETTE_SIZE = 768
+
+
+class Palette:
+    def __init__(self, raw: bytes, key: str, scale: bool = True) -> None:
+        self.key = key
+        self.rgb = self._scale(raw[:PALETTE_SIZE]) if scale else bytes(raw[:PALETTE_SIZE])
+        padded = self.rgb.ljust(PALETTE_SIZE, b"\x00")
+        self._channels = (padded[0::3], padded[1::3], padded[2::3])
+        self._rgba_tables: Dict[Optional[int], Tuple[bytes, bytes, bytes, bytes]] = {}
+
+    @staticmethod
+    def _scale(raw: bytes) -> bytes:
+        # Entries stored as 6-bit VGA DAC values are widened to 8 bits; entries
+        # that already use the full range are kept as-is.
+        out = bytearray()
+        for i in range(0, len(raw) - len(raw) % 3, 3):
+            r, g, b = raw[i], raw[i + 1], raw[i + 2]
+            if r <= 63 and g <= 63 and b <= 63:
+                r *= 4
+                g *= 4
+                b *= 4
+            out += bytes((r, g, b))
+        return bytes(out)
+
+    def as_list(self) -> List[int]:
+        return list(self.rgb)
+
+    def padded(self) -> List[int]:
+        return list(self.rgb.ljust(PALETTE_SIZE, b"\x00"))
+
+    def rgba_tables(self, transparent_index: Optional[int] = None) -> Tuple[bytes, bytes, bytes, bytes]:
+        if transparent_index is not None and not 0 <= transparent_index < 256:
+            transparent_index = None
+        tables = self._rgba_tables.get(transparent_index)
+        if tables is None:
+            alpha = bytearray(b"\xff" * 256)
+            if transparent_index is not None:
+                alpha[transparent_index] = 0
+            tables = (*self._channels, bytes(alpha))
+            self._rgba_tables[transparent_index] = tables
+        return tables
+
+    def rgba_table(self, transparent_index: Optional[int] = None) -> bytes:
+        r, g, b, a = self.rgba_tables(transparent_index)
+        table = bytearray(1024)
+        table[0::4] = r
+        table[1::4] = g
+        table[2::4] = b
+        table[3::4] = a
+        return bytes(table)
+
+    def expand_rgba(self, pixels: bytes, transparent_index: Optional[int] = None) -> bytearray:
+        # One bytes.translate per channel, interleaved with strided slices.
+        r, g, b, a = self.rgba_tables(transparent_index)
+        src = bytes(pixels)
+        out = bytearray(len(src) * 4)
+        out[0::4] = src.translate(r)
+        out[1::4] = src.translate(g)
+        out[2::4] = src.translate(b)
+        out[3::4] = src.translate(a)
+        return out
+
+
+_by_hash: Dict[str, Palette] = {}
+_by_path: Dict[Tuple[str, int, int], Palette] = {}
+# Images without a palette render black, as PIL does for a bare "P" image
+EMPTY_PALETTE = Palette(b"", "empty")
+
+
+def palette_from_bytes(raw: bytes) -> Palette:
+    raw = bytes(raw[:PALETTE_SIZE])
+    key = hashlib.sha1(raw).hexdigest()
+    palette = _by_hash.get(key)
+    if palette is None:
+        palette = Palette(raw, key)
+        _by_hash[key] = palette
+    return palette
+
+
+def load_palette(palette_path: Optional[Path]) -> Optional[Palette]:
+    if not palette_path:
+        return None
+    stat = palette_path.stat()
+    path_key = (str(palette_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    palette = _by_path.get(path_key)
+    if palette is None:
+        palette = palette_from_bytes(palette_path.read_bytes())
+        _by_path[path_key] = palette
+    return palette
+
+
+def expand_rgba(pixels: bytes, palette: Optional[Palette], transparent_index: Optional[int] = None) -> bytearray:
+    return (palette or EMPTY_PALETTE).expand_rgba(pixels, transparent_index)
+
+
+def clear_palettes() -> None:
+    _by_hash.clear()
+    _by_path.clear()
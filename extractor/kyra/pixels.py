@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Optional
+
+
+def crop(pixels: bytes, width: int, height: int, x: int, y: int, w: int, h: int) -> bytes:
+    x0 = max(0, min(x, width))
+    x1 = max(x0, min(x + w, width))
+    y0 = max(0, min(y, height))
+    y1 = max(y0, min(y + h, height))
+    view = memoryview(pixels)
+    return b"".join(view[row * width + x0:row * width + x1] for row in range(y0, y1))
+
+
+def blit(dst: bytearray, dst_width: int, dx: int, dy: int, src: bytes, src_width: int, sx: int, sy: int, w: int, h: int) -> None:
+    # Row-by-row copy out of memoryview slices, so the source is never sliced
+    # into temporary bytes objects.
+    view = memoryview(src)
+    for row in range(h):
+        d = (dy + row) * dst_width + dx
+        s = (sy + row) * src_width + sx
+        dst[d:d + w] = view[s:s + w]
+
+
+def rect_bounds(
+    pixels: bytes,
+    stride: int,
+    x: int,
+    y: int,
+    w: int,
+    h: int,
+    transparent_index: int
+) -> Optional[tuple[int, int, int, int]]:
+    # Tight (x, y, w, h) box, relative to the given rectangle, around every
+    # non-transparent pixel; None when the rectangle is fully transparent.
+    # lstrip/rstrip scan each row in C.
+    key = bytes((transparent_index,))
+    left = w
+    right = 0
+    top = -1
+    bottom = -1
+    for row in range(h):
+        start = (y + row) * stride + x
+        line = bytes(pixels[start:start + w])
+        rest = line.lstrip(key)
+        if not rest:
+            continue
+        if top < 0:
+            top = row
+        bottom = row
+        left = min(left, w - len(rest))
+        right = max(right, len(line.rstrip(key)))
+    if top < 0:
+        return None
+    return left, top, right - left, bottom - top + 1
+
+
+def trim_bounds(pixels: bytes, width: int, height: int, transparent_index: int) -> Optional[tuple[int, int, int, int]]:
+    return rect_bounds(pixels, width, 0, 0, width, height, transparent_index)
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import re
+import struct
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .bundle import collect_files
+from .manifest import hashed_urls, load_manifest
+from .timings import stage
+
+_FRAME_NAME = re.compile(r"^\d+\.")
+# JSON outputs decoded from a CPS/MSC source, by their "format" field
+SOURCE_FORMATS = {"kyra-cps": ".CPS", "kyra-cps-bin": ".CPS", "kyra-msc": ".MSC"}
+SOURCE_SUFFIXES = (".CPS", ".MSC")
+# Name suffixes cps_export.py adds in front of the extension (NAME_indexed.png)
+OUTPUT_SUFFIXES = ("_INDEXED",)
+
+
+def _brotli() -> Optional[Callable[[bytes], bytes]]:
+    # Optional: pip install brotli; without it only gzip is estimated
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return lambda data: brotli.compress(data, quality=11)
+
+
+def _stem(name: str) -> str:
+    # GEMCUT.png, GEMCUT.3f2a9c1b.png and GEMCUT_indexed.png all name GEMCUT
+    stem = name.split(".")[0].upper()
+    for suffix in OUTPUT_SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+    return stem
+
+
+def scene_names(root: Path) -> Set[str]:
+    # Every scene has metadata, a mask or a background named after it
+    names: Set[str] = set()
+    for sub in ("scenes/dat", "scenes/cps", "masks"):
+        folder = root / sub
+        if folder.is_dir():
+            names.update(_stem(p.name) for p in folder.iterdir() if p.is_file())
+    return names
+
+
+def _frame_dir(root: Path, folder: Path, hashed: Set[str], cache: Dict[Path, bool]) -> bool:
+    if folder not in cache:
+        # Manifest twins (frames.<hash>.json, 0001.<hash>.png) are not frames
+        # of their own and must not change the verdict
+        names = [p.name for p in folder.iterdir() if p.is_file() and p.relative_to(root).as_posix() not in hashed]
+        cache[folder] = bool(names) and all(_FRAME_NAME.match(n) or n == "frames.json" for n in names)
+    return cache[folder]
+
+
+def classify(root: Path, rel: str, scenes: Set[str], hashed: Set[str], frame_dirs: Dict[Path, bool]) -> tuple[str, str]:
+    # Asset class: the folder path with per-scene and per-animation folders
+    # folded into "*" (scenes/wsa/*, intro/frames/*). Scene: the scene name
+    # in the path or file name, else the animation folder, else "-".
+    parts = rel.split("/")
+    folders = []
+    scene = "-"
+    for i, part in enumerate(parts[:-1]):
+        if part.upper() in scenes:
+            folders.append("*")
+            scene = part.upper()
+        elif _frame_dir(root, root.joinpath(*parts[:i + 1]), hashed, frame_dirs):
+            folders.append("*")
+            if scene == "-":
+                scene = part
+        else:
+            folders.append(part)
+    stem = _stem(parts[-1])
+    if scene == "-" and stem in scenes:
+        scene = stem
+    return "/".join(folders) or ".", scene
+
+
+def _largest_key(payload: dict, size: int) -> Optional[dict]:
+    # What dominates a JSON asset (a pixels list, rawBase64, ...)
+    if not payload:
+        return None
+    sizes = {key: len(json.dumps(value)) for key, value in payload.items()}
+    key = max(sizes, key=sizes.get)
+    return {"key": key, "bytes": sizes[key], "share": sizes[key] / max(size, 1)}
+
+
+def source_headers(paths: Iterable[Path]) -> Dict[str, dict]:
+    # CPS/MSC: u16 size, u8 ?, u8 compression type, u32 imgSize, u16 palSize,
+    # palette, then the compressed image
+    sources: Dict[str, dict] = {}
+    for path in paths:
+        data = path.read_bytes()
+        if len(data) < 10:
+            continue
+        sources[path.name.upper()] = _source_entry(path.name.upper(), data)
+    return sources
+
+
+def _source_entry(name: str, data: bytes) -> dict:
+    comp_type = data[2]
+    img_size, pal_size = struct.unpack_from("<IH", data, 4)
+    compressed = max(0, len(data) - 10 - pal_size)
+    return {"source": name, "compType": comp_type, "imgSize": img_size, "compressed": compressed, "ratio": compressed / img_size if img_size else 0.0}
+
+
+def find_sources(src_dirs: Iterable[Path]) -> Dict[str, dict]:
+    paths = []
+    for src in src_dirs:
+        paths.extend(sorted(p for p in src.rglob("*") if p.is_file() and p.suffix.upper() in SOURCE_SUFFIXES))
+    return source_headers(paths)
+
+
+def match_source(rel: str, payload: object, sources: Dict[str, dict]) -> Optional[dict]:
+    # Any output (png, webp, bin, json) is matched to a CPS/MSC source by its
+    # stem; JSON that declares a non-image format (scene metadata, atlases)
+    # never is. Masks prefer the MSC when a CPS has the same name.
+    parts = rel.split("/")
+    stem = _stem(parts[-1])
+    if parts[-1].lower().endswith(".json"):
+        suffix = SOURCE_FORMATS.get(str(payload.get("format"))) if isinstance(payload, dict) else None
+        if suffix is None:
+            return None
+        candidates = [suffix]
+    elif "masks" in parts[:-1]:
+        candidates = [".MSC", ".CPS"]
+    else:
+        candidates = [".CPS", ".MSC"]
+    for suffix in candidates:
+        if stem + suffix in sources:
+            return sources[stem + suffix]
+    if candidates[0] == ".MSC" and isinstance(payload, dict) and payload.get("rawBase64"):
+        # MSC JSON embeds the whole source file as rawBase64
+        return _source_entry(stem + ".MSC", base64.b64decode(payload["rawBase64"]))
+    return None
+
+
+def _group(groups: Dict[str, dict], key: str, size: int, gz: int, br: Optional[int]) -> None:
+    group = groups.setdefault(key, {"files": 0, "bytes": 0, "gzip": 0, "brotli": 0 if br is not None else None})
+    group["files"] += 1
+    group["bytes"] += size
+    group["gzip"] += gz
+    if br is not None and group["brotli"] is not None:
+        group["brotli"] += br
+
+
+def _sorted(groups: Dict[str, dict]) -> Dict[str, dict]:
+    return dict(sorted(groups.items(), key=lambda item: item[1]["bytes"], reverse=True))
+
+
+def build_report(root: Path, source_dirs: Iterable[Path] = (), top: int = 15) -> dict:
+    scenes = scene_names(root)
+    hashed = hashed_urls(load_manifest(root))
+    frame_dirs: Dict[Path, bool] = {}
+    compress_br = _brotli()
+    sources = find_sources(source_dirs)
+    files: List[dict] = []
+    by_class: Dict[str, dict] = {}
+    by_scene: Dict[str, dict] = {}
+    by_format: Dict[str, dict] = {}
+    total: Dict[str, dict] = {}
+
+    for rel in collect_files(root):
+        with stage("read", rel) as st:
+            data = (root / rel).read_bytes()
+            st["bytesOut"] = len(data)
+        with stage("encode:gzip", rel, len(data)) as st:
+            gz = len(gzip.compress(data, 9, mtime=0))
+            st["bytesOut"] = gz
+        br = None
+        if compress_br is not None:
+            with stage("encode:brotli", rel, len(data)) as st:
+                br = len(compress_br(data))
+                st["bytesOut"] = br
+        asset_class, scene = classify(root, rel, scenes, hashed, frame_dirs)
+        fmt = rel.rsplit(".", 1)[-1].lower() if "." in rel.rsplit("/", 1)[-1] else "-"
+        entry = {"path": rel, "class": asset_class, "scene": scene, "format": fmt, "bytes": len(data), "gzip": gz, "brotli": br}
+
+        payload = None
+        if fmt == "json":
+            with stage("parse", rel, len(data)):
+                try:
+                    payload = json.loads(data)
+                except ValueError:
+                    payload = None
+            if isinstance(payload, dict):
+                entry["largestKey"] = _largest_key(payload, len(data))
+        source = match_source(rel, payload, sources)
+        if source is not None:
+            entry["source"] = dict(source, expansion=len(data) / max(source["compressed"], 1))
+        files.append(entry)
+        for groups, key in ((by_class, asset_class), (by_scene, scene), (by_format, fmt), (total, "all")):
+            _group(groups, key, len(data), gz, br)
+
+    with_source = [f for f in files if "source" in f]
+    # One source can have several outputs (png + json + bin); count it once
+    by_source = {f["source"]["source"]: f["source"] for f in with_source}
+    compressed = sum(s["compressed"] for s in by_source.values())
+    img_size = sum(s["imgSize"] for s in by_source.values())
+    return {
+        "format": "kyra-asset-report",
+        "root": str(root),
+        "brotli": compress_br is not None,
+        "total": total.get("all", {"files": 0, "bytes": 0, "gzip": 0, "brotli": None}),
+        "byClass": _sorted(by_class),
+        "byScene": _sorted(by_scene),
+        "byFormat": _sorted(by_format),
+        "sourceCompression": {
+            "sources": len(by_source),
+            "files": len(with_source),
+            "imgSize": img_size,
+            "compressed": compressed,
+            "ratio": compressed / img_size if img_size else 0.0,
+            "outputBytes": sum(f["bytes"] for f in with_source)
+        },
+        "top": sorted(files, key=lambda f: f["bytes"], reverse=True)[:top],
+        "files": files
+    }
+
+
+def _kib(value: Optional[int]) -> str:
+    return "-" if value is None else f"{value / 1024:.1f}"
+
+
+def format_report(report: dict, rows: int = 10) -> str:
+    lines = []
+    t = report["total"]
+    lines.append(f"{report['root']}: {t['files']} files, {_kib(t['bytes'])} KiB, gzip {_kib(t['gzip'])} KiB, brotli {_kib(t['brotli'])} KiB")
+    for title, key in (("class", "byClass"), ("scene", "byScene"), ("format", "byFormat")):
+        header = f"{title:<28} {'files':>6} {'KiB':>10} {'gzip KiB':>10} {'brotli KiB':>11} {'share':>6}"
+        lines += ["", header, "-" * len(header)]
+        groups = list(report[key].items())
+        for name, g in groups[:rows]:
+            lines.append(f"{name:<28} {g['files']:>6} {_kib(g['bytes']):>10} {_kib(g['gzip']):>10} {_kib(g['brotli']):>11} {g['bytes'] / max(t['bytes'], 1):>6.1%}")
+        if len(groups) > rows:
+            lines.append(f"... {len(groups) - rows} more")
+
+    sc = report["sourceCompression"]
+    if sc["files"]:
+        lines += ["", (
+            f"source compression: {sc['sources']} CPS/MSC, {_kib(sc['compressed'])} KiB compressed / {_kib(sc['imgSize'])} KiB pixels "
+            f"({sc['ratio']:.1%}); their {sc['files']} outputs take {_kib(sc['outputBytes'])} KiB ({sc['outputBytes'] / max(sc['compressed'], 1):.1f}x the source)"
+        )]
+
+    header = f"{'top offenders':<44} {'KiB':>9} {'gzip KiB':>9}  note"
+    lines += ["", header, "-" * len(header)]
+    for f in report["top"]:
+        notes = []
+        if f.get("largestKey") and f["largestKey"]["share"] >= 0.5:
+            notes.append(f"{f['largestKey']['key']} {f['largestKey']['share']:.0%}")
+        if f.get("source"):
+            notes.append(f"{f['source']['expansion']:.1f}x {f['source']['source']}")
+        lines.append(f"{f['path']:<44} {_kib(f['bytes']):>9} {_kib(f['gzip']):>9}  {', '.join(notes)}")
+    return "\n".join(lines)
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_bytes: int = 1024) -> List[str]:
+    # Growth beyond threshold percent of the total or any asset class;
+    # classes below min_bytes in the baseline are too small to judge
+    regressions = []
+    checks = [("total", report["total"], baseline.get("total"))]
+    checks += [(f"class {name}", report["byClass"].get(name), base) for name, base in baseline.get("byClass", {}).items()]
+    checks += [(f"class {name} (new)", group, None) for name, group in report["byClass"].items() if name not in baseline.get("byClass", {})]
+    for label, cur, base in checks:
+        for key in ("bytes", "gzip"):
+            now = cur[key] if cur else 0
+            before = base[key] if base else 0
+            if before < min_bytes and now < min_bytes:
+                continue
+            change = (now - before) / before * 100 if before else float("inf")
+            if change > threshold:
+                message = f"{label} {key}: {before} -> {now} bytes"
+                regressions.append(message + ("" if change == float("inf") else f" ({change:+.1f}%)"))
+    return regressions
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .bundle import BUNDLE_HEADER, coalesce_ranges, parse_header, parse_toc
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RequestLog:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.ranges = 0
+        self.bytes_sent = 0
+        self.latencies: List[float] = []
+
+    def add(self, ranged: bool, sent: int, latency: float) -> None:
+        with self.lock:
+            self.requests += 1
+            self.ranges += int(ranged)
+            self.bytes_sent += sent
+            self.latencies.append(latency)
+
+    def stats(self) -> dict:
+        with self.lock:
+            latencies = sorted(self.latencies)
+        mean = sum(latencies) / len(latencies) if latencies else 0.0
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return {"requests": self.requests, "ranges": self.ranges, "bytes": self.bytes_sent, "meanMs": mean * 1000, "p95Ms": p95 * 1000}
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    # Single "bytes=a-b", "bytes=a-" or "bytes=-n"; multi-range requests are
+    # answered with the whole file, which RFC 9110 allows
+    match = _RANGE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.group(1), match.group(2)
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    # Static files with single-range support, a simulated round trip and a
+    # per-request log line: method, path, range, status, bytes, latency
+    log: RequestLog
+    delay: float = 0.0
+    quiet: bool = False
+
+    def end_headers(self) -> None:
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "Content-Range, Content-Length")
+        super().end_headers()
+
+    def do_GET(self) -> None:
+        start = time.perf_counter()
+        if self.delay:
+            time.sleep(self.delay)
+        header = self.headers.get("Range")
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self._record(start, header, HTTPStatus.NOT_FOUND, 0)
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        size = os.path.getsize(path)
+        try:
+            span = parse_range(header, size) if header else None
+        except ValueError:
+            self._record(start, header, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, 0)
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        first, last = span if span else (0, size - 1)
+        length = last - first + 1 if size else 0
+        with open(path, "rb") as f:
+            f.seek(first)
+            body = f.read(length)
+        status = HTTPStatus.PARTIAL_CONTENT if span else HTTPStatus.OK
+        # Recorded before the response goes out, so a client that has its
+        # bytes always finds the request in the log
+        self._record(start, header, status, length)
+        self.send_response(status)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(length))
+        if span:
+            self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _record(self, start: float, header: Optional[str], status: int, sent: int) -> None:
+        latency = time.perf_counter() - start
+        self.log.add(status == HTTPStatus.PARTIAL_CONTENT, sent, latency)
+        if not self.quiet:
+            print(f"{self.command} {self.path} {header or '-'} {int(status)} {sent} {latency * 1000:.1f}ms", file=sys.stderr)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def make_server(root: Path, host: str = "127.0.0.1", port: int = 8000, delay_ms: float = 0.0, quiet: bool = False) -> ThreadingHTTPServer:
+    log = RequestLog()
+    handler = type("Handler", (RangeRequestHandler,), {"log": log, "delay": delay_ms / 1000, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), partial(handler, directory=str(root)))
+    server.request_log = log
+    return server
+
+
+def format_log(stats: dict) -> str:
+    return (
+        f"{stats['requests']} requests ({stats['ranges']} ranged), {stats['bytes']} bytes, "
+        f"latency mean {stats['meanMs']:.1f}ms p95 {stats['p95Ms']:.1f}ms"
+    )
+
+
+def _get(url: str, first: Optional[int] = None, last: Optional[int] = None) -> bytes:
+    request = urllib.request.Request(url)
+    if first is not None:
+        request.add_header("Range", f"bytes={first}-{'' if last is None else last}")
+    with urllib.request.urlopen(request) as res:
+        return res.read()
+
+
+def fetch_loose(base: str, names: List[str], parallel: int) -> Dict[str, bytes]:
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        return dict(zip(names, pool.map(lambda name: _get(f"{base}/{name}"), names)))
+
+
+def fetch_bundle(url: str, prefix: str, parallel: int, toc_guess: int = 16384) -> Dict[str, bytes]:
+    # One request for the header and (usually) the whole TOC, then one per
+    # contiguous run of wanted entries
+    head = _get(url, 0, toc_guess - 1)
+    _align, _count, toc_size, _data_offset = parse_header(head)
+    if len(head) < BUNDLE_HEADER.size + toc_size:
+        head += _get(url, len(head), BUNDLE_HEADER.size + toc_size - 1)
+    toc = parse_toc(head)
+    wanted = {name: entry for name, entry in toc.items() if name.startswith(prefix)}
+    ranges = coalesce_ranges([e for e in wanted.values() if e["length"]], gap=64)
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        chunks = list(pool.map(lambda r: _get(url, r[0], r[1]), ranges))
+    out: Dict[str, bytes] = {name: b"" for name, entry in wanted.items() if not entry["length"]}
+    for name, entry in wanted.items():
+        for (first, last), chunk in zip(ranges, chunks):
+            if first <= entry["offset"] <= last:
+                start = entry["offset"] - first
+                out[name] = chunk[start:start + entry["length"]]
+                break
+    return out
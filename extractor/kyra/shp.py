@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import List, Optional
+
+from .codecs import decode_frame2, decode_frame4
+from .encoders import encode_frame2, encode_frame4
+from .timings import stage
+
+SHAPE_HEADER = struct.Struct("<HBHBHH")
+SHAPE_FLAG_COLOR_TABLE = 1
+SHAPE_FLAG_NO_COMPRESS = 2
+
+
+def parse_shape_table(data: bytes) -> List[int]:
+    # u16 shape count, then one offset per shape relative to byte 2. Kyrandia
+    # uses u32 offsets, older Westwood files u16; 0 marks an empty slot.
+    if len(data) < 2:
+        raise ValueError("Shape file too small")
+    count = struct.unpack_from("<H", data, 0)[0]
+    for fmt, entry in (("<I", 4), ("<H", 2)):
+        table_end = 2 + count * entry
+        if table_end > len(data):
+            continue
+        offsets = [struct.unpack_from(fmt, data, 2 + i * entry)[0] for i in range(count)]
+        if all(off == 0 or table_end <= off + 2 <= len(data) - SHAPE_HEADER.size for off in offsets):
+            return [off + 2 if off else 0 for off in offsets]
+    raise ValueError("Unsupported or corrupt shape table")
+
+
+def decode_shape(data: bytes, offset: int) -> dict:
+    flags, height, width, _height2, size, raw_size = SHAPE_HEADER.unpack_from(data, offset)
+    pos = offset + SHAPE_HEADER.size
+    table = None
+    if flags & SHAPE_FLAG_COLOR_TABLE:
+        table = data[pos:pos + 16]
+        pos += 16
+    end = min(offset + size, len(data)) if size else len(data)
+    payload = data[pos:end]
+    if not flags & SHAPE_FLAG_NO_COMPRESS:
+        payload = decode_frame4(payload, raw_size)
+    pixels = decode_frame2(payload, width * height)
+    if table is not None:
+        # Packed shapes store 4-bit colours looked up in the table; 0 stays
+        # transparent
+        pixels = pixels.translate(b"\x00" + bytes(table[1:16]).ljust(15, b"\x00") + bytes(range(16, 256)))
+    return {"flags": flags, "width": width, "height": height, "pixels": bytes(pixels)}
+
+
+def read_shp(path: Path) -> List[Optional[dict]]:
+    name = path.stem.upper()
+    with stage("read", name) as st:
+        data = path.read_bytes()
+        st["bytesOut"] = len(data)
+    with stage("parse", name, len(data)):
+        offsets = parse_shape_table(data)
+    shapes: List[Optional[dict]] = []
+    with stage("decompress", name, len(data)) as st:
+        for offset in offsets:
+            shapes.append(decode_shape(data, offset) if offset else None)
+        st["bytesOut"] = sum(len(s["pixels"]) for s in shapes if s)
+    return shapes
+
+
+def encode_shape(width: int, height: int, pixels: bytes, compress: bool = True) -> bytes:
+    rle = encode_frame2(pixels)
+    flags = 0
+    payload = rle
+    if compress:
+        packed = encode_frame4(rle)
+        if len(packed) < len(rle):
+            payload = packed
+        else:
+            flags |= SHAPE_FLAG_NO_COMPRESS
+    else:
+        flags |= SHAPE_FLAG_NO_COMPRESS
+    size = SHAPE_HEADER.size + len(payload)
+    return SHAPE_HEADER.pack(flags, height, width, height, size, len(rle)) + payload
+
+
+def build_shape_table(shapes: List[Optional[tuple[int, int, bytes]]], compress: bool = True) -> bytes:
+    table_size = len(shapes) * 4
+    body = bytearray()
+    offsets: List[int] = []
+    for shape in shapes:
+        if shape is None:
+            offsets.append(0)
+            continue
+        offsets.append(table_size + len(body))
+        body.extend(encode_shape(*shape, compress=compress))
+    return struct.pack(f"<H{len(offsets)}I", len(offsets), *offsets) + bytes(body)
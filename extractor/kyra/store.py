@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from .palette import Palette
+from .timings import stage
+
+
+def frame_digest(
+    width: int,
+    height: int,
+    pixels: bytes,
+    palette: Optional[Palette],
+    fmt: str,
+    transparent_index: Optional[int],
+    level: Optional[int]
+) -> str:
+    # Everything that changes the encoded file: indexed pixels, palette and
+    # encoder settings
+    h = hashlib.sha1()
+    h.update(f"{fmt}:{width}x{height}:{transparent_index}:{level}:{palette.key if palette else '-'}".encode("ascii"))
+    h.update(bytes(pixels))
+    return h.hexdigest()
+
+
+class ContentStore:
+    # Files named by the hash of what produced them, shared by every asset
+    # and process that writes into the same root. Counters are per instance.
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.encoded = 0
+        self.reused = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def path_for(self, digest: str, suffix: str) -> Path:
+        return self.root / f"{digest}{suffix}"
+
+    def put(self, digest: str, suffix: str, encode: Callable[[], bytes], asset: str = "") -> Path:
+        path = self.path_for(digest, suffix)
+        if path.exists():
+            self.reused += 1
+            self.bytes_saved += path.stat().st_size
+            return path
+        data = encode()
+        with stage("write", asset) as st:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename, so concurrent workers never see half a file
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            st["bytesOut"] = len(data)
+        self.encoded += 1
+        self.bytes_written += len(data)
+        return path
+
+    def stats(self) -> dict:
+        return {"encoded": self.encoded, "reused": self.reused, "bytesWritten": self.bytes_written, "bytesSaved": self.bytes_saved}
+
+
+def merge_stats(total: dict, stats: dict) -> dict:
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def format_stats(stats: dict) -> str:
+    frames = stats.get("encoded", 0) + stats.get("reused", 0)
+    return (
+        f"frame store: {frames} frames, {stats.get('encoded', 0)} encoded, {stats.get('reused', 0)} reused, "
+        f"{stats.get('bytesWritten', 0)} bytes written, {stats.get('bytesSaved', 0)} bytes saved"
+    )
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import random
+import struct
+from typing import Dict, List, Optional
+
+from .encoders import encode_frame4, encode_frame_delta
+
+OP_BODY_START = 0xFF81
+OP_BODY_END = 0xFF83
+OP_SPRITE_DEFS = 0xFF84
+OP_SPRITE_DEFS_END = 0xFF85
+OP_ANIM_START = 0xFF86
+OP_ANIM_END = 0xFF87
+
+
+def synth_palette(rng: random.Random) -> bytes:
+    # 16 ramps of 16 shades in 6-bit VGA DAC values, like the game palettes
+    out = bytearray()
+    for _ in range(16):
+        base = [rng.randrange(64) for _ in range(3)]
+        for shade in range(16):
+            out.extend(min(63, c * shade // 15 + rng.randrange(2)) for c in base)
+    out[0:3] = b"\x00\x00\x00"
+    return bytes(out)
+
+
+def synth_image(rng: random.Random, width: int, height: int, letterbox: int = 8) -> bytearray:
+    pixels = bytearray(width * height)
+    # Sky: horizontal bands from one palette ramp
+    sky = rng.randrange(16) * 16
+    horizon = height * 2 // 5
+    for y in range(horizon):
+        row = bytes([sky + y * 16 // max(1, horizon)]) * width
+        pixels[y * width:(y + 1) * width] = row
+    # Ground: dithered two-tone texture with a repeating tile
+    ground = rng.randrange(16) * 16 + 4
+    tile = bytes(ground + ((x * 7 + rng.randrange(3)) & 3) for x in range(16))
+    for y in range(horizon, height):
+        row = (tile * (width // 16 + 2))[(y * 3) % 16:(y * 3) % 16 + width]
+        pixels[y * width:(y + 1) * width] = row
+    # Objects: solid and shaded rectangles
+    for _ in range(rng.randrange(6, 14)):
+        w = rng.randrange(8, max(9, width // 4))
+        h = rng.randrange(8, max(9, height // 4))
+        x0 = rng.randrange(0, max(1, width - w))
+        y0 = rng.randrange(0, max(1, height - h))
+        color = rng.randrange(16) * 16
+        for y in range(y0, y0 + h):
+            shade = color + (y - y0) * 15 // h
+            pixels[y * width + x0:y * width + x0 + w] = bytes([shade]) * w
+    # Black letterbox at the bottom
+    if letterbox:
+        pixels[(height - letterbox) * width:] = bytes(letterbox * width)
+    return pixels
+
+
+def synth_mask(rng: random.Random, width: int, height: int) -> bytearray:
+    # Walkmask/priority layers: a few large regions with values 0..7
+    pixels = bytearray(width * height)
+    for _ in range(rng.randrange(4, 10)):
+        w = rng.randrange(16, width)
+        h = rng.randrange(8, height)
+        x0 = rng.randrange(0, width - w + 1)
+        y0 = rng.randrange(0, height - h + 1)
+        value = rng.randrange(8)
+        for y in range(y0, y0 + h):
+            pixels[y * width + x0:y * width + x0 + w] = bytes([value]) * w
+    return pixels
+
+
+def synth_frames(rng: random.Random, width: int, height: int, count: int) -> List[bytearray]:
+    # A few sprites moving over a transparent (index 0) background, plus a
+    # static backdrop strip so deltas have both skips and copies.
+    backdrop = synth_image(rng, width, max(1, height // 4), letterbox=0)
+    sprites = []
+    for _ in range(rng.randrange(1, 4)):
+        w = rng.randrange(4, max(5, width // 3))
+        h = rng.randrange(4, max(5, height // 3))
+        color = rng.randrange(1, 16) * 16
+        art = bytes(color + ((x ^ y) & 7) for y in range(h) for x in range(w))
+        sprites.append({
+            "w": w, "h": h, "art": art,
+            "x": rng.randrange(0, max(1, width - w)),
+            "y": rng.randrange(0, max(1, height - h)),
+            "dx": rng.choice((-3, -2, -1, 1, 2, 3)),
+            "dy": rng.choice((-2, -1, 0, 1, 2))
+        })
+
+    frames: List[bytearray] = []
+    for _ in range(count):
+        frame = bytearray(width * height)
+        frame[(height - height // 4) * width:] = backdrop[:width * (height // 4)]
+        for sprite in sprites:
+            w, h = sprite["w"], sprite["h"]
+            sprite["x"] = min(max(0, sprite["x"] + sprite["dx"]), width - w)
+            sprite["y"] = min(max(0, sprite["y"] + sprite["dy"]), height - h)
+            if sprite["x"] in (0, width - w):
+                sprite["dx"] = -sprite["dx"]
+            if sprite["y"] in (0, height - h):
+                sprite["dy"] = -sprite["dy"]
+            for row in range(h):
+                dst = (sprite["y"] + row) * width + sprite["x"]
+                frame[dst:dst + w] = sprite["art"][row * w:(row + 1) * w]
+        frames.append(frame)
+    return frames
+
+
+def synth_shapes(rng: random.Random, count: int, width: int = 24, height: int = 48) -> List[tuple[int, int, bytes]]:
+    # Character-like shapes: a shaded body on a transparent box with uneven
+    # margins, so trimming and packing have something to do.
+    shapes = []
+    for _ in range(count):
+        pixels = bytearray(width * height)
+        ramp = rng.randrange(1, 16) * 16
+        left = rng.randrange(0, width // 3)
+        right = width - rng.randrange(0, width // 3)
+        top = rng.randrange(0, height // 4)
+        for y in range(top, height):
+            for x in range(left, right):
+                if rng.random() < 0.9:
+                    pixels[y * width + x] = ramp + (x + y) % 16
+        shapes.append((width, height, bytes(pixels)))
+    return shapes
+
+
+def synth_glyphs(rng: random.Random, height: int = 8, count: int = 128) -> List[Optional[tuple[int, bytes]]]:
+    # Printable ASCII gets random 1-bit glyphs (colour 1) with a blank row
+    # below for descender room; control codes have no glyph, space is blank.
+    glyphs: List[Optional[tuple[int, bytes]]] = []
+    for code in range(count):
+        if code < 32:
+            glyphs.append(None)
+            continue
+        width = 3 if code == 32 else rng.randrange(3, 8)
+        pixels = bytearray(width * height)
+        if code != 32:
+            for i in range(width * (height - 1)):
+                if i % width < width - 1 and rng.random() < 0.45:
+                    pixels[i] = 1
+        glyphs.append((width, bytes(pixels)))
+    return glyphs
+
+
+def build_wsa(frames: List[bytes], width: int, height: int) -> bytes:
+    num_frames = len(frames)
+    deltas: List[bytes] = []
+    prev = bytes(width * height)
+    for frame in frames + frames[:1]:
+        deltas.append(encode_frame_delta(prev, frame))
+        prev = bytes(frame)
+    delta_size = max(len(d) for d in deltas)
+
+    data_start = 8 + 4 * (num_frames + 2)
+    table: List[int] = []
+    body = bytearray()
+    for delta in deltas:
+        table.append(data_start + len(body))
+        body.extend(encode_frame4(delta.ljust(delta_size, b"\x00")))
+    table.append(data_start + len(body))
+
+    header = struct.pack("<HHHH", num_frames, width, height, delta_size)
+    return header + struct.pack(f"<{len(table)}I", *table) + bytes(body)
+
+
+def build_pak(files: Dict[str, bytes]) -> bytes:
+    names = list(files)
+    # Each entry is offset + NUL-terminated name; an empty name ends the list
+    dir_size = sum(4 + len(name) + 1 for name in names) + 5
+    directory = bytearray()
+    body = bytearray()
+    for name in names:
+        directory.extend(struct.pack("<I", dir_size + len(body)) + name.encode("ascii") + b"\x00")
+        body.extend(files[name])
+    directory.extend(struct.pack("<I", dir_size + len(body)) + b"\x00")
+    return bytes(directory + body)
+
+
+def build_scene_dat(rng: random.Random, sprite_count: int = 12, anim_count: int = 4) -> bytes:
+    header = bytearray(rng.randrange(256) for _ in range(0x6B))
+    header[0x0D:0x15] = bytes(sorted(rng.randrange(1, 8) for _ in range(8)))
+
+    words: List[int] = [OP_BODY_START, OP_SPRITE_DEFS]
+    for sprite in range(sprite_count):
+        w = rng.randrange(1, 8)
+        h = rng.randrange(8, 64)
+        words += [sprite, rng.randrange(0, 40 - w), rng.randrange(0, 200 - h), w, h]
+    words.append(OP_SPRITE_DEFS_END)
+
+    for _ in range(anim_count):
+        words += [OP_ANIM_START, 0]
+        slots = [
+            rng.randrange(2), 0, rng.randrange(200), 0, rng.randrange(320), rng.randrange(200),
+            rng.randrange(8, 64), rng.randrange(8, 64), rng.randrange(sprite_count), rng.randrange(2),
+            rng.randrange(8, 64), rng.randrange(8, 64), rng.randrange(2)
+        ]
+        for value in slots:
+            words += [value, 0]
+        words.append(1)
+        for _ in range(rng.randrange(4, 24)):
+            words.append(rng.randrange(0xFF88, 0xFF9A))
+            words += [rng.randrange(sprite_count), rng.randrange(320), rng.randrange(200)]
+        words.append(OP_ANIM_END)
+    words.append(OP_BODY_END)
+
+    body = struct.pack(f"<{len(words)}H", *words)
+    return bytes(header) + struct.pack("<H", len(body)) + body
+
+
+def _iff_chunk(tag: bytes, data: bytes) -> bytes:
+    pad = b"\x00" if len(data) & 1 else b""
+    return tag + struct.pack(">I", len(data)) + data + pad
+
+
+def build_emc(
+    rng: random.Random,
+    functions: int = 8,
+    calls_per_function: int = 6,
+    loops: int = 1,
+    strings: Optional[List[str]] = None
+) -> bytes:
+    syscalls = (0x03, 0x0D, 0x62, 0x0C, 0x7C)
+    data: List[int] = []
+    ordr: List[int] = []
+
+    def push(value: int) -> None:
+        data.extend((0x2300, value & 0xFFFF))
+
+    for _ in range(functions):
+        ordr.append(len(data))
+        # reg0 = loops; while (0 < reg0) { draw calls; reg0 -= 1 }
+        push(loops)
+        data.append(0x4900)
+        loop_start = len(data)
+        data.extend((0x4500, 0x4300, 0x5106))
+        data.extend((0x2F00, 0))
+        exit_slot = len(data) - 1
+        for _ in range(calls_per_function):
+            for value in (0, rng.randrange(2), rng.randrange(200), rng.randrange(320), rng.randrange(64)):
+                push(value)
+            data.append(0x4E00 | rng.choice(syscalls))
+            data.append(0x4C05)
+        data.extend((0x4500, 0x4301, 0x5109, 0x4900))
+        data.append(0x8000 | loop_start)
+        data[exit_slot] = len(data)
+        data.append(0x4801)
+    ordr.append(0xFFFF)
+
+    chunks = b""
+    if strings:
+        encoded = [s.encode("latin-1") + b"\x00" for s in strings]
+        offsets = []
+        pos = 2 * len(encoded)
+        for item in encoded:
+            offsets.append(pos)
+            pos += len(item)
+        text = struct.pack(f">{len(offsets)}H", *offsets) + b"".join(encoded)
+        chunks += _iff_chunk(b"TEXT", text)
+    chunks += _iff_chunk(b"ORDR", struct.pack(f">{len(ordr)}H", *ordr))
+    chunks += _iff_chunk(b"DATA", struct.pack(f">{len(data)}H", *data))
+    return b"FORM" + struct.pack(">I", len(chunks) + 4) + b"EMC2" + chunks
+
+
+def synth_strings(rng: random.Random, count: int) -> List[str]:
+    words = ("the", "stone", "Kallak", "forest", "Brandon", "amulet", "marble", "altar", "you", "must", "find", "Malcolm")
+    strings = []
+    for _ in range(count):
+        text = " ".join(rng.choice(words) for _ in range(rng.randrange(3, 18)))
+        strings.append(text[0].upper() + text[1:] + ".")
+    return strings
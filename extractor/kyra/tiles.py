@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .output import IMAGE_FORMATS, write_image, write_json_file
+from .palette import Palette
+from .pixels import blit
+from .timings import stage
+
+TILE_SIZE = 8
+
+
+def split_tiles(pixels: bytes, width: int, height: int, size: int = TILE_SIZE, fill: int = 0) -> List[bytes]:
+    # Row-major list of size x size tiles; edge tiles are padded with `fill`.
+    cols = -(-width // size)
+    rows = -(-height // size)
+    view = memoryview(pixels)
+    pad = bytes([fill]) * size
+    tiles: List[bytes] = []
+    for ty in range(rows):
+        for tx in range(cols):
+            x = tx * size
+            w = min(size, width - x)
+            parts = []
+            for y in range(ty * size, ty * size + size):
+                if y >= height:
+                    parts.append(pad)
+                    continue
+                start = y * width + x
+                parts.append(view[start:start + w])
+                if w < size:
+                    parts.append(pad[w:])
+            tiles.append(b"".join(parts))
+    return tiles
+
+
+class Tileset:
+    # Global tile dictionary shared by every image added to it; the tile bytes
+    # themselves are the hash key.
+    def __init__(self, size: int = TILE_SIZE, fill: int = 0) -> None:
+        self.size = size
+        self.fill = fill
+        self.tiles: List[bytes] = []
+        self.index: Dict[bytes, int] = {}
+        self.maps: Dict[str, dict] = {}
+        self.total = 0
+        self.pixel_bytes = 0
+
+    def add_image(self, name: str, width: int, height: int, pixels: bytes) -> List[int]:
+        with stage("parse", name, len(pixels)):
+            tile_map = []
+            for tile in split_tiles(pixels, width, height, self.size, self.fill):
+                found = self.index.get(tile)
+                if found is None:
+                    found = len(self.tiles)
+                    self.index[tile] = found
+                    self.tiles.append(tile)
+                tile_map.append(found)
+        self.maps[name] = {
+            "width": width,
+            "height": height,
+            "cols": -(-width // self.size),
+            "rows": -(-height // self.size),
+            "map": tile_map
+        }
+        self.total += len(tile_map)
+        self.pixel_bytes += width * height
+        return tile_map
+
+    def stats(self) -> dict:
+        unique = len(self.tiles)
+        # Tiles plus u16 map entries against the untiled indexed pixels
+        packed = unique * self.size * self.size + self.total * 2
+        return {
+            "images": len(self.maps),
+            "tiles": self.total,
+            "uniqueTiles": unique,
+            "dedupRatio": self.total / unique if unique else 0.0,
+            "pixelBytes": self.pixel_bytes,
+            "packedBytes": packed
+        }
+
+    def sheet(self, columns: int = 32) -> tuple[int, int, bytes]:
+        columns = max(1, min(columns, len(self.tiles) or 1))
+        rows = -(-len(self.tiles) // columns)
+        width = columns * self.size
+        height = rows * self.size
+        pixels = bytearray([self.fill]) * (width * height)
+        for i, tile in enumerate(self.tiles):
+            blit(pixels, width, (i % columns) * self.size, (i // columns) * self.size, tile, self.size, 0, 0, self.size, self.size)
+        return width, height, bytes(pixels)
+
+
+def write_tileset(
+    tileset: Tileset,
+    dst_dir: Path,
+    palette: Optional[Palette],
+    fmt: str = "indexed-png",
+    columns: int = 32,
+    level: Optional[int] = None
+) -> List[Path]:
+    width, height, pixels = tileset.sheet(columns)
+    sheet_path = dst_dir / f"tiles{IMAGE_FORMATS[fmt].suffix}"
+    maps_path = dst_dir / "tilemaps.json"
+    write_image(fmt, sheet_path, width, height, pixels, palette, level=level, asset="tiles")
+    # Tile n sits at ((n % columns) * tileSize, (n // columns) * tileSize)
+    payload = {
+        "format": "kyra-tilemaps",
+        "tileSize": tileset.size,
+        "tileset": sheet_path.name,
+        "columns": width // tileset.size if width else 0,
+        "stats": tileset.stats(),
+        "images": tileset.maps
+    }
+    write_json_file(maps_path, payload, "tiles")
+    return [sheet_path, maps_path]
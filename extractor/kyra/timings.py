@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+TIMINGS_ENV = "KYRA_TIMINGS"
+PROFILE_ENV = "KYRA_PROFILE"
+DEFAULT_TRACE = "kyra-timings.jsonl"
+STAGES = ("read", "decompress", "parse", "palette", "encode", "json", "write")
+
+# Worker processes inherit the trace path and tool name through the
+# environment, so every process appends to the same JSONL file.
+_trace: Optional[str] = os.environ.get(TIMINGS_ENV) or None
+_tool = os.environ.get(f"{TIMINGS_ENV}_TOOL", "")
+
+
+def enabled() -> bool:
+    return _trace is not None
+
+
+def start_timings(path: str, tool: str) -> None:
+    global _trace, _tool
+    _trace = path
+    _tool = tool
+    os.environ[TIMINGS_ENV] = path
+    os.environ[f"{TIMINGS_ENV}_TOOL"] = tool
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text("", encoding="utf-8")
+
+
+@contextmanager
+def stage(name: str, asset: str = "", bytes_in: int = 0) -> Iterator[dict]:
+    # The yielded dict takes "bytesOut" (and optionally "bytesIn") from the
+    # caller once the stage knows its output size.
+    record = {"bytesIn": bytes_in, "bytesOut": 0}
+    if _trace is None:
+        yield record
+        return
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield record
+    finally:
+        entry = {
+            "tool": _tool,
+            "asset": asset,
+            "stage": name,
+            "wall": time.perf_counter() - wall,
+            "cpu": time.process_time() - cpu,
+            "bytesIn": record["bytesIn"],
+            "bytesOut": record["bytesOut"],
+            "pid": os.getpid()
+        }
+        with open(_trace, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def load_trace(path: str) -> List[dict]:
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+def summarize(entries: List[dict]) -> Dict[str, dict]:
+    totals: Dict[str, dict] = {}
+    for entry in entries:
+        total = totals.setdefault(entry["stage"], {"count": 0, "wall": 0.0, "cpu": 0.0, "bytesIn": 0, "bytesOut": 0})
+        total["count"] += 1
+        for key in ("wall", "cpu", "bytesIn", "bytesOut"):
+            total[key] += entry[key]
+    # "encode:webp" and friends sort with their base stage
+    order = {name: i for i, name in enumerate(STAGES)}
+    return dict(sorted(totals.items(), key=lambda item: (order.get(item[0].split(":")[0], len(order)), item[0])))
+
+
+def print_summary(path: str, top: int = 5) -> None:
+    entries = load_trace(path)
+    if not entries:
+        return
+    header = f"{'stage':<18} {'count':>7} {'wall s':>9} {'cpu s':>9} {'MB in':>9} {'MB out':>9}"
+    print(header, file=sys.stderr)
+    print("-" * len(header), file=sys.stderr)
+    for name, t in summarize(entries).items():
+        print(f"{name:<18} {t['count']:>7} {t['wall']:>9.3f} {t['cpu']:>9.3f} {t['bytesIn'] / 1e6:>9.2f} {t['bytesOut'] / 1e6:>9.2f}", file=sys.stderr)
+
+    by_asset: Dict[str, float] = {}
+    for entry in entries:
+        by_asset[entry["asset"]] = by_asset.get(entry["asset"], 0.0) + entry["wall"]
+    slowest = sorted(by_asset.items(), key=lambda item: item[1], reverse=True)[:top]
+    print("slowest assets: " + ", ".join(f"{name or '-'} {wall:.3f}s" for name, wall in slowest), file=sys.stderr)
+    print(f"trace: {path}", file=sys.stderr)
+
+
+def add_timing_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--timings",
+        nargs="?",
+        const=DEFAULT_TRACE,
+        default=os.environ.get(TIMINGS_ENV),
+        metavar="FILE",
+        help=f"Record per-stage wall/CPU time and bytes to a JSONL trace (default file: {DEFAULT_TRACE}, env: ${TIMINGS_ENV})"
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=os.environ.get(PROFILE_ENV),
+        metavar="DIR",
+        help=f"Dump cProfile stats of this run to DIR/<tool>.pstats (env: ${PROFILE_ENV})"
+    )
+
+
+@contextmanager
+def instrument(args: argparse.Namespace, tool: str) -> Iterator[None]:
+    if args.timings:
+        start_timings(args.timings, tool)
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profile_path = Path(args.profile) / f"{tool}.pstats"
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(profile_path))
+            print(f"profile: {profile_path}", file=sys.stderr)
+            import pstats
+
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
+        if args.timings:
+            print_summary(args.timings)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+Signature = Tuple[int, int]
+
+
+def snapshot(root: Path, accept: Optional[Callable[[Path], bool]] = None) -> Dict[Path, Signature]:
+    files: Dict[Path, Signature] = {}
+    for path in root.iterdir():
+        if not path.is_file() or (accept is not None and not accept(path)):
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+class DirWatcher:
+    # Polls a directory with os.stat; no inotify/watchdog dependency, and the
+    # game folder is small enough that a full scan costs well under a millisecond.
+    def __init__(
+        self,
+        root: Path,
+        accept: Optional[Callable[[Path], bool]] = None,
+        poll: float = 0.5,
+        debounce: float = 0.3
+    ) -> None:
+        self.root = root
+        self.accept = accept
+        self.poll = poll
+        self.debounce = debounce
+        self.state = snapshot(root, accept)
+
+    def _diff(self, current: Dict[Path, Signature]) -> Tuple[List[Path], List[Path]]:
+        changed = [path for path, sig in current.items() if self.state.get(path) != sig]
+        removed = [path for path in self.state if path not in current]
+        return sorted(changed), sorted(removed)
+
+    def wait(self) -> Tuple[List[Path], List[Path]]:
+        # Blocks until something changed and then stayed quiet for `debounce`
+        # seconds, so an editor's save or a PAK copy is reported once.
+        while True:
+            time.sleep(self.poll)
+            current = snapshot(self.root, self.accept)
+            changed, removed = self._diff(current)
+            if not changed and not removed:
+                continue
+            while True:
+                time.sleep(self.debounce)
+                settled = snapshot(self.root, self.accept)
+                if settled == current:
+                    break
+                current = settled
+            changed, removed = self._diff(current)
+            self.state = current
+            if changed or removed:
+                return changed, removed
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .codecs import decode_frame4, decode_frame_delta
+from .frames import FrameFile, FramesWriter, is_frames_file, open_frames, source_digest
+from .output import IMAGE_FORMATS, encode_image_file, write_image, write_json_file
+from .palette import Palette, load_palette
+from .pixels import crop, trim_bounds
+from .store import ContentStore, frame_digest
+from .timings import stage
+
+
+def read_le16(data: bytes, pos: int) -> int:
+    return data[pos] | (data[pos + 1] << 8)
+
+
+def read_le32(data: bytes, pos: int) -> int:
+    return data[pos] | (data[pos + 1] << 8) | (data[pos + 2] << 16) | (data[pos + 3] << 24)
+
+
+def parse_wsa(data: bytes, use_flags: bool) -> Optional[Tuple[int, int, int, int, int, List[int], bytes, int]]:
+    if len(data) < 14:
+        return None
+    pos = 0
+    num_frames = read_le16(data, pos); pos += 2
+    width = read_le16(data, pos); pos += 2
+    height = read_le16(data, pos); pos += 2
+    delta_size = read_le16(data, pos); pos += 2
+    flags = 0
+    if use_flags:
+        flags = read_le16(data, pos); pos += 2
+
+    frame_data_offs = read_le32(data, pos); pos += 4
+    first_frame = True
+    if frame_data_offs == 0:
+        first_frame = False
+        frame_data_offs = read_le32(data, pos)
+        pos += 4
+
+    offsets: List[int] = [0]
+    for _ in range(num_frames + 1):
+        off = read_le32(data, pos)
+        pos += 4
+        offsets.append(off)
+
+    if frame_data_offs != 0:
+        offsets = [off - frame_data_offs if off else 0 for off in offsets]
+
+    offs_pal = 0x300 if (flags & 1) else 0
+    pos += offs_pal
+
+    if pos > len(data):
+        return None
+
+    frame_data = data[pos:]
+    for off in offsets:
+        if off and off > len(frame_data):
+            return None
+
+    return num_frames, width, height, delta_size, flags, offsets, frame_data, (1 if first_frame else 0)
+
+
+def iter_wsa_frames(data: bytes, name: str = "") -> Iterator[Tuple[int, int, int, bytearray]]:
+    # Yields (index, width, height, frame) for every stored frame. The frame
+    # buffer is reused for the next delta, so callers copy what they keep.
+    parsed = parse_wsa(data, use_flags=False)
+    if parsed is None:
+        parsed = parse_wsa(data, use_flags=True)
+    if parsed is None:
+        raise ValueError("Unsupported or corrupt WSA file")
+
+    num_frames, width, height, delta_size, _flags, offsets, frame_data, first_frame = parsed
+    frame = bytearray(width * height)
+    delta = bytearray(delta_size)
+
+    if first_frame:
+        with stage("decompress", name, len(frame_data)) as st:
+            delta[:] = decode_frame4(frame_data, delta_size)
+            decode_frame_delta(frame, delta, no_xor=False)
+            st["bytesOut"] = len(frame)
+        yield 0, width, height, frame
+        start_index = 1
+    else:
+        start_index = 0
+
+    for i in range(start_index, num_frames):
+        off = offsets[i]
+        if off == 0:
+            continue
+        end = offsets[i + 1] if offsets[i + 1] > off else len(frame_data)
+        with stage("decompress", name, end - off) as st:
+            delta[:] = decode_frame4(frame_data[off:], delta_size)
+            decode_frame_delta(frame, delta, no_xor=False)
+            st["bytesOut"] = len(frame)
+        yield i, width, height, frame
+
+
+def decode_wsa_frames(
+    src: Path,
+    palette_path: Optional[Path],
+    out_dir: Path,
+    transparent_index: Optional[int],
+    fmt: str = "png",
+    level: Optional[int] = None,
+    trim: bool = False,
+    store: Optional[ContentStore] = None,
+    data: Optional[bytes] = None,
+    frames_path: Optional[Path] = None
+) -> None:
+    # src may also be a .frames file from an earlier run (frames_path), which
+    # skips decompression; its embedded palette is used without palette_path
+    name = src.stem.upper()
+    if trim and (transparent_index is None or not 0 <= transparent_index < 256):
+        raise ValueError("Trimming frames needs a transparent index in 0..255")
+    frame_file: Optional[FrameFile] = None
+    if is_frames_file(src):
+        if frames_path is not None:
+            raise ValueError(f"{src} is already a frames file")
+        frame_file = FrameFile(data, name) if data is not None else open_frames(src)
+        frames: Iterator[Tuple[int, int, int, bytes]] = iter(frame_file)
+    else:
+        if data is None:
+            with stage("read", name) as st:
+                data = src.read_bytes()
+                st["bytesOut"] = len(data)
+        frames = iter_wsa_frames(data, name)
+    with stage("palette", name):
+        palette = frame_file.palette if frame_file is not None and palette_path is None else load_palette(palette_path)
+    entries: List[dict] = []
+    width = height = 0
+    writer: Optional[FramesWriter] = None
+    try:
+        for index, width, height, frame in frames:
+            if frames_path is not None:
+                if writer is None:
+                    writer = FramesWriter(frames_path, width, height, palette, source_digest(data))
+                writer.add(index, frame)
+            entries.append(write_frame(out_dir, index, width, height, frame, palette, transparent_index, name, fmt, level, trim, store))
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if frame_file is not None:
+            frame_file.close()
+
+    if trim or store:
+        # Trimmed frames only cover their opaque box; the sidecar places them
+        # back on the full WSA canvas. Stored frames are referenced by hash.
+        write_json_file(out_dir / "frames.json", {"width": width, "height": height, "frames": entries}, name)
+
+
+def stored_frames(out_dir: Path) -> List[Path]:
+    # Content-store files referenced from out_dir/frames.json, so a build
+    # cache entry can carry them along with the sidecar
+    sidecar = out_dir / "frames.json"
+    if not sidecar.is_file():
+        return []
+    frames = json.loads(sidecar.read_text(encoding="utf-8"))["frames"]
+    return sorted({(out_dir / f["file"]).resolve() for f in frames if f.get("hash") and f.get("file")})
+
+
+def write_frame(
+    out_dir: Path,
+    index: int,
+    width: int,
+    height: int,
+    pixels: bytearray,
+    palette: Optional[Palette],
+    transparent_index: Optional[int],
+    asset: str = "",
+    fmt: str = "png",
+    level: Optional[int] = None,
+    trim: bool = False,
+    store: Optional[ContentStore] = None
+) -> dict:
+    dst = out_dir / f"{index:04d}{IMAGE_FORMATS[fmt].suffix}"
+    x, y, w, h = 0, 0, width, height
+    if trim:
+        bounds = trim_bounds(pixels, width, height, transparent_index)
+        if bounds is None:
+            # Fully transparent frame: nothing to draw, no file
+            return {"index": index, "file": None, "x": 0, "y": 0, "w": 0, "h": 0}
+        x, y, w, h = bounds
+        if (w, h) != (width, height):
+            pixels = crop(pixels, width, height, x, y, w, h)
+    if store is None:
+        write_image(fmt, dst, w, h, pixels, palette, transparent_index, level, asset)
+        return {"index": index, "file": dst.name, "x": x, "y": y, "w": w, "h": h}
+    # Identical frames (loops, holds, shared animations) are encoded once
+    digest = frame_digest(w, h, pixels, palette, fmt, transparent_index, level)
+    path = store.put(
+        digest,
+        IMAGE_FORMATS[fmt].suffix,
+        lambda: encode_image_file(fmt, w, h, pixels, palette, transparent_index, level, asset),
+        asset
+    )
+    file = Path(os.path.relpath(path, out_dir)).as_posix()
+    return {"index": index, "file": file, "hash": digest, "x": x, "y": y, "w": w, "h": h}
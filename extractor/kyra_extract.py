@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from kyra import cps as cps_module
+from kyra import atlas, dat, emc, fades, fnt, layout, manifest, msc, pak, shp, wsa
+from kyra.cache import CACHE_ENV, BuildCache, hash_file, run_cached
+from kyra.cps import CPS_WRITERS, cps_output_paths, export_cps
+from kyra.graph import GraphRunner, Task
+from kyra.output import IMAGE_FORMATS, write_bytes, write_json_file
+from kyra.palette import load_palette
+from kyra.store import ContentStore, format_stats, merge_stats
+from kyra.timings import add_timing_arguments, instrument
+from kyra.watch import DirWatcher
+
+DEFAULT_OUT = Path(__file__).resolve().parent.parent / "public" / "assets"
+DEFAULT_PALETTE = "PALETTE.COL"
+ASSET_SUFFIXES = {".CPS", ".WSA", ".SHP", ".FNT", ".MSC", ".DAT", ".EMC", ".COL"}
+
+
+def _cache(cache_dir: Optional[str]) -> Optional[BuildCache]:
+    return BuildCache(Path(cache_dir)) if cache_dir else None
+
+
+def task_unpack(pak_path: str, dst_dir: str, cache_dir: Optional[str]) -> List[str]:
+    def build() -> None:
+        pak.extract_pak(pak_path, dst_dir)
+
+    run_cached(_cache(cache_dir), pak.__file__, [Path(pak_path)], {}, [Path(dst_dir)], build)
+    return sorted(str(p) for p in Path(dst_dir).iterdir() if p.is_file())
+
+
+def task_palette(src: str, dst: str, fade_steps: int, cache_dir: Optional[str]) -> str:
+    def build() -> None:
+        palette = load_palette(Path(src))
+        payload = {"format": "kyra-palette", "source": Path(src).name, "palette": palette.as_list()}
+        write_json_file(Path(dst), payload, Path(src).stem.upper())
+
+    fade_dst = Path(dst).with_suffix(".fade.bin")
+
+    def build_fades() -> None:
+        write_bytes(fade_dst, fades.build_fade_table(load_palette(Path(src)), steps=fade_steps), Path(src).stem.upper())
+
+    cache = _cache(cache_dir)
+    run_cached(cache, __file__, [Path(src)], {}, [Path(dst)], build)
+    if fade_steps:
+        run_cached(cache, fades.__file__, [Path(src)], {"steps": fade_steps}, [fade_dst], build_fades)
+    return src
+
+
+def task_cps(src: str, dst_dir: str, outputs: List[str], palette: Optional[str], level: Optional[int], cache_dir: Optional[str]) -> None:
+    src_path = Path(src)
+    palette_path = Path(palette) if palette else None
+
+    def build() -> None:
+        export_cps(src_path, Path(dst_dir), outputs, None, None, palette_path, level=level)
+
+    inputs = [src_path] + ([palette_path] if palette_path else [])
+    out_paths = cps_output_paths(Path(dst_dir), src_path.stem.upper(), outputs, False)
+    run_cached(_cache(cache_dir), cps_module.__file__, inputs, {"outputs": outputs, "level": level}, out_paths, build)
+
+
+def task_wsa(
+    src: str,
+    dst_dir: str,
+    palette: Optional[str],
+    transparent_index: int,
+    fmt: str,
+    level: Optional[int],
+    trim: bool,
+    store_dir: Optional[str],
+    cache_dir: Optional[str]
+) -> Optional[dict]:
+    palette_path = Path(palette) if palette else None
+    store = ContentStore(Path(store_dir)) if store_dir else None
+
+    def build() -> None:
+        wsa.decode_wsa_frames(Path(src), palette_path, Path(dst_dir), transparent_index, fmt, level, trim, store)
+
+    inputs = [Path(src)] + ([palette_path] if palette_path else [])
+    options = {"transparentIndex": transparent_index, "format": fmt, "level": level, "trim": trim, "store": store_dir}
+    stored = (lambda: wsa.stored_frames(Path(dst_dir))) if store else None
+    run_cached(_cache(cache_dir), wsa.__file__, inputs, options, [Path(dst_dir)], build, stored)
+    return store.stats() if store else None
+
+
+def task_shp(src: str, dst_dir: str, palette: Optional[str], level: Optional[int], cache_dir: Optional[str]) -> None:
+    palette_path = Path(palette) if palette else None
+    name = Path(src).stem.upper()
+
+    def build() -> None:
+        packed = atlas.build_shape_atlas([(name, shp.read_shp(Path(src)))])
+        atlas.write_shape_atlas(packed, Path(dst_dir), name, load_palette(palette_path), level=level)
+
+    inputs = [Path(src)] + ([palette_path] if palette_path else [])
+    run_cached(_cache(cache_dir), shp.__file__, inputs, {"level": level}, [Path(dst_dir)], build)
+
+
+def task_fnt(src: str, dst_dir: str, level: Optional[int], cache_dir: Optional[str]) -> None:
+    name = Path(src).stem.upper()
+
+    def build() -> None:
+        fnt.write_font(fnt.read_fnt(Path(src)), Path(dst_dir), level=level)
+
+    out_paths = [Path(dst_dir) / f"{name}.png", Path(dst_dir) / f"{name}.json"]
+    run_cached(_cache(cache_dir), fnt.__file__, [Path(src)], {"level": level}, out_paths, build)
+
+
+def task_msc(src: str, dst: str, cache_dir: Optional[str]) -> None:
+    def build() -> None:
+        write_json_file(Path(dst), msc.decode_msc(src), Path(src).stem.upper())
+
+    run_cached(_cache(cache_dir), msc.__file__, [Path(src)], {}, [Path(dst)], build)
+
+
+def task_dat(src: str, dst: str, cache_dir: Optional[str]) -> None:
+    def build() -> None:
+        write_json_file(Path(dst), dat.decode_scene_dat(Path(src)), Path(src).stem.upper())
+
+    run_cached(_cache(cache_dir), dat.__file__, [Path(src)], {}, [Path(dst)], build)
+
+
+def task_emc(src: str, dst: str, text_dst: str, font: Optional[str], cache_dir: Optional[str]) -> None:
+    def build_calls() -> None:
+        write_json_file(Path(dst), emc.extract_emc(src), Path(src).stem.upper(), indent=2)
+
+    def build_text() -> None:
+        strings = emc.parse_emc_text_strings(Path(src).read_bytes())
+        payload = {"format": "kyra-emc-text", "source": Path(src).name, "strings": strings}
+        write_json_file(Path(text_dst), payload, Path(src).stem.upper())
+
+    layout_dst = Path(text_dst).with_suffix(".layout.json")
+
+    def build_layout() -> None:
+        strings = emc.parse_emc_text_strings(Path(src).read_bytes())
+        widths, line_height = layout.load_font_widths(Path(font))
+        payload = layout.layout_strings(strings, widths, line_height, source=Path(src).name, font=Path(font).stem.upper())
+        write_json_file(layout_dst, payload, Path(src).stem.upper())
+
+    cache = _cache(cache_dir)
+    run_cached(cache, emc.__file__, [Path(src)], {}, [Path(dst)], build_calls)
+    if emc.find_iff_chunk(Path(src).read_bytes(), b"TEXT") is not None:
+        run_cached(cache, emc.__file__, [Path(src)], {}, [Path(text_dst)], build_text)
+        if font:
+            run_cached(cache, layout.__file__, [Path(src), Path(font)], {}, [layout_dst], build_layout)
+
+
+def task_barrier() -> None:
+    return None
+
+
+class Planner:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.src_dir = Path(args.src)
+        self.out_dir = Path(args.out)
+        self.work_dir = Path(args.work)
+        self.cache_dir = args.cache
+        self.only = {name.upper() for name in args.only}
+        self.palette_name = args.palette.upper()
+        self.cps_outputs = args.cps_output or ["json"]
+        self.transparent_index = args.transparent_index
+        self.wsa_format = args.wsa_format
+        self.level = args.compress_level
+        self.trim = args.trim_frames
+        self.fade_steps = args.fade_steps
+        self.store_dir = str(self.out_dir / "store") if args.dedup_frames else None
+        self.layout_font = args.text_layout.upper() if args.text_layout else None
+        self.watching = args.watch
+        # file name -> (path, containing PAK stem or None)
+        self.files: Dict[str, tuple[Path, Optional[str]]] = {}
+        # PAK entry content hashes, so a rebuilt PAK only redoes changed entries
+        self.entry_hashes: Dict[str, str] = {}
+
+    def _unpack_task(self, path: Path, then: Callable[[List[str]], List[Task]]) -> Task:
+        dst = self.work_dir / "pak" / path.stem.upper()
+        return Task(f"unpack:{path.name.upper()}", task_unpack, (str(path), str(dst), self.cache_dir), then=then)
+
+    def initial_tasks(self) -> List[Task]:
+        tasks: List[Task] = []
+        unpack_keys: List[str] = []
+        for path in sorted(self.src_dir.iterdir()):
+            suffix = path.suffix.upper()
+            if suffix == ".PAK":
+                pak_stem = path.stem.upper()
+                task = self._unpack_task(path, lambda entries, pak_stem=pak_stem: self._discovered(entries, pak_stem))
+                tasks.append(task)
+                unpack_keys.append(task.key)
+            elif suffix in ASSET_SUFFIXES:
+                self.files.setdefault(path.name.upper(), (path, None))
+        tasks.append(Task("discover", task_barrier, deps=unpack_keys, then=lambda _: self.asset_tasks()))
+        return tasks
+
+    def _discovered(self, entries: List[str], pak_stem: str) -> List[Task]:
+        self._register(entries, pak_stem)
+        return []
+
+    def _register(self, entries: List[str], pak_stem: str) -> Set[str]:
+        # Returns the names whose content differs from the previous unpack;
+        # hashes are only tracked in watch mode.
+        changed: Set[str] = set()
+        for entry in entries:
+            path = Path(entry)
+            name = path.name.upper()
+            if path.suffix.upper() not in ASSET_SUFFIXES:
+                continue
+            self.files.setdefault(name, (path, pak_stem))
+            if not self.watching:
+                changed.add(name)
+                continue
+            digest = hash_file(path)
+            if self.entry_hashes.get(name) != digest:
+                self.entry_hashes[name] = digest
+                changed.add(name)
+        return changed
+
+    def _affected(self, names: Iterable[str]) -> Set[str]:
+        # A palette change invalidates every CPS/WSA/SHP rendered with it
+        affected = set(names)
+        if self.palette_name in affected:
+            affected.update(name for name in self.files if name.endswith((".CPS", ".WSA", ".SHP")))
+        # and the layout font every laid-out EMC text
+        if self.layout_font in affected:
+            affected.update(name for name in self.files if name.endswith(".EMC"))
+        return affected
+
+    def changed_tasks(self, changed: List[Path]) -> List[Task]:
+        tasks: List[Task] = []
+        names: Set[str] = set()
+        for path in changed:
+            suffix = path.suffix.upper()
+            if suffix == ".PAK":
+                pak_stem = path.stem.upper()
+                tasks.append(self._unpack_task(
+                    path,
+                    lambda entries, pak_stem=pak_stem: self.asset_tasks(self._affected(self._register(entries, pak_stem)))
+                ))
+            elif suffix in ASSET_SUFFIXES:
+                self.files.setdefault(path.name.upper(), (path, None))
+                names.add(path.name.upper())
+        if names:
+            tasks.extend(self.asset_tasks(self._affected(names)))
+        return tasks
+
+    def _selected(self, path: Path, pak_stem: Optional[str]) -> bool:
+        if not self.only:
+            return True
+        return path.stem.upper() in self.only or (pak_stem is not None and pak_stem in self.only)
+
+    def _palette_task(self, tasks: List[Task]) -> tuple[Optional[str], List[str]]:
+        found = self.files.get(self.palette_name)
+        if found is None:
+            return None, []
+        path = found[0]
+        key = f"palette:{self.palette_name}"
+        dst = self.out_dir / "palettes" / f"{path.stem.upper()}.json"
+        if not any(task.key == key for task in tasks):
+            tasks.append(Task(key, task_palette, (str(path), str(dst), self.fade_steps, self.cache_dir)))
+        return str(path), [key]
+
+    def asset_tasks(self, names: Optional[Set[str]] = None) -> List[Task]:
+        tasks: List[Task] = []
+        if self.palette_name not in self.files:
+            print(f"Warning: {self.palette_name} not found, images without an embedded palette render black", file=sys.stderr)
+        elif names is not None and self.palette_name in names:
+            self._palette_task(tasks)
+
+        for name, (path, pak_stem) in sorted(self.files.items()):
+            if names is not None and name not in names:
+                continue
+            if not self._selected(path, pak_stem):
+                continue
+            suffix = path.suffix.upper()
+            stem = path.stem.upper()
+            scene = pak_stem or stem
+            if suffix == ".CPS":
+                palette, deps = self._palette_task(tasks)
+                dst_dir = self.out_dir / "scenes" / "cps"
+                tasks.append(Task(f"cps:{name}", task_cps, (str(path), str(dst_dir), self.cps_outputs, palette, self.level, self.cache_dir), deps, scene))
+            elif suffix == ".WSA":
+                palette, deps = self._palette_task(tasks)
+                if pak_stem == "INTRO":
+                    dst_dir = self.out_dir / "intro" / "frames" / stem.lower()
+                else:
+                    dst_dir = self.out_dir / "scenes" / "wsa" / stem
+                tasks.append(Task(f"wsa:{name}", task_wsa, (str(path), str(dst_dir), palette, self.transparent_index, self.wsa_format, self.level, self.trim, self.store_dir, self.cache_dir), deps, scene))
+            elif suffix == ".SHP":
+                palette, deps = self._palette_task(tasks)
+                dst_dir = self.out_dir / "shapes" / stem
+                tasks.append(Task(f"shp:{name}", task_shp, (str(path), str(dst_dir), palette, self.level, self.cache_dir), deps, scene))
+            elif suffix == ".FNT":
+                dst_dir = self.out_dir / "font"
+                tasks.append(Task(f"fnt:{name}", task_fnt, (str(path), str(dst_dir), self.level, self.cache_dir), scene=scene))
+            elif suffix == ".MSC":
+                dst = self.out_dir / "masks" / f"{stem}.json"
+                tasks.append(Task(f"msc:{name}", task_msc, (str(path), str(dst), self.cache_dir), scene=scene))
+            elif suffix == ".DAT":
+                dst = self.out_dir / "scenes" / "dat" / f"{stem}.json"
+                tasks.append(Task(f"dat:{name}", task_dat, (str(path), str(dst), self.cache_dir), scene=scene))
+            elif suffix == ".EMC":
+                dst = self.out_dir / "scenes" / "emc" / f"{stem}.json"
+                text_dst = self.out_dir / "text" / f"{stem}.json"
+                font = self.files.get(self.layout_font) if self.layout_font else None
+                font_path = str(font[0]) if font else None
+                tasks.append(Task(f"emc:{name}", task_emc, (str(path), str(dst), str(text_dst), font_path, self.cache_dir), scene=scene))
+        return tasks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract all Kyra game data into public/assets in one run")
+    parser.add_argument("src", help="Directory with the original game files (PAKs and loose files)")
+    parser.add_argument("--out", type=str, default=str(DEFAULT_OUT), help="Output assets directory")
+    parser.add_argument("--work", type=str, default=".kyra-work", help="Directory for unpacked PAK entries")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Worker processes (1 runs inline)")
+    parser.add_argument("--only", action="append", default=[], metavar="SCENE", help="Only convert files of this scene (repeatable)")
+    parser.add_argument("--palette", type=str, default=DEFAULT_PALETTE, help="Palette file name used for CPS/WSA/SHP")
+    parser.add_argument("--cps-output", action="append", choices=list(CPS_WRITERS), help="CPS outputs (default: json)")
+    parser.add_argument("--transparent-index", type=int, default=0, help="Palette index treated as transparent in WSA frames")
+    parser.add_argument("--wsa-format", choices=list(IMAGE_FORMATS), default="png", help="WSA frame image backend")
+    parser.add_argument("--trim-frames", action="store_true", help="Trim transparent borders off WSA frames (offsets in frames.json)")
+    parser.add_argument("--dedup-frames", action="store_true", help="Encode identical WSA frames once into <out>/store and reference them from frames.json")
+    parser.add_argument("--fade-steps", type=int, default=0, metavar="N", help="Also write an N-step fade-to-black table next to the palette JSON")
+    parser.add_argument("--text-layout", type=str, default=None, metavar="FONT", help="Also precompute line breaks for EMC text with this .FNT (e.g. 8FAT.FNT)")
+    parser.add_argument("--manifest", action="store_true", help=f"Write content-hashed copies and <out>/{manifest.MANIFEST_NAME} after the run")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=None, metavar="0-9", help="PNG zlib level / WebP effort (default: encoder default)")
+    parser.add_argument("--cache", type=str, default=os.environ.get(CACHE_ENV), help=f"Build cache directory (default: ${CACHE_ENV})")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    parser.add_argument("--watch", action="store_true", help="Keep running and rebuild only what changed in src")
+    parser.add_argument("--poll", type=float, default=0.5, help="Watch mode polling interval in seconds")
+    parser.add_argument("--debounce", type=float, default=0.3, help="Watch mode quiet period before rebuilding")
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    if "json" in (args.cps_output or []) and "json-bin" in args.cps_output:
+        parser.error("--cps-output json and json-bin both write <name>.json")
+    if "bin" in (args.cps_output or []) and "json-bin" in args.cps_output:
+        parser.error("--cps-output bin and json-bin both write <name>.bin")
+    if args.trim_frames and not 0 <= args.transparent_index < 256:
+        parser.error("--trim-frames needs --transparent-index in 0..255")
+
+    start = time.perf_counter()
+    planner = Planner(args)
+    runner = GraphRunner(jobs=args.jobs, progress=not args.quiet)
+    runner.add(planner.initial_tasks())
+    with instrument(args, "kyra_extract"):
+        results = runner.run()
+
+    report(runner, results, start, args.out)
+    if args.manifest:
+        write_asset_manifest(args.out)
+    if args.watch:
+        watch(args, planner)
+    elif runner.failed:
+        sys.exit(1)
+
+
+def report(runner: GraphRunner, results: Dict[str, object], start: float, out: str) -> None:
+    elapsed = time.perf_counter() - start
+    print(f"Done: {len(results)} tasks, {len(runner.failed)} failed in {elapsed:.1f}s -> {out}")
+    store_stats: dict = {}
+    for key, result in results.items():
+        if key.startswith("wsa:") and isinstance(result, dict):
+            merge_stats(store_stats, result)
+    if store_stats:
+        print(format_stats(store_stats))
+    for key, error in sorted(runner.failed.items()):
+        print(f"  {key}: {error}", file=sys.stderr)
+
+
+def write_asset_manifest(out: str) -> None:
+    result = manifest.build_manifest(Path(out))
+    path = manifest.write_manifest(Path(out), result)
+    print(f"Manifest: {len(result['assets'])} assets -> {path}")
+
+
+def watch(args: argparse.Namespace, planner: Planner) -> None:
+    watcher = DirWatcher(
+        planner.src_dir,
+        lambda path: path.suffix.upper() == ".PAK" or path.suffix.upper() in ASSET_SUFFIXES,
+        args.poll,
+        args.debounce
+    )
+    pool = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs != 1 else None
+    print(f"Watching {planner.src_dir} (Ctrl+C to stop)")
+    try:
+        while True:
+            changed, removed = watcher.wait()
+            for path in removed:
+                print(f"Removed {path.name}; its outputs are left in place")
+            tasks = planner.changed_tasks(changed)
+            if not tasks:
+                continue
+            print(f"Changed: {', '.join(path.name for path in changed)}")
+            start = time.perf_counter()
+            runner = GraphRunner(jobs=args.jobs, progress=not args.quiet, pool=pool)
+            runner.add(tasks)
+            report(runner, runner.run(), start, args.out)
+            if args.manifest:
+                write_asset_manifest(args.out)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
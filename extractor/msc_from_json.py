@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from kyra.cps import encode_cps
+
+
+def encode_msc(payload: dict, comp_type: int = 4, effort: int = 4) -> bytes:
+    if payload.get("format") != "kyra-msc":
+        raise ValueError("Expected a kyra-msc JSON (from msc_to_json.py)")
+    pixels = bytes(payload["pixels"])
+    expected = payload["width"] * payload["height"]
+    if len(pixels) != expected:
+        raise ValueError(f"Mask has {len(pixels)} pixels, expected {expected}")
+    return encode_cps(pixels, comp_type, b"", effort)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack an edited kyra-msc JSON back into a Kyra .MSC")
+    parser.add_argument("src", help="Input JSON (from msc_to_json.py)")
+    parser.add_argument("dst", help="Output .MSC file")
+    parser.add_argument("--comp", type=int, choices=(0, 1, 3, 4), default=None, help="Compression type (default: compType from the JSON)")
+    parser.add_argument("--effort", type=int, default=4, help="Format80 effort 0-8 (higher is smaller and slower)")
+    args = parser.parse_args()
+
+    with open(args.src, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    comp_type = args.comp if args.comp is not None else payload.get("compType", 4)
+
+    start = time.perf_counter()
+    data = encode_msc(payload, comp_type, args.effort)
+    elapsed = time.perf_counter() - start
+    Path(args.dst).write_bytes(data)
+    print(f"Wrote {args.dst} ({payload['width']}x{payload['height']}, type {comp_type}, {len(data)} bytes, {elapsed * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.fades import FADE_STEPS, build_fade_table
+from kyra.output import write_bytes
+from kyra.palette import Palette, load_palette, palette_from_bytes
+from kyra.timings import add_timing_arguments, instrument, stage
+
+
+def source_palette(path: Path) -> Optional[Palette]:
+    # .COL files directly, CPS files only when they embed a palette
+    if path.suffix.upper() == ".CPS":
+        # Only the 10-byte header and the palette after it; the image stays
+        # compressed
+        with stage("read", path.stem.upper()) as st:
+            with open(path, "rb") as f:
+                header = f.read(10)
+                if len(header) < 10:
+                    raise ValueError(f"CPS too small: {path.name}")
+                pal_size = struct.unpack_from("<H", header, 8)[0]
+                raw = f.read(pal_size)
+            st["bytesOut"] = len(header) + len(raw)
+        return palette_from_bytes(raw) if pal_size else None
+    return load_palette(path)
+
+
+def collect_inputs(srcs: List[str]) -> List[Path]:
+    paths: List[Path] = []
+    for src in srcs:
+        path = Path(src)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.iterdir() if p.suffix.upper() in (".COL", ".CPS")))
+        else:
+            paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute palette fade steps (to black and to a target palette)")
+    parser.add_argument("srcs", nargs="+", help=".COL/.CPS files or directories with them")
+    parser.add_argument("dst_dir", help="Output directory for <NAME>.fade.bin")
+    parser.add_argument("--steps", type=int, default=FADE_STEPS, help="Interpolated steps per fade")
+    parser.add_argument("--target", type=str, default=None, help="Also fade toward this .COL palette")
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    if args.steps < 1:
+        parser.error("--steps must be at least 1")
+    target_path = Path(args.target) if args.target else None
+    dst_dir = Path(args.dst_dir)
+    paths = collect_inputs(args.srcs)
+    by_stem: Dict[str, Path] = {}
+    for path in paths:
+        other = by_stem.setdefault(path.stem.upper(), path)
+        if other != path:
+            parser.error(f"{other.name} and {path.name} both write {path.stem.upper()}.fade.bin")
+    cache = open_cache(args)
+
+    written = 0
+    skipped = 0
+    with instrument(args, "palette_fades"):
+        for path in paths:
+            dst = dst_dir / f"{path.stem.upper()}.fade.bin"
+
+            def build() -> None:
+                nonlocal written
+                palette = source_palette(path)
+                if palette is None:
+                    return
+                data = build_fade_table(palette, load_palette(target_path), args.steps)
+                write_bytes(dst, data, path.stem.upper())
+                written += 1
+
+            inputs = [path] + ([target_path] if target_path else [])
+            if run_cached(cache, __file__, inputs, {"steps": args.steps}, [dst], build):
+                skipped += 1
+
+    print(f"Wrote {written} fade tables to {dst_dir}, {skipped} up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from kyra.atlas import build_sheet_atlas, write_atlas
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.cps import read_cps
+from kyra.dat import decode_scene_dat
+from kyra.output import IMAGE_FORMATS
+from kyra.timings import add_timing_arguments, instrument
+
+
+def find_meta(meta_dir: Path, name: str) -> Optional[Path]:
+    for candidate in (meta_dir / f"{name}.json", meta_dir / f"{name}.DAT"):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def load_sprite_defs(meta_path: Path) -> List[dict]:
+    if meta_path.suffix.upper() == ".DAT":
+        return decode_scene_dat(meta_path)["spriteDefs"]
+    return json.loads(meta_path.read_text(encoding="utf-8")).get("spriteDefs", [])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack scene sprites from CPS shape sheets into per-scene atlases")
+    parser.add_argument("src", help="Path to .CPS or a directory with .CPS files")
+    parser.add_argument("dst_dir", help="Output directory")
+    parser.add_argument("--meta", type=str, default=None, help="Directory with scene .DAT files or dat_to_json output, or one such file for a single CPS (default: next to the CPS)")
+    parser.add_argument("--palette", type=str, default=None, help="Optional .COL palette")
+    parser.add_argument("--format", choices=list(IMAGE_FORMATS), default="png", help="Atlas image backend")
+    parser.add_argument("--no-trim", action="store_true", help="Keep the full spriteDef rectangles")
+    parser.add_argument("--max-width", type=int, default=512, help="Atlas width limit in pixels")
+    parser.add_argument("--padding", type=int, default=1, help="Pixels between atlas cells")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=None, metavar="0-9", help="PNG zlib level / WebP effort (default: encoder default)")
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    src = Path(args.src)
+    dst_dir = Path(args.dst_dir)
+    palette_path = Path(args.palette) if args.palette else None
+    paths = sorted(src.glob("*.CPS")) if src.is_dir() else [src]
+    transparent_index = None if args.no_trim else 0
+    meta = Path(args.meta) if args.meta else None
+    if meta is not None and not meta.is_dir():
+        if not meta.is_file():
+            parser.error(f"--meta {meta} does not exist")
+        if len(paths) != 1:
+            parser.error("--meta can only be a single file when src is one .CPS")
+    cache = open_cache(args)
+
+    count = 0
+    skipped = 0
+    sheet_area = 0
+    atlas_area = 0
+    with instrument(args, "scene_atlas"):
+        for path in paths:
+            name = path.stem.upper()
+            meta_path = meta if meta is not None and meta.is_file() else find_meta(meta or path.parent, name)
+            if meta_path is None:
+                continue
+            stats = {}
+
+            def build() -> None:
+                # One decode per sheet; every sprite is sliced from that buffer
+                image = read_cps(path, None, None, palette_path)
+                atlas = build_sheet_atlas(image, load_sprite_defs(meta_path), transparent_index, args.max_width, args.padding)
+                write_atlas(atlas, dst_dir, args.format, 0, args.compress_level)
+                stats.update(sheet=image["width"] * image["height"], atlas=atlas["width"] * atlas["height"])
+                print(f"{name}: {len(atlas['frames'])} sprites in {atlas['cells']} cells, {atlas['width']}x{atlas['height']}")
+
+            inputs = [path, meta_path] + ([palette_path] if palette_path else [])
+            options = {"format": args.format, "trim": not args.no_trim, "maxWidth": args.max_width, "padding": args.padding, "level": args.compress_level}
+            suffix = IMAGE_FORMATS[args.format].suffix
+            out_paths = [dst_dir / f"{name}_atlas{suffix}", dst_dir / f"{name}_atlas.json"]
+            if run_cached(cache, __file__, inputs, options, out_paths, build):
+                skipped += 1
+            count += 1
+            sheet_area += stats.get("sheet", 0)
+            atlas_area += stats.get("atlas", 0)
+
+    summary = f"Packed {count - skipped} scene atlases into {dst_dir}, {skipped} up to date"
+    if sheet_area:
+        summary += f" ({atlas_area / sheet_area:.0%} of the sheet pixels)"
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
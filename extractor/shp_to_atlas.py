@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from kyra.atlas import build_shape_atlas, write_shape_atlas
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.output import IMAGE_FORMATS
+from kyra.palette import load_palette
+from kyra.shp import read_shp
+from kyra.timings import add_timing_arguments, instrument
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Decode Westwood .SHP shape tables and pack the shapes into atlas pages")
+    parser.add_argument("srcs", nargs="+", help=".SHP files or directories with them")
+    parser.add_argument("dst_dir", help="Output directory for this atlas (pages + frames JSON)")
+    parser.add_argument("--name", type=str, default=None, help="Atlas name (default: stem of the first input)")
+    parser.add_argument("--palette", type=str, default=None, help="Optional .COL palette")
+    parser.add_argument("--format", choices=list(IMAGE_FORMATS), default="png", help="Atlas image backend")
+    parser.add_argument("--no-trim", action="store_true", help="Keep the full shape boxes")
+    parser.add_argument("--max-width", type=int, default=512, help="Atlas page width limit in pixels")
+    parser.add_argument("--max-height", type=int, default=512, help="Atlas page height limit in pixels")
+    parser.add_argument("--padding", type=int, default=1, help="Pixels between atlas cells")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=None, metavar="0-9", help="PNG zlib level / WebP effort (default: encoder default)")
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    paths = []
+    for src in args.srcs:
+        path = Path(src)
+        paths.extend(sorted(p for p in path.iterdir() if p.suffix.upper() == ".SHP") if path.is_dir() else [path])
+    if not paths:
+        parser.error("No .SHP inputs found")
+    name = (args.name or paths[0].stem).upper()
+    dst_dir = Path(args.dst_dir)
+    palette_path = Path(args.palette) if args.palette else None
+    transparent_index = None if args.no_trim else 0
+    stats = {}
+
+    def build() -> None:
+        sources = [(path.stem.upper(), read_shp(path)) for path in paths]
+        atlas = build_shape_atlas(sources, transparent_index, args.max_width, args.max_height, args.padding)
+        written = write_shape_atlas(atlas, dst_dir, name, load_palette(palette_path), args.format, 0, args.compress_level)
+        stats.update(frames=len(atlas["frames"]), pages=len(atlas["pages"]), written=written)
+
+    inputs = paths + ([palette_path] if palette_path else [])
+    options = {
+        "name": name,
+        "format": args.format,
+        "trim": not args.no_trim,
+        "maxWidth": args.max_width,
+        "maxHeight": args.max_height,
+        "padding": args.padding,
+        "level": args.compress_level
+    }
+    # Page count is only known after packing, so the cache keeps the whole
+    # atlas folder
+    with instrument(args, "shp_to_atlas"):
+        if run_cached(open_cache(args), __file__, inputs, options, [dst_dir], build):
+            print(f"Up to date: {dst_dir}")
+            return
+
+    print(f"Packed {stats['frames']} shapes from {len(paths)} files into {stats['pages']} pages: {dst_dir / (name + '.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+from pathlib import Path
+from typing import Dict
+
+from kyra.cps import encode_cps
+from kyra.fnt import build_fnt
+from kyra.shp import build_shape_table
+from kyra.synth import (
+    build_emc,
+    build_pak,
+    build_scene_dat,
+    build_wsa,
+    synth_frames,
+    synth_glyphs,
+    synth_image,
+    synth_mask,
+    synth_palette,
+    synth_shapes,
+    synth_strings
+)
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    w, _, h = value.lower().partition("x")
+    return int(w), int(h)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Kyra asset corpus (no original game data)")
+    parser.add_argument("dst_dir", help="Output directory")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenes", type=int, default=4, help="Number of scenes")
+    parser.add_argument("--frames", type=int, default=24, help="Frames per WSA animation")
+    parser.add_argument("--anims", type=int, default=2, help="Intro WSA animations")
+    parser.add_argument("--cps-size", type=parse_size, default=(320, 200), help="CPS size, e.g. 320x200")
+    parser.add_argument("--wsa-size", type=parse_size, default=(184, 128), help="WSA size, e.g. 184x128")
+    parser.add_argument("--cps-comp", type=int, choices=(0, 1, 3, 4), default=4, help="CPS compression type")
+    parser.add_argument("--emc-functions", type=int, default=12)
+    parser.add_argument("--emc-loops", type=int, default=1, help="Loop count inside each EMC function")
+    parser.add_argument("--strings", type=int, default=40, help="Strings in _NPC.EMC")
+    parser.add_argument("--shapes", type=int, default=0, help="Shapes in a character shape table (SHAPES.SHP, 0 to skip)")
+    parser.add_argument("--font", action="store_true", help="Add a bitmap font (8FAT.FNT)")
+    parser.add_argument("--pak", action="store_true", help="Pack files into scene PAKs, MSC.PAK and INTRO.PAK")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    dst = Path(args.dst_dir)
+    dst.mkdir(parents=True, exist_ok=True)
+    cps_w, cps_h = args.cps_size
+    wsa_w, wsa_h = args.wsa_size
+
+    loose: Dict[str, bytes] = {"PALETTE.COL": synth_palette(rng)}
+    paks: Dict[str, Dict[str, bytes]] = {"MSC.PAK": {}, "INTRO.PAK": {}}
+
+    for i in range(args.scenes):
+        scene = f"SCENE{i:02d}"
+        files = {
+            f"{scene}.CPS": encode_cps(synth_image(rng, cps_w, cps_h), args.cps_comp),
+            f"{scene}.DAT": build_scene_dat(rng),
+            f"{scene}.EMC": build_emc(rng, args.emc_functions, loops=args.emc_loops),
+            f"{scene}.WSA": build_wsa(synth_frames(rng, wsa_w, wsa_h, args.frames), wsa_w, wsa_h)
+        }
+        paks[f"{scene}.PAK"] = files
+        paks["MSC.PAK"][f"{scene}.MSC"] = encode_cps(synth_mask(rng, 320, 144), 4)
+
+    for i in range(args.anims):
+        frames = synth_frames(rng, wsa_w, wsa_h, args.frames)
+        paks["INTRO.PAK"][f"INTRO{i:02d}.WSA"] = build_wsa(frames, wsa_w, wsa_h)
+    loose["_NPC.EMC"] = build_emc(rng, 2, 1, strings=synth_strings(rng, args.strings))
+    if args.font:
+        loose["8FAT.FNT"] = build_fnt(synth_glyphs(rng), 8)
+    if args.shapes:
+        loose["SHAPES.SHP"] = build_shape_table(synth_shapes(rng, args.shapes))
+
+    total = 0
+    for name, data in loose.items():
+        (dst / name).write_bytes(data)
+        total += len(data)
+    for pak_name, files in paks.items():
+        if args.pak:
+            data = build_pak(files)
+            (dst / pak_name).write_bytes(data)
+            total += len(data)
+            continue
+        for name, data in files.items():
+            (dst / name).write_bytes(data)
+            total += len(data)
+
+    print(f"Wrote synthetic corpus to {dst} ({total} bytes, seed {args.seed})")
+
+
+if __name__ == "__main__":
+    main()
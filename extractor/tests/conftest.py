@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The scripts and the kyra package live in extractor/, which is not installed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,91 @@
+import json
+import random
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+from kyra.atlas import build_sheet_atlas, pack_shelves
+from kyra.pixels import crop
+
+EXTRACTOR = Path(__file__).resolve().parent.parent
+
+
+def test_pack_shelves_without_overlap():
+    rng = random.Random(4)
+    sizes = [(rng.randrange(1, 60), rng.randrange(1, 40)) for _ in range(40)]
+    positions, width, height = pack_shelves(sizes, max_width=128, padding=1)
+    assert width <= 128
+    boxes = [(x, y, x + w, y + h) for (x, y), (w, h) in zip(positions, sizes)]
+    assert all(x1 <= width and y1 <= height for _x, _y, x1, y1 in boxes)
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            assert a[2] <= b[0] or b[2] <= a[0] or a[3] <= b[1] or b[3] <= a[1]
+    assert pack_shelves([], 128) == ([], 0, 0)
+
+
+def sheet():
+    width, height = 64, 32
+    pixels = bytearray(width * height)
+    for row in range(4, 12):
+        pixels[row * width + 10:row * width + 14] = bytes([5, 6, 7, 8])
+    for row in range(16, 32):
+        pixels[row * width + 32:row * width + 64] = bytes([3]) * 32
+    return {"name": "SHEET", "width": width, "height": height, "pixels": bytes(pixels), "palette": None}
+
+
+def test_atlas_trims_and_shares_cells():
+    image = sheet()
+    defs = [
+        {"id": 0, "x": 8, "y": 0, "w": 16, "h": 16},
+        {"id": 1, "x": 8, "y": 0, "w": 16, "h": 16},
+        {"id": 2, "x": 32, "y": 16, "w": 40, "h": 16},
+        {"id": 3, "x": 0, "y": 20, "w": 8, "h": 8}
+    ]
+    atlas = build_sheet_atlas(image, defs, transparent_index=0, padding=0)
+    assert atlas["cells"] == 2
+    first, second, wide, empty = atlas["frames"]
+    assert (first["offsetX"], first["offsetY"], first["w"], first["h"]) == (2, 4, 4, 8)
+    assert (first["x"], first["y"]) == (second["x"], second["y"])
+    # The third rectangle runs past the sheet and is clamped before trimming
+    assert (wide["fullWidth"], wide["w"], wide["h"]) == (32, 32, 16)
+    assert (empty["w"], empty["h"]) == (0, 0)
+    for frame, sprite in ((first, defs[0]), (wide, defs[2])):
+        got = crop(atlas["pixels"], atlas["width"], atlas["height"], frame["x"], frame["y"], frame["w"], frame["h"])
+        want = crop(image["pixels"], 64, 32, sprite["x"] + frame["offsetX"], sprite["y"] + frame["offsetY"], frame["w"], frame["h"])
+        assert got == want
+
+
+def test_atlas_without_trim_keeps_rectangles():
+    atlas = build_sheet_atlas(sheet(), [{"id": 0, "x": 8, "y": 0, "w": 16, "h": 16}], transparent_index=None)
+    assert (atlas["width"], atlas["height"]) == (16, 16)
+    assert atlas["frames"][0]["offsetX"] == 0
+
+
+def write_cps(path):
+    pixels = bytearray(320 * 200)
+    for row in range(4, 12):
+        pixels[row * 320 + 10:row * 320 + 14] = bytes([5, 6, 7, 8])
+    body = struct.pack("<HIH", 0, len(pixels), 0) + bytes(pixels)
+    path.write_bytes(struct.pack("<H", len(body)) + body)
+
+
+def run_atlas(*args):
+    return subprocess.run([sys.executable, str(EXTRACTOR / "scene_atlas.py"), *map(str, args)], capture_output=True, text=True)
+
+
+def test_cli_meta_file_and_errors(tmp_path):
+    write_cps(tmp_path / "SHEET.CPS")
+    write_cps(tmp_path / "OTHER.CPS")
+    meta = tmp_path / "scene.json"
+    meta.write_text(json.dumps({"spriteDefs": [{"id": 0, "x": 8, "y": 0, "w": 16, "h": 16}]}))
+
+    result = run_atlas(tmp_path / "SHEET.CPS", tmp_path / "out", "--meta", meta)
+    assert result.returncode == 0, result.stderr
+    table = json.loads((tmp_path / "out" / "SHEET_atlas.json").read_text())
+    assert table["frames"][0]["w"] == 4 and (tmp_path / "out" / "SHEET_atlas.png").is_file()
+
+    result = run_atlas(tmp_path, tmp_path / "out", "--meta", meta)
+    assert result.returncode == 2 and "single file" in result.stderr
+    result = run_atlas(tmp_path / "SHEET.CPS", tmp_path / "out", "--meta", tmp_path / "missing.json")
+    assert result.returncode == 2 and "does not exist" in result.stderr
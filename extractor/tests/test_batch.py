@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from kyra.batch import BatchRunner
+from kyra.output import capture_writes, write_bytes
+
+
+def reverse_file(path, data, dst_dir):
+    # Module level so process workers can unpickle it
+    if data.startswith(b"bad"):
+        raise ValueError(f"cannot convert {path.name}")
+    write_bytes(dst_dir / f"{path.stem}.out", data[::-1])
+    return os.getpid()
+
+
+def test_capture_writes_defers_to_caller(tmp_path):
+    with capture_writes() as writes:
+        write_bytes(tmp_path / "a.bin", b"abc")
+    assert writes == [(tmp_path / "a.bin", b"abc")]
+    assert not (tmp_path / "a.bin").exists()
+    write_bytes(tmp_path / "a.bin", b"abc")
+    assert (tmp_path / "a.bin").read_bytes() == b"abc"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_runner_writes_outputs_and_reports(tmp_path, jobs):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(12):
+        (src / f"F{i:02d}.bin").write_bytes(b"bad" if i == 5 else bytes(range(i + 1)))
+    (src / "SKIP.bin").write_bytes(b"skipped")
+    dst = tmp_path / "out"
+    finished = []
+
+    runner = BatchRunner(jobs=jobs, prefetch=2)
+    results = runner.run(
+        sorted(src.iterdir()),
+        reverse_file,
+        lambda path: (dst,),
+        skip=lambda path: path.stem == "SKIP",
+        done=lambda path, result: finished.append((path.name, (dst / f"{path.stem}.out").exists()))
+    )
+
+    assert sorted(results) == [f"F{i:02d}.bin" for i in range(12) if i != 5]
+    assert runner.failed == {"F05.bin": "ValueError: cannot convert F05.bin"}
+    assert runner.skipped == ["SKIP.bin"]
+    # done runs after the outputs are on disk
+    assert sorted(finished) == [(name, True) for name in sorted(results)]
+    for i in range(12):
+        if i != 5:
+            assert (dst / f"F{i:02d}.out").read_bytes() == bytes(range(i + 1))[::-1]
+    assert runner.bytes_written == sum(i + 1 for i in range(12) if i != 5)
+    assert "11 converted, 1 up to date, 1 failed" in runner.summary()
+    if jobs > 1:
+        # The CPU work ran in worker processes, the writes in this one
+        assert os.getpid() not in results.values()
+
+
+def test_missing_input_is_a_failure(tmp_path):
+    runner = BatchRunner(jobs=1)
+    runner.run([tmp_path / "missing.bin"], reverse_file, lambda path: (tmp_path,))
+    assert list(runner.failed) == ["missing.bin"]
+    assert runner.failed["missing.bin"].startswith("FileNotFoundError")
@@ -0,0 +1,27 @@
+from bench import Workload, compare, load_backends, run_benchmarks, synthetic_files, writer_formats
+
+
+def test_synthetic_run_covers_every_benchmark():
+    work = Workload(synthetic_files(seed=1, scenes=3, frames=3))
+    assert {comp for comp, _payload, _size in work.images} >= {1, 3, 4}
+    results = run_benchmarks(work, load_backends(), repeat=1, memory=False)
+    assert set(results) >= {"decode_frame1", "decode_frame3", "decode_frame4", "decode_frame_delta", "EMCExtractor.run_function", "parse_scene_body"}
+    writers = results.pop("write_image")
+    assert set(writers) == set(writer_formats())
+    assert all(r["outBytes"] > 0 for r in writers.values())
+    for by_backend in results.values():
+        assert set(by_backend) == {"python"}
+    for by_backend in list(results.values()) + [writers]:
+        for result in by_backend.values():
+            assert result["items"] > 0 and result["seconds"] > 0
+
+
+def test_compare_flags_slowdowns_only():
+    def result(rate):
+        return {"python": {"itemsPerSec": rate, "unit": "images"}}
+
+    baseline = {"results": {"fast": result(100.0), "slow": result(100.0), "gone": result(100.0)}}
+    current = {"fast": result(150.0), "slow": result(80.0)}
+    regressions = compare(current, baseline, threshold=10.0)
+    assert len(regressions) == 1 and regressions[0].startswith("slow [python]: -20.0%")
+    assert compare(current, baseline, threshold=25.0) == []
@@ -0,0 +1,121 @@
+import re
+import struct
+import threading
+from pathlib import Path
+
+import pytest
+
+from kyra.bundle import BUNDLE_ENTRY, BUNDLE_HEADER, BUNDLE_MAGIC, build_bundle, coalesce_ranges, collect_files, entry_type, parse_toc, split_bundles, write_bundles
+from kyra.manifest import build_manifest, write_manifest
+from kyra.serve import fetch_bundle, make_server, parse_range
+
+BUNDLE_TS = Path(__file__).resolve().parent.parent.parent / "src" / "engine" / "core" / "assetBundle.ts"
+
+
+def populate(root):
+    files = {
+        "intro/frames/0000.png": b"\x89PNG" + bytes(range(40)),
+        "intro/frames/0001.png": b"\x89PNG" + bytes(3),
+        "scenes/GEMCUT.json": b'{"scene": "GEMCUT"}',
+        "scenes/empty.bin": b"",
+        "palettes/MAIN.fade.bin": bytes(100)
+    }
+    for name, data in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return files
+
+
+def ts_layout():
+    source = BUNDLE_TS.read_text(encoding="utf-8")
+    consts = {name: int(value) for name, value in re.findall(r"const (HEADER_SIZE|ENTRY_SIZE) = (\d+);", source)}
+    header = {int(off): int(bits) for bits, off in re.findall(r"view\.getUint(\d+)\((\d+), true\)", source)}
+    entry = {int(off or 0): int(bits) for bits, off in re.findall(r"view\.getUint(\d+)\(pos(?: \+ (\d+))?, true\)", source)}
+    hash_at = re.search(r"new Uint8Array\(buffer, pos \+ (\d+), (\d+)\)", source)
+    return consts, header, entry, (int(hash_at.group(1)), int(hash_at.group(2)))
+
+
+def test_layout_matches_engine_reader():
+    consts, header, entry, hash_at = ts_layout()
+    assert consts == {"HEADER_SIZE": BUNDLE_HEADER.size, "ENTRY_SIZE": BUNDLE_ENTRY.size}
+    # magic(4) version(2) align(2) count(4 @ 8) tocSize(4 @ 12) dataOffset(4 @ 16)
+    assert struct.calcsize("<4sHH") == 8
+    assert header == {8: 32, 12: 32}
+    # offset(4 @ 0) length(4 @ 4) nameOffset(4 @ 8) nameLength(2 @ 12) type(2 @ 14) hash(8 @ 16)
+    assert entry == {0: 32, 4: 32, 8: 32, 12: 16, 14: 16}
+    assert hash_at == (struct.calcsize("<IIIHH"), 8)
+    assert '"KBND"' in BUNDLE_TS.read_text(encoding="utf-8") and BUNDLE_MAGIC == b"KBND"
+
+
+def test_bundle_round_trip_and_alignment(tmp_path):
+    files = populate(tmp_path)
+    names = collect_files(tmp_path)
+    assert names == sorted(files)
+    data = build_bundle(tmp_path, names, align=16)
+    magic, _version, align, count, toc_size, data_offset = BUNDLE_HEADER.unpack_from(data, 0)
+    assert (magic, align, count) == (BUNDLE_MAGIC, 16, len(files))
+    assert data_offset % 16 == 0 and data_offset >= BUNDLE_HEADER.size + toc_size
+    # The TOC parses from the header and TOC bytes alone
+    toc = parse_toc(data[:BUNDLE_HEADER.size + toc_size])
+    for name, entry in toc.items():
+        assert entry["offset"] % 16 == 0
+        assert data[entry["offset"]:entry["offset"] + entry["length"]] == files[name]
+        assert entry["type"] == entry_type(name)
+    assert toc["scenes/GEMCUT.json"]["type"] == 1 and toc["intro/frames/0000.png"]["type"] == 2
+    with pytest.raises(ValueError, match="truncated"):
+        parse_toc(data[:BUNDLE_HEADER.size + toc_size - 1])
+    with pytest.raises(ValueError):
+        parse_toc(b"XXXX" + data[4:])
+
+
+def test_collect_skips_manifest_twins_and_filters_prefixes(tmp_path):
+    populate(tmp_path)
+    write_manifest(tmp_path, build_manifest(tmp_path))
+    assert collect_files(tmp_path) == sorted(populate(tmp_path))
+    assert collect_files(tmp_path, ["intro"]) == ["intro/frames/0000.png", "intro/frames/0001.png"]
+
+
+def test_split_and_write_bundles(tmp_path):
+    populate(tmp_path)
+    names = collect_files(tmp_path)
+    groups = split_bundles(tmp_path, names, max_size=60)
+    assert [n for g in groups for n in g] == names
+    assert len(groups) > 1
+    paths = write_bundles(tmp_path, tmp_path / "out", "assets", names, max_size=60)
+    assert [p.name for p in paths] == [f"assets.{i:02d}.kbnd" for i in range(len(groups))]
+    assert [p.name for p in write_bundles(tmp_path, tmp_path / "one", "assets", names, None)] == ["assets.kbnd"]
+
+
+def test_coalesce_ranges():
+    entries = [{"offset": 32, "length": 10}, {"offset": 0, "length": 16}, {"offset": 48, "length": 4}, {"offset": 200, "length": 1}]
+    assert coalesce_ranges(entries) == [(0, 15), (32, 41), (48, 51), (200, 200)]
+    assert coalesce_ranges(entries, gap=16) == [(0, 51), (200, 200)]
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    for header in ("bytes=100-", "bytes=9-3", "bytes=-0"):
+        with pytest.raises(ValueError):
+            parse_range(header, 100)
+
+
+def test_fetch_bundle_over_http(tmp_path):
+    files = populate(tmp_path)
+    write_bundles(tmp_path, tmp_path / "b", "assets", collect_files(tmp_path), None)
+    server = make_server(tmp_path, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/b/assets.kbnd"
+        got = fetch_bundle(url, "", parallel=2, toc_guess=32)
+        assert got == files
+        stats = server.request_log.stats()
+        assert stats["requests"] == stats["ranges"] >= 2
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from kyra.cache import BuildCache, run_cached
+
+TOOL = str(Path(__file__).resolve())
+
+
+def make_build(src: Path, out_dir: Path, calls: list):
+    def build() -> None:
+        calls.append(src.name)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "a.txt").write_bytes(src.read_bytes().upper())
+        (out_dir / "sub").mkdir(exist_ok=True)
+        (out_dir / "sub" / "b.txt").write_bytes(src.read_bytes()[::-1])
+
+    return build
+
+
+def test_hit_restores_missing_and_changed_outputs(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    src = tmp_path / "in.txt"
+    src.write_bytes(b"abc")
+    out_dir = tmp_path / "out"
+    calls: list = []
+
+    assert run_cached(cache, TOOL, [src], {"x": 1}, [out_dir], make_build(src, out_dir, calls)) is False
+    assert run_cached(cache, TOOL, [src], {"x": 1}, [out_dir], make_build(src, out_dir, calls)) is True
+    assert (cache.hits, cache.misses, len(calls)) == (1, 1, 1)
+
+    (out_dir / "sub" / "b.txt").unlink()
+    (out_dir / "a.txt").write_bytes(b"edited")
+    assert run_cached(cache, TOOL, [src], {"x": 1}, [out_dir], make_build(src, out_dir, calls)) is True
+    assert (out_dir / "a.txt").read_bytes() == b"ABC"
+    assert (out_dir / "sub" / "b.txt").read_bytes() == b"cba"
+    assert len(calls) == 1
+
+
+def test_inputs_options_and_targets_are_part_of_the_key(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    src = tmp_path / "in.txt"
+    src.write_bytes(b"abc")
+    calls: list = []
+    run_cached(cache, TOOL, [src], {"x": 1}, [tmp_path / "out"], make_build(src, tmp_path / "out", calls))
+    run_cached(cache, TOOL, [src], {"x": 2}, [tmp_path / "out"], make_build(src, tmp_path / "out", calls))
+    run_cached(cache, TOOL, [src], {"x": 1}, [tmp_path / "other"], make_build(src, tmp_path / "other", calls))
+    src.write_bytes(b"abd")
+    run_cached(cache, TOOL, [src], {"x": 1}, [tmp_path / "out"], make_build(src, tmp_path / "out", calls))
+    assert len(calls) == 4 and cache.hits == 0
+    assert (tmp_path / "out" / "a.txt").read_bytes() == b"ABD"
+
+
+def test_no_cache_always_builds(tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_bytes(b"abc")
+    calls: list = []
+    for _ in range(2):
+        assert run_cached(None, TOOL, [src], {}, [tmp_path / "out"], make_build(src, tmp_path / "out", calls)) is False
+    assert len(calls) == 2
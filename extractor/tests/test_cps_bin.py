@@ -0,0 +1,37 @@
+import struct
+
+from kyra.cps import CPS_BIN_ALIGN, CPS_BIN_FLAG_PALETTE, CPS_BIN_HEADER, CPS_BIN_MAGIC, cps_bin_header_json, encode_cps_bin, read_cps
+
+
+def write_cps(path, pixels, palette=b""):
+    # Type 0 (stored) CPS: u16 size, u16 compType, u32 imgSize, u16 palSize
+    body = struct.pack("<HIH", 0, len(pixels), len(palette)) + palette + pixels
+    path.write_bytes(struct.pack("<H", len(body)) + body)
+    return path
+
+
+def test_bin_layout(tmp_path):
+    pixels = bytes(i % 256 for i in range(320 * 200))
+    palette = bytes(range(64)) * 12
+    image = read_cps(write_cps(tmp_path / "TEST.CPS", pixels, palette), None, None, None)
+    data = encode_cps_bin(image)
+
+    magic, version, width, height, comp_type, flags, pal_size, img_size, pal_off, pix_off = CPS_BIN_HEADER.unpack_from(data, 0)
+    assert (magic, version, width, height, comp_type) == (CPS_BIN_MAGIC, 1, 320, 200, 0)
+    assert flags & CPS_BIN_FLAG_PALETTE
+    assert (pal_size, img_size) == (768, 64000)
+    assert pal_off % CPS_BIN_ALIGN == 0 and pix_off % CPS_BIN_ALIGN == 0
+    assert pix_off >= pal_off + 768
+    assert data[pix_off:] == pixels
+    # 6-bit palette entries are widened to 8 bits
+    assert data[pal_off:pal_off + 768] == bytes(v * 4 for v in palette)
+
+
+def test_bin_without_palette(tmp_path):
+    pixels = bytes(64000)
+    image = read_cps(write_cps(tmp_path / "BARE.CPS", pixels), None, None, None)
+    data = encode_cps_bin(image)
+    header = cps_bin_header_json(image, "BARE.bin", data)
+    assert header["hasPalette"] is False
+    assert header["raw"] == {"file": "BARE.bin", "paletteOffset": 32, "pixelsOffset": 800, "size": 800 + 64000}
+    assert data[32:800] == bytes(768)
@@ -0,0 +1,57 @@
+import base64
+import json
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+from kyra.cps import CPS_BIN_HEADER, export_cps
+
+EXTRACTOR = Path(__file__).resolve().parent.parent
+
+
+def write_cps(path, pixels, palette=b""):
+    body = struct.pack("<HIH", 0, len(pixels), len(palette)) + palette + pixels
+    path.write_bytes(struct.pack("<H", len(body)) + body)
+    return path
+
+
+def test_one_decode_many_outputs(tmp_path):
+    pixels = bytes((x ^ y) & 0xFF for y in range(200) for x in range(320))
+    src = write_cps(tmp_path / "room.cps", pixels, bytes(range(64)) * 12)
+    written = export_cps(src, tmp_path / "out", ["json", "bin", "indexed-png", "png"])
+    assert [p.name for p in written] == ["ROOM.json", "ROOM.bin", "ROOM_indexed.png", "ROOM.png"]
+
+    payload = json.loads((tmp_path / "out" / "ROOM.json").read_text(encoding="utf-8"))
+    assert base64.b64decode(payload["rawBase64"]) == pixels
+    data = (tmp_path / "out" / "ROOM.bin").read_bytes()
+    assert data[CPS_BIN_HEADER.unpack_from(data, 0)[9]:] == pixels
+    with Image.open(tmp_path / "out" / "ROOM_indexed.png") as img:
+        assert img.mode == "P" and img.tobytes() == pixels
+    with Image.open(tmp_path / "out" / "ROOM.png") as img:
+        assert img.size == (320, 200)
+
+
+def test_sprites_are_cropped_with_index0_transparent(tmp_path):
+    pixels = bytearray(64000)
+    pixels[10 * 320 + 20:10 * 320 + 24] = b"\x05\x00\x05\x05"
+    src = write_cps(tmp_path / "SHAPES.CPS", bytes(pixels), bytes(range(64)) * 12)
+    export_cps(src, tmp_path, [], sprite_defs=[{"id": 7, "x": 20, "y": 10, "w": 4, "h": 1}, {"id": 8, "x": 400, "y": 0, "w": 4, "h": 4}])
+    files = sorted(p.name for p in (tmp_path / "SHAPES_sprites").iterdir() if p.suffix == ".png")
+    assert files == ["007.png"]
+    with Image.open(tmp_path / "SHAPES_sprites" / "007.png") as img:
+        assert img.size == (4, 1)
+        assert [img.getpixel((x, 0))[3] for x in range(4)] == [255, 0, 255, 255]
+
+
+def test_cli_rejects_outputs_that_share_a_file(tmp_path):
+    for flags, clash in ((["--json", "--json-bin"], "<name>.json"), (["--bin", "--json-bin"], "<name>.bin")):
+        result = subprocess.run(
+            [sys.executable, str(EXTRACTOR / "cps_export.py"), str(tmp_path / "X.CPS"), str(tmp_path), *flags],
+            capture_output=True,
+            text=True
+        )
+        assert result.returncode == 2
+        assert clash in result.stderr
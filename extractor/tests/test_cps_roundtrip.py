@@ -0,0 +1,106 @@
+import random
+
+import pytest
+from PIL import Image
+
+from kyra.codecs import decode_image
+from kyra.cps import encode_cps, png_to_indices, read_cps
+from kyra.encoders import encode_image
+from kyra.palette import palette_from_bytes
+from kyra.synth import synth_image, synth_mask, synth_palette
+from msc_from_json import encode_msc
+
+WIDTH, HEIGHT = 64, 40
+
+
+def scene():
+    rng = random.Random(1)
+    return palette_from_bytes(synth_palette(rng)), bytes(synth_image(rng, WIDTH, HEIGHT))
+
+
+def save_indexed(path, pixels, palette):
+    img = Image.frombytes("P", (WIDTH, HEIGHT), pixels)
+    img.putpalette(palette.padded())
+    img.save(path)
+
+
+def save_rgba(path, pixels, palette, transparent_index):
+    rgba = bytearray()
+    for index in pixels:
+        rgba += palette.rgb[index * 3:index * 3 + 3] + bytes([0 if index == transparent_index else 255])
+    Image.frombytes("RGBA", (WIDTH, HEIGHT), bytes(rgba)).save(path)
+
+
+def first_index(palette):
+    # RGB(A) input maps a colour shared by several entries to the lowest one
+    first = {}
+    for index in range(255, -1, -1):
+        first[palette.rgb[index * 3:index * 3 + 3]] = index
+    return bytes(first[palette.rgb[i * 3:i * 3 + 3]] for i in range(256))
+
+
+def repack(tmp_path, png, palette, comp_type):
+    width, height, indices = png_to_indices(png, palette, 0)
+    cps = tmp_path / f"OUT{comp_type}.CPS"
+    cps.write_bytes(encode_cps(indices, comp_type))
+    return indices, read_cps(cps, width, height, None)
+
+
+@pytest.mark.parametrize("comp_type", [0, 1, 3, 4])
+def test_indexed_png_round_trip(tmp_path, comp_type):
+    palette, pixels = scene()
+    save_indexed(tmp_path / "in.png", pixels, palette)
+    indices, image = repack(tmp_path, tmp_path / "in.png", palette, comp_type)
+    assert indices == pixels
+    assert bytes(image["pixels"]) == pixels
+    assert image["compType"] == comp_type and image["imgSize"] == WIDTH * HEIGHT
+
+
+@pytest.mark.parametrize("comp_type", [0, 1, 3, 4])
+def test_rgba_png_round_trip(tmp_path, comp_type):
+    palette, pixels = scene()
+    save_rgba(tmp_path / "in.png", pixels, palette, 0)
+    # Index 0 is written fully transparent and comes back as transparent_index 0
+    expected = pixels.translate(b"\x00" + first_index(palette)[1:])
+    indices, image = repack(tmp_path, tmp_path / "in.png", palette, comp_type)
+    assert indices == expected
+    assert bytes(image["pixels"]) == expected
+
+
+def test_rgba_nearest_colour_and_missing_palette(tmp_path):
+    palette = palette_from_bytes(bytes([0, 0, 0, 63, 0, 0, 0, 63, 0] + [0] * 759))
+    Image.frombytes("RGBA", (3, 1), bytes([250, 10, 5, 255, 3, 240, 9, 255, 9, 9, 9, 0])).save(tmp_path / "near.png")
+    assert png_to_indices(tmp_path / "near.png", palette, 7) == (3, 1, bytes([1, 2, 7]))
+    with pytest.raises(ValueError):
+        png_to_indices(tmp_path / "near.png", None)
+
+
+def test_embedded_palette_is_kept(tmp_path):
+    raw = bytes(range(64)) * 12
+    cps = tmp_path / "PAL.CPS"
+    cps.write_bytes(encode_cps(bytes(64000), 4, raw))
+    image = read_cps(cps, None, None, None)
+    assert image["palSize"] == 768 and image["palette"].rgb == bytes(v * 4 for v in raw)
+
+
+@pytest.mark.parametrize("effort", range(9))
+def test_format80_effort_levels_round_trip(effort):
+    rng = random.Random(effort)
+    pixels = bytes(synth_image(rng, 320, 200))
+    encoded = encode_image(4, pixels, effort)
+    assert bytes(decode_image(4, encoded + bytes(16), len(pixels))) == pixels
+
+
+def test_higher_effort_is_not_larger():
+    pixels = bytes(synth_image(random.Random(5), 320, 200))
+    sizes = [len(encode_image(4, pixels, effort)) for effort in (0, 4, 8)]
+    assert sizes[0] >= sizes[1] >= sizes[2]
+
+
+def test_msc_repack_round_trip(tmp_path):
+    mask = bytes(synth_mask(random.Random(2), 320, 144))
+    data = encode_msc({"format": "kyra-msc", "width": 320, "height": 144, "pixels": list(mask)}, 4)
+    (tmp_path / "M.MSC").write_bytes(data)
+    assert bytes(read_cps(tmp_path / "M.MSC", 320, 144, None)["pixels"]) == mask
+    with pytest.raises(ValueError):
+        encode_msc({"format": "kyra-msc", "width": 2, "height": 2, "pixels": [0]})
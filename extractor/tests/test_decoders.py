@@ -0,0 +1,59 @@
+import random
+
+from PIL import Image
+
+from kyra.dat import decode_scene_dat
+from kyra.emc import extract_emc, parse_emc_text_strings
+from kyra.palette import expand_rgba, load_palette
+from kyra.synth import build_emc, build_scene_dat, build_wsa, synth_frames, synth_palette, synth_strings
+from kyra.wsa import decode_wsa_frames, parse_wsa
+
+
+def test_wsa_frames_decode_to_source_frames(tmp_path):
+    rng = random.Random(7)
+    frames = synth_frames(rng, 48, 32, 5)
+    src = tmp_path / "ANIM.WSA"
+    src.write_bytes(build_wsa(frames, 48, 32))
+    pal = tmp_path / "ANIM.COL"
+    pal.write_bytes(synth_palette(rng))
+
+    num_frames, width, height, _delta, _flags, _offsets, _data, first_frame = parse_wsa(src.read_bytes(), use_flags=False)
+    assert (num_frames, width, height, first_frame) == (5, 48, 32, 1)
+
+    out = tmp_path / "out"
+    decode_wsa_frames(src, pal, out, None)
+    palette = load_palette(pal)
+    assert sorted(p.name for p in out.iterdir()) == [f"{i:04d}.png" for i in range(5)]
+    for i, frame in enumerate(frames):
+        with Image.open(out / f"{i:04d}.png") as img:
+            assert img.convert("RGBA").tobytes() == bytes(expand_rgba(frame, palette))
+
+
+def test_parse_wsa_rejects_truncated_data():
+    data = build_wsa(synth_frames(random.Random(1), 16, 16, 3), 16, 16)
+    assert parse_wsa(data[:10], use_flags=False) is None
+    assert parse_wsa(data[:40], use_flags=False) is None
+
+
+def test_scene_dat_sprites_and_anims(tmp_path):
+    src = tmp_path / "SCENE.DAT"
+    src.write_bytes(build_scene_dat(random.Random(3), sprite_count=5, anim_count=2))
+    meta = decode_scene_dat(src)
+    assert meta["scene"] == "SCENE"
+    assert [s["id"] for s in meta["spriteDefs"]] == list(range(5))
+    assert all(s["w"] % 8 == 0 and s["w"] > 0 for s in meta["spriteDefs"])
+    assert len(meta["anims"]) == 2
+    assert meta["drawLayerTable"] == sorted(meta["drawLayerTable"])
+
+
+def test_emc_scripts_and_text(tmp_path):
+    rng = random.Random(5)
+    strings = synth_strings(rng, 4)
+    data = build_emc(rng, functions=3, calls_per_function=2, strings=strings)
+    src = tmp_path / "SCENE.EMC"
+    src.write_bytes(data)
+    assert parse_emc_text_strings(data) == strings
+    result = extract_emc(str(src))
+    assert result["file"] == "SCENE.EMC"
+    found = sum(len(result[key]) for key in ("sceneShapes", "sceneAnimShapes", "itemShapes", "dropItems", "groundItems"))
+    assert found > 0
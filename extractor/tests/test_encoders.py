@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from kyra.codecs import decode_frame2, decode_frame_delta, decode_image
+from kyra.encoders import encode_frame2, encode_frame_delta, encode_image
+from kyra.pak import parse_directory
+from kyra.synth import build_pak, synth_frames, synth_image, synth_mask
+
+
+def samples():
+    rng = random.Random(7)
+    yield "image", bytes(synth_image(rng, 320, 200))
+    yield "mask", bytes(synth_mask(rng, 320, 144))
+    yield "noise", bytes(rng.randrange(256) for _ in range(5000))
+    yield "flat", bytes(70000)
+    yield "short", b"\x01\x02"
+    yield "one", b"\x09"
+    yield "runs", b"".join(bytes([i % 7]) * (i % 300 + 1) for i in range(200))
+
+
+@pytest.mark.parametrize("comp_type", [0, 1, 3, 4])
+@pytest.mark.parametrize("name,pixels", list(samples()))
+def test_image_round_trip(comp_type, name, pixels):
+    encoded = encode_image(comp_type, pixels)
+    # Decoders may read a little past the payload, as they do on real files
+    assert bytes(decode_image(comp_type, encoded + bytes(16), len(pixels))) == pixels
+
+
+def test_unknown_compression_type():
+    with pytest.raises(ValueError):
+        encode_image(2, b"\x00")
+
+
+@pytest.mark.parametrize("name,pixels", list(samples()))
+def test_format2_round_trip(name, pixels):
+    encoded = encode_frame2(pixels)
+    assert bytes(decode_frame2(encoded, len(pixels))) == pixels
+    # Zero runs are capped at 255 per pair
+    assert all(encoded[i + 1] <= 255 for i in range(0, len(encoded) - 1) if encoded[i] == 0)
+
+
+def test_frame_delta_round_trip():
+    rng = random.Random(3)
+    frames = [bytes(f) for f in synth_frames(rng, 184, 128, 6)]
+    frames.append(bytes(rng.randrange(256) for _ in range(184 * 128)))
+    frames.append(bytes(184 * 128))
+    current = bytearray(184 * 128)
+    for frame in frames:
+        decode_frame_delta(current, encode_frame_delta(bytes(current), frame))
+        assert bytes(current) == frame
+
+
+def test_pak_directory_round_trip():
+    files = {"A.CPS": b"abc", "LONGNAME.WSA": bytes(100), "EMPTY.DAT": b""}
+    data = build_pak(files)
+    entries = parse_directory(data)
+    assert [name for name, _ in entries] == list(files)
+    offsets = [off for _, off in entries] + [len(data)]
+    assert [data[offsets[i]:offsets[i + 1]] for i in range(len(files))] == list(files.values())
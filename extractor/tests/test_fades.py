@@ -0,0 +1,108 @@
+import re
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+from kyra.fades import FADE_HEADER, FADE_MAGIC, build_fade_table, fade_steps, parse_fade_table
+from kyra.palette import palette_from_bytes
+from palette_fades import source_palette
+
+EXTRACTOR = Path(__file__).resolve().parent.parent
+ASSETS_TS = EXTRACTOR.parent / "src" / "engine" / "core" / "assets.ts"
+
+
+def field_offsets(st, names):
+    # Byte offset of every field of a little-endian struct without padding
+    offsets = {}
+    pos = 0
+    for name, code in zip(names, re.findall(r"\d*[a-zA-Z]", st.format.lstrip("<"))):
+        offsets[name] = pos
+        pos += struct.calcsize("<" + code)
+    return offsets
+
+
+def ts_reads(function):
+    # name -> (bits, offset) for `const name = view.getUintNN(offset, true)`
+    source = ASSETS_TS.read_text(encoding="utf-8")
+    body = source[source.index(f"function {function}("):]
+    body = body[:body.index("\n}\n")]
+    return {name: (int(bits), int(offset)) for name, bits, offset in re.findall(r"const (\w+) = view\.getUint(\d+)\((\d+), true\)", body)}
+
+
+def palettes():
+    base = palette_from_bytes(bytes(i % 64 for i in range(768)))
+    target = palette_from_bytes(bytes(63 - i % 64 for i in range(768)))
+    return base, target
+
+
+def test_fade_steps_end_on_target():
+    steps = fade_steps(bytes([0, 100, 255]), bytes([255, 0, 255]), 4)
+    assert len(steps) == 12
+    assert steps[-3:] == bytes([255, 0, 255])
+    assert steps[:3] == bytes([64, 75, 255])
+
+
+def test_fade_table_round_trip():
+    base, target = palettes()
+    table = parse_fade_table(build_fade_table(base, target, steps=5))
+    assert table["steps"] == 5 and table["base"] == base.rgb
+    assert table["toBlack"][-1] == bytes(768)
+    assert table["toTarget"][-1] == target.rgb
+    assert parse_fade_table(build_fade_table(base, steps=3))["toTarget"] == []
+
+
+def test_header_matches_engine_reader():
+    base, target = palettes()
+    data = build_fade_table(base, target, steps=7)
+    offsets = field_offsets(FADE_HEADER, ["magic", "version", "steps", "flags", "colors", "blackOffset", "targetOffset"])
+    reads = ts_reads("loadFadeTable")
+    assert data[:4] == FADE_MAGIC and '"KFAD"' in ASSETS_TS.read_text(encoding="utf-8")
+    assert reads["steps"] == (16, offsets["steps"])
+    assert reads["flags"] == (16, offsets["flags"])
+    assert reads["size"] == (16, offsets["colors"])
+    assert reads["blackOffset"] == (32, offsets["blackOffset"])
+    assert reads["targetOffset"] == (32, offsets["targetOffset"])
+
+    # Read the blocks the way the engine does: base sits right before the
+    # fade-to-black steps, every block is colours * 3 bytes
+    steps = struct.unpack_from("<H", data, 6)[0]
+    size = struct.unpack_from("<H", data, 10)[0] * 3
+    black, target_offset = struct.unpack_from("<II", data, 12)
+    assert black % 32 == 0 and target_offset % 32 == 0
+    assert data[black - size:black] == base.rgb
+    assert data[target_offset + (steps - 1) * size:target_offset + steps * size] == target.rgb
+    assert len(data) == target_offset + steps * size
+
+
+def write_cps(path, palette, pixels=bytes(64000)):
+    body = struct.pack("<HIH", 4, len(pixels), len(palette)) + palette + b"\x80"
+    path.write_bytes(struct.pack("<H", len(body)) + body)
+
+
+def test_cps_palette_is_read_from_the_header(tmp_path):
+    raw = bytes(i % 64 for i in range(768))
+    write_cps(tmp_path / "A.CPS", raw)
+    assert source_palette(tmp_path / "A.CPS").rgb == palette_from_bytes(raw).rgb
+    write_cps(tmp_path / "B.CPS", b"")
+    assert source_palette(tmp_path / "B.CPS") is None
+
+
+def run_fades(*args):
+    return subprocess.run([sys.executable, str(EXTRACTOR / "palette_fades.py"), *map(str, args)], capture_output=True, text=True)
+
+
+def test_cli_writes_tables_and_rejects_name_clash(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "FOO.COL").write_bytes(bytes(i % 64 for i in range(768)))
+    write_cps(src / "BAR.CPS", bytes(768))
+    result = run_fades(src, tmp_path / "out", "--steps", "4")
+    assert result.returncode == 0, result.stderr
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["BAR.fade.bin", "FOO.fade.bin"]
+
+    write_cps(src / "FOO.CPS", bytes(768))
+    result = run_fades(src, tmp_path / "out2")
+    assert result.returncode == 2
+    assert "FOO.COL and FOO.CPS both write FOO.fade.bin" in result.stderr
+    assert not (tmp_path / "out2").exists()
@@ -0,0 +1,52 @@
+import json
+import random
+
+import pytest
+from PIL import Image
+
+from kyra.fnt import FNT_HEADER, build_font_atlas, build_fnt, parse_fnt, read_fnt, write_font
+from kyra.synth import synth_glyphs
+
+
+def test_fnt_round_trip():
+    glyphs = synth_glyphs(random.Random(2), height=9)
+    # Multi-colour glyph with blank rows on top and an odd width
+    glyphs[65] = (5, bytes(10) + bytes([1, 2, 3, 15, 1] * 6) + bytes(5))
+    font = parse_fnt(build_fnt(glyphs, 9))
+    assert font["height"] == 9
+    assert font["maxWidth"] == max(g[0] for g in glyphs if g)
+    for want, width, got in zip(glyphs, font["widths"], font["glyphs"]):
+        if want is None:
+            assert width == 0 and got is None
+        else:
+            assert (width, got) == want
+
+
+def test_parse_rejects_other_files():
+    with pytest.raises(ValueError):
+        parse_fnt(b"\x00" * 4)
+    with pytest.raises(ValueError, match="signature"):
+        parse_fnt(FNT_HEADER.pack(14, 0x1234, 0, 0, 0, 0, 0))
+
+
+def test_atlas_cells_and_blank_glyphs():
+    glyphs = [None, (3, bytes(6)), (2, bytes([1, 0, 0, 1])), (4, bytes([2] * 8))]
+    font = parse_fnt(build_fnt(glyphs, 2))
+    atlas = build_font_atlas(font, max_width=6, padding=1)
+    assert atlas["glyphs"] == [[-1, 0, 0], [-1, 0, 3], [0, 0, 2], [0, 3, 4]]
+    assert (atlas["width"], atlas["height"]) == (4, 5)
+    assert atlas["pixels"][:2] == bytes([1, 0]) and atlas["pixels"][12:16] == bytes([2] * 4)
+
+
+def test_write_font(tmp_path):
+    src = tmp_path / "8FAT.FNT"
+    src.write_bytes(build_fnt(synth_glyphs(random.Random(4)), 8))
+    image_path, table_path = write_font(read_fnt(src), tmp_path)
+    table = json.loads(table_path.read_text())
+    assert table["format"] == "kyra-font" and table["image"] == "8FAT.png"
+    assert len(table["glyphs"]) == 128 and table["glyphs"][32][0] == -1
+    with Image.open(image_path) as img:
+        rgba = img.convert("RGBA")
+    # Synthetic glyphs only use colour 1, which renders white; 0 is transparent
+    colours = {rgba.getpixel((x, y)) for x in range(rgba.width) for y in range(rgba.height)}
+    assert {c for c in colours if c[3]} == {(255, 255, 255, 255)}
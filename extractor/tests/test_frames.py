@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from kyra.frames import FRAMES_HEADER, FramesWriter, FrameFile, open_frames, source_digest
+from kyra.palette import palette_from_bytes
+from kyra.synth import build_wsa, synth_frames, synth_palette
+from kyra.wsa import decode_wsa_frames
+
+
+def write_frames(path, count=3, width=16, height=8):
+    rng = random.Random(count)
+    frames = [bytes(f) for f in synth_frames(rng, width, height, count)]
+    palette = palette_from_bytes(synth_palette(rng))
+    writer = FramesWriter(path, width, height, palette, source_digest(b"src"))
+    for i, frame in enumerate(frames):
+        writer.add(i * 2, frame)
+    writer.close()
+    return frames, palette
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "A.frames"
+    frames, palette = write_frames(path)
+    with open_frames(path) as ff:
+        assert (len(ff), ff.width, ff.height) == (3, 16, 8)
+        assert ff.matches(b"src") and not ff.matches(b"other")
+        assert ff.palette.rgb == palette.rgb and ff.palette.key == palette.key
+        assert [(i, f) for i, _w, _h, f in ff] == [(i * 2, f) for i, f in enumerate(frames)]
+        assert ff.view(1) == frames[1]
+        with pytest.raises(IndexError):
+            ff.frame(3)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_writer_rejects_wrong_size_and_aborts(tmp_path):
+    writer = FramesWriter(tmp_path / "B.frames", 4, 4, None, source_digest(b""))
+    with pytest.raises(ValueError):
+        writer.add(0, bytes(15))
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_close_releases_live_views(tmp_path):
+    path = tmp_path / "A.frames"
+    frames, _palette = write_frames(path)
+    ff = open_frames(path)
+    view = ff.view(0)
+    assert bytes(view) == frames[0]
+    ff.close()
+    assert ff.buffer.closed
+    with pytest.raises(ValueError):
+        bytes(view)
+    # Closing twice is harmless
+    ff.close()
+
+
+def test_close_with_a_live_slice_names_the_problem(tmp_path):
+    path = tmp_path / "A.frames"
+    write_frames(path)
+    ff = open_frames(path)
+    part = ff.view(0)[:4]
+    with pytest.raises(BufferError, match="release it before close"):
+        ff.close()
+    part.release()
+    ff.close()
+    assert ff.buffer.closed
+
+
+@pytest.mark.parametrize("size", [0, FRAMES_HEADER.size, None])
+def test_short_files_raise_format_errors(tmp_path, size):
+    path = tmp_path / "A.frames"
+    write_frames(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:size] if size is not None else data[:-3])
+    with pytest.raises(ValueError, match="too small" if size is not None else "Truncated"):
+        open_frames(path)
+
+
+def test_bad_magic_in_memory():
+    with pytest.raises(ValueError, match="Not a frames file"):
+        FrameFile(bytes(2000), "X")
+
+
+def test_wsa_decode_writes_and_reads_frames_file(tmp_path):
+    rng = random.Random(1)
+    src = tmp_path / "ANIM.WSA"
+    src.write_bytes(build_wsa(synth_frames(rng, 24, 16, 4), 24, 16))
+    pal = tmp_path / "ANIM.COL"
+    pal.write_bytes(synth_palette(rng))
+    cached = tmp_path / "cache" / "ANIM.frames"
+
+    decode_wsa_frames(src, pal, tmp_path / "a", 0, frames_path=cached)
+    with open_frames(cached) as ff:
+        assert ff.matches(src.read_bytes()) and len(ff) == 4
+    # The frames file alone reproduces the output, palette included
+    decode_wsa_frames(cached, None, tmp_path / "b", 0)
+    for png in sorted((tmp_path / "a").iterdir()):
+        assert (tmp_path / "b" / png.name).read_bytes() == png.read_bytes()
+    with pytest.raises(ValueError, match="already a frames file"):
+        decode_wsa_frames(cached, None, tmp_path / "c", 0, frames_path=tmp_path / "x.frames")
@@ -0,0 +1,64 @@
+import operator
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from kyra.graph import GraphRunner, Task
+
+EXTRACTOR = Path(__file__).resolve().parent.parent
+
+
+def tasks():
+    return [
+        Task("sum", operator.add, (1, 2), deps=["a", "b"]),
+        Task("a", operator.mul, (2, 3)),
+        Task("b", operator.neg, (4,)),
+        Task("bad", operator.truediv, (1, 0)),
+        Task("after-bad", operator.abs, (-1,), deps=["bad"]),
+        Task("after-after-bad", operator.abs, (-1,), deps=["after-bad"]),
+        Task("orphan", operator.abs, (-1,), deps=["missing"])
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_dependencies_and_failures(jobs):
+    runner = GraphRunner(jobs=jobs, progress=False)
+    runner.add(tasks())
+    results = runner.run()
+    assert results == {"a": 6, "b": -4, "sum": 3}
+    assert runner.failed["bad"].startswith("ZeroDivisionError")
+    assert runner.failed["after-bad"] == "dependency failed: bad"
+    assert runner.failed["after-after-bad"] == "dependency failed: after-bad"
+    assert runner.failed["orphan"].startswith("unresolved dependencies")
+
+
+def test_then_adds_follow_up_tasks_once():
+    runner = GraphRunner(jobs=1, progress=False)
+    follow = lambda result: [Task("double", operator.mul, (result, 2)), Task("a", operator.abs, (0,))]
+    runner.add([Task("a", operator.add, (1, 1), then=follow), Task("a", operator.add, (5, 5))])
+    assert runner.run() == {"a": 2, "double": 4}
+
+
+def test_cli_rejects_cps_outputs_that_share_a_file(tmp_path):
+    for outputs, clash in ((["json", "json-bin"], "<name>.json"), (["bin", "json-bin"], "<name>.bin")):
+        result = subprocess.run(
+            [sys.executable, str(EXTRACTOR / "kyra_extract.py"), str(tmp_path), "--out", str(tmp_path / "site"), *(f"--cps-output={name}" for name in outputs)],
+            capture_output=True,
+            text=True
+        )
+        assert result.returncode == 2
+        assert clash in result.stderr
+
+
+def test_shared_pool_is_reused():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for _ in range(2):
+            runner = GraphRunner(progress=False, pool=pool)
+            runner.add(tasks())
+            assert runner.run() == {"a": 6, "b": -4, "sum": 3}
+        # The runner must not shut down a pool it was handed
+        assert pool.submit(operator.neg, 1).result() == -1
@@ -0,0 +1,60 @@
+import json
+import random
+
+from kyra.fnt import build_fnt
+from kyra.layout import MEASURE_SPACING, break_lines, layout_string, layout_strings, load_font_widths, text_width
+from kyra.synth import synth_glyphs, synth_strings
+
+# Every printable character 6 pixels wide, 4 when measured for breaking
+WIDTHS = [6] * 128
+
+
+def test_short_text_is_one_line():
+    assert break_lines("Hello there", WIDTHS) == [(0, 11)]
+    assert text_width("abc", WIDTHS, MEASURE_SPACING) == 12
+
+
+def test_breaks_at_spaces_into_two_or_three_lines():
+    two = " ".join(["word"] * 10)
+    assert text_width(two, WIDTHS, MEASURE_SPACING) > 176
+    lines = break_lines(two, WIDTHS)
+    assert len(lines) == 2
+    assert all(two[end] == " " for _start, end in lines[:-1])
+    assert lines[-1][1] == len(two)
+
+    three = " ".join(["word"] * 20)
+    lines = break_lines(three, WIDTHS)
+    assert len(lines) == 3
+    # Lines cover the text; only the break spaces are dropped
+    assert " ".join(three[s:e] for s, e in lines) == three
+
+
+def test_unbreakable_text_stays_whole():
+    text = "x" * 100
+    assert break_lines(text, WIDTHS) == [(0, 100)]
+
+
+def test_layout_string_pen_positions():
+    text = " ".join(["word"] * 10)
+    laid = layout_string(text, WIDTHS)
+    (s0, e0, w0), (s1, e1, w1) = laid["lines"]
+    assert w0 == (e0 - s0) * 6 and w1 == (e1 - s1) * 6
+    assert laid["x"][s1:s1 + 3] == [0, 6, 12]
+
+
+def test_widths_from_fnt_and_json(tmp_path):
+    rng = random.Random(8)
+    glyphs = synth_glyphs(rng, height=10)
+    fnt = tmp_path / "8FAT.FNT"
+    fnt.write_bytes(build_fnt(glyphs, 10))
+    widths, height = load_font_widths(fnt)
+    assert height == 10 and widths == [g[0] if g else 0 for g in glyphs]
+
+    table = tmp_path / "8FAT.json"
+    table.write_text(json.dumps({"height": 10, "glyphs": [[0, 0, w] for w in widths]}))
+    assert load_font_widths(table) == (widths, 10)
+
+    strings = synth_strings(rng, 5)
+    payload = layout_strings(strings, widths, height, source="scene.json", font="8FAT")
+    assert payload["format"] == "kyra-text-layout" and payload["lineHeight"] == 10
+    assert [len(s["x"]) for s in payload["strings"]] == [len(s) for s in strings]
@@ -0,0 +1,57 @@
+import json
+
+from kyra.manifest import MANIFEST_NAME, build_manifest, file_digest, hashed_name, load_manifest, resolve, write_manifest
+
+
+def populate(root):
+    (root / "scenes").mkdir(parents=True)
+    (root / "scenes" / "GEMCUT.json").write_text('{"a": 1}')
+    (root / "palettes").mkdir()
+    (root / "palettes" / "MAIN.fade.bin").write_bytes(b"\x01\x02")
+    (root / "store").mkdir()
+    (root / "store" / ("ab" * 20 + ".png")).write_bytes(b"png")
+    (root / ".hidden").write_text("x")
+
+
+def test_hashed_name_keeps_compound_suffix():
+    assert hashed_name("MAIN.fade.bin", "0123456789abcdef") == "MAIN.0123456789.fade.bin"
+    assert hashed_name("README", "0123456789abcdef") == "README.0123456789"
+
+
+def test_manifest_twins_and_store_files(tmp_path):
+    populate(tmp_path)
+    manifest = build_manifest(tmp_path)
+    assets = manifest["assets"]
+    assert sorted(assets) == ["palettes/MAIN.fade.bin", "scenes/GEMCUT.json", "store/" + "ab" * 20 + ".png"]
+    digest = file_digest(tmp_path / "scenes" / "GEMCUT.json")
+    url = resolve(manifest, "scenes/GEMCUT.json")
+    assert url == f"scenes/GEMCUT.{digest[:10]}.json"
+    assert (tmp_path / url).read_text() == '{"a": 1}'
+    # Store files are already content-addressed and get no twin
+    assert resolve(manifest, "store/" + "ab" * 20 + ".png") == "store/" + "ab" * 20 + ".png"
+    assert resolve(manifest, "missing.json") is None
+
+
+def test_rebuild_skips_twins_and_prunes_stale_ones(tmp_path):
+    populate(tmp_path)
+    write_manifest(tmp_path, build_manifest(tmp_path))
+    old_url = load_manifest(tmp_path)["assets"]["scenes/GEMCUT.json"]["url"]
+
+    again = build_manifest(tmp_path)
+    assert sorted(again["assets"]) == sorted(load_manifest(tmp_path)["assets"])
+    assert again["removed"] == 0
+
+    (tmp_path / "scenes" / "GEMCUT.json").write_text('{"a": 2}')
+    changed = build_manifest(tmp_path)
+    assert changed["removed"] == 1
+    assert not (tmp_path / old_url).exists()
+    assert (tmp_path / changed["assets"]["scenes/GEMCUT.json"]["url"]).exists()
+
+
+def test_written_manifest_has_no_run_stats(tmp_path):
+    populate(tmp_path)
+    path = write_manifest(tmp_path, build_manifest(tmp_path))
+    assert path.name == MANIFEST_NAME
+    payload = json.loads(path.read_text())
+    assert set(payload) == {"version", "assets"}
+    assert set(payload["assets"]["scenes/GEMCUT.json"]) == {"url", "size", "hash"}
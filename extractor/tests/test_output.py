@@ -0,0 +1,57 @@
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from kyra.output import IMAGE_FORMATS, encode_image_file, write_image
+from kyra.palette import expand_rgba, palette_from_bytes
+from kyra.synth import synth_image, synth_palette
+
+
+@pytest.fixture
+def image():
+    rng = random.Random(2)
+    return 64, 40, bytes(synth_image(rng, 64, 40)), palette_from_bytes(synth_palette(rng))
+
+
+def test_raw_is_the_index_bytes(image):
+    width, height, pixels, palette = image
+    assert encode_image_file("raw", width, height, pixels, palette) == pixels
+
+
+def test_png_applies_palette_and_transparency(image):
+    width, height, pixels, palette = image
+    data = encode_image_file("png", width, height, pixels, palette, transparent_index=0)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.mode == "RGBA"
+        assert img.tobytes() == bytes(expand_rgba(pixels, palette, 0))
+
+
+def test_indexed_png_keeps_indices_and_palette(image):
+    width, height, pixels, palette = image
+    data = encode_image_file("indexed-png", width, height, pixels, palette, transparent_index=0, level=9)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.mode == "P"
+        assert img.tobytes() == pixels
+        assert img.getpalette()[:768] == palette.padded()[:768]
+        assert img.info["transparency"] == 0
+
+
+def test_webp_is_lossless(image):
+    if "WEBP" not in Image.SAVE:
+        pytest.skip("Pillow built without WebP")
+    width, height, pixels, palette = image
+    data = encode_image_file("webp", width, height, pixels, palette, level=0)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.convert("RGBA").tobytes() == bytes(expand_rgba(pixels, palette))
+
+
+def test_write_image_uses_format_suffix(tmp_path, image):
+    width, height, pixels, palette = image
+    for name, fmt in IMAGE_FORMATS.items():
+        if name == "webp" and "WEBP" not in Image.SAVE:
+            continue
+        dst = tmp_path / f"out{fmt.suffix}"
+        size = write_image(name, dst, width, height, pixels, palette)
+        assert dst.stat().st_size == size
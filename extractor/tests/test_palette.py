@@ -0,0 +1,44 @@
+import os
+
+from kyra.palette import EMPTY_PALETTE, clear_palettes, expand_rgba, load_palette, palette_from_bytes
+
+
+def naive_rgba(pixels, rgb, transparent_index=None):
+    out = bytearray()
+    for index in pixels:
+        out += rgb[index * 3:index * 3 + 3] + bytes([0 if index == transparent_index else 255])
+    return out
+
+
+def test_six_bit_values_are_widened_and_8_bit_kept():
+    raw = bytes([63, 0, 1] + [64, 200, 255] + [0, 0, 0] * 254)
+    palette = palette_from_bytes(raw)
+    assert palette.rgb[:6] == bytes([252, 0, 4, 64, 200, 255])
+
+
+def test_expand_matches_per_pixel_lookup():
+    raw = bytes((i * 7) % 64 for i in range(768))
+    palette = palette_from_bytes(raw)
+    pixels = bytes(range(256)) * 3
+    assert palette.expand_rgba(pixels) == naive_rgba(pixels, palette.rgb)
+    assert expand_rgba(pixels, palette, 5) == naive_rgba(pixels, palette.rgb, 5)
+    # Out-of-range transparent indices are ignored
+    assert expand_rgba(pixels, palette, 300) == naive_rgba(pixels, palette.rgb)
+    assert expand_rgba(b"\x01\x02", None) == bytearray(b"\x00\x00\x00\xff" * 2)
+    assert EMPTY_PALETTE.rgba_table()[:4] == b"\x00\x00\x00\xff"
+
+
+def test_registry_shares_palettes(tmp_path):
+    clear_palettes()
+    raw = bytes(range(64)) * 12
+    assert palette_from_bytes(raw) is palette_from_bytes(bytearray(raw))
+    path = tmp_path / "PALETTE.COL"
+    path.write_bytes(raw)
+    first = load_palette(path)
+    assert load_palette(path) is first
+    assert first is palette_from_bytes(raw)
+    # A changed file is picked up through its size/mtime key
+    path.write_bytes(bytes(768))
+    os.utime(path, ns=(1, 1))
+    assert load_palette(path).rgb == bytes(768)
+    assert load_palette(None) is None
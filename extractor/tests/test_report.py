@@ -0,0 +1,99 @@
+import base64
+import json
+import struct
+
+from kyra.manifest import build_manifest, write_manifest
+from kyra.report import build_report, classify, compare, format_report, match_source, scene_names
+
+
+def cps(pixels_size=64000, compressed=b"\x80" * 50, palette=b""):
+    body = struct.pack("<HIH", 4, pixels_size, len(palette)) + palette + compressed
+    return struct.pack("<H", len(body)) + body
+
+
+def populate(root):
+    files = {
+        "scenes/dat/GEMCUT.json": json.dumps({"format": "kyra-scene-meta", "spriteDefs": []}),
+        "scenes/cps/GEMCUT.json": json.dumps({"format": "kyra-cps", "pixels": [0] * 500}),
+        "scenes/cps/GEMCUT.png": "png",
+        "scenes/cps/GEMCUT_indexed.png": "png",
+        "masks/GEMCUT.json": json.dumps({"format": "kyra-msc", "rawBase64": base64.b64encode(cps(46080)).decode("ascii")}),
+        "scenes/wsa/DRAGON/0000.png": "frame",
+        "scenes/wsa/DRAGON/0001.png": "frame",
+        "scenes/wsa/DRAGON/frames.json": "{}",
+        "intro/frames/westwood/0000.png": "frame",
+        "palettes/MAIN.json": "[]"
+    }
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return files
+
+
+def test_classify_folds_scenes_and_frame_folders(tmp_path):
+    populate(tmp_path)
+    scenes = scene_names(tmp_path)
+    assert scenes == {"GEMCUT"}
+    cache = {}
+    assert classify(tmp_path, "scenes/wsa/DRAGON/0001.png", scenes, set(), cache) == ("scenes/wsa/*", "DRAGON")
+    assert classify(tmp_path, "scenes/cps/GEMCUT.png", scenes, set(), cache) == ("scenes/cps", "GEMCUT")
+    assert classify(tmp_path, "intro/frames/westwood/0000.png", scenes, set(), cache) == ("intro/frames/*", "westwood")
+    assert classify(tmp_path, "palettes/MAIN.json", scenes, set(), cache) == ("palettes", "-")
+
+
+def test_manifest_twins_keep_frame_folders(tmp_path):
+    populate(tmp_path)
+    write_manifest(tmp_path, build_manifest(tmp_path))
+    assert scene_names(tmp_path) == {"GEMCUT"}
+    report = build_report(tmp_path)
+    classes = {f["path"]: f["class"] for f in report["files"]}
+    assert classes["scenes/wsa/DRAGON/0000.png"] == "scenes/wsa/*"
+    assert classes["intro/frames/westwood/0000.png"] == "intro/frames/*"
+    # Twins are the same bytes again and are not counted
+    assert report["total"]["files"] == len(populate(tmp_path))
+
+
+def test_match_source_by_stem(tmp_path):
+    sources = {"GEMCUT.CPS": {"source": "GEMCUT.CPS"}, "GEMCUT.MSC": {"source": "GEMCUT.MSC"}, "ORB.CPS": {"source": "ORB.CPS"}}
+    assert match_source("scenes/cps/GEMCUT.png", None, sources)["source"] == "GEMCUT.CPS"
+    assert match_source("scenes/cps/GEMCUT_indexed.png", None, sources)["source"] == "GEMCUT.CPS"
+    assert match_source("scenes/cps/GEMCUT.bin", None, sources)["source"] == "GEMCUT.CPS"
+    assert match_source("masks/GEMCUT.png", None, sources)["source"] == "GEMCUT.MSC"
+    assert match_source("scenes/cps/GEMCUT.json", {"format": "kyra-cps"}, sources)["source"] == "GEMCUT.CPS"
+    assert match_source("masks/GEMCUT.json", {"format": "kyra-msc"}, sources)["source"] == "GEMCUT.MSC"
+    # Scene metadata shares the stem but is not decoded from the CPS
+    assert match_source("scenes/dat/GEMCUT.json", {"format": "kyra-scene-meta"}, sources) is None
+    assert match_source("scenes/cps/OTHER.png", None, sources) is None
+
+
+def test_report_source_compression(tmp_path):
+    root = tmp_path / "assets"
+    populate(root)
+    src = tmp_path / "game"
+    src.mkdir()
+    (src / "GEMCUT.CPS").write_bytes(cps())
+    report = build_report(root, [src])
+    by_path = {f["path"]: f for f in report["files"]}
+    for rel in ("scenes/cps/GEMCUT.json", "scenes/cps/GEMCUT.png", "scenes/cps/GEMCUT_indexed.png"):
+        assert by_path[rel]["source"]["source"] == "GEMCUT.CPS"
+    # The mask JSON falls back to the MSC embedded as rawBase64
+    assert by_path["masks/GEMCUT.json"]["source"]["imgSize"] == 46080
+    assert "source" not in by_path["scenes/dat/GEMCUT.json"]
+    sc = report["sourceCompression"]
+    assert sc["sources"] == 2 and sc["files"] == 4
+    assert sc["imgSize"] == 64000 + 46080
+    assert "source compression: 2 CPS/MSC" in format_report(report)
+
+
+def test_compare_thresholds():
+    def report(total, classes):
+        return {"total": {"bytes": total, "gzip": total}, "byClass": {k: {"bytes": v, "gzip": v} for k, v in classes.items()}}
+
+    base = report(100000, {"scenes/cps": 90000, "fonts": 500})
+    assert compare(report(103000, {"scenes/cps": 93000, "fonts": 900}), base, threshold=5.0) == []
+    grown = compare(report(120000, {"scenes/cps": 110000, "fonts": 500}), base, threshold=5.0)
+    assert grown[0] == "total bytes: 100000 -> 120000 bytes (+20.0%)"
+    assert any(r.startswith("class scenes/cps bytes") for r in grown)
+    new = compare(report(102000, {"scenes/cps": 90000, "fonts": 500, "bundles": 2000}), base, threshold=5.0)
+    assert new == ["class bundles (new) bytes: 0 -> 2000 bytes", "class bundles (new) gzip: 0 -> 2000 bytes"]
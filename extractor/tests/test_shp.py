@@ -0,0 +1,47 @@
+import random
+import struct
+
+import pytest
+
+from kyra.encoders import encode_frame2
+from kyra.shp import SHAPE_FLAG_COLOR_TABLE, SHAPE_HEADER, build_shape_table, decode_shape, parse_shape_table, read_shp
+from kyra.synth import synth_shapes
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_shape_table_round_trip(tmp_path, compress):
+    shapes = synth_shapes(random.Random(6), 5)
+    slots = shapes[:2] + [None] + shapes[2:] + [(3, 1, b"\x00\x00\x00")]
+    path = tmp_path / "CHAR.SHP"
+    path.write_bytes(build_shape_table(slots, compress=compress))
+    decoded = read_shp(path)
+    assert decoded[2] is None
+    for want, got in zip(slots, decoded):
+        if want is not None:
+            assert (got["width"], got["height"], got["pixels"]) == want
+
+
+def test_u16_offset_table():
+    width, height, pixels = synth_shapes(random.Random(1), 1, 8, 8)[0]
+    shape = build_shape_table([(width, height, pixels)])[6:]
+    # Older files: u16 count, u16 offsets relative to byte 2
+    data = struct.pack("<HH", 1, 2) + shape
+    assert parse_shape_table(data) == [4]
+    assert decode_shape(data, 4)["pixels"] == pixels
+
+
+def test_colour_table_lookup():
+    pixels = bytes([0, 1, 2, 15, 1, 0])
+    table = bytes([0, 0x40, 0x41] + list(range(0x50, 0x5D)))
+    payload = encode_frame2(pixels)
+    header = SHAPE_HEADER.pack(SHAPE_FLAG_COLOR_TABLE | 2, 2, 3, 2, SHAPE_HEADER.size + 16 + len(payload), len(payload))
+    data = struct.pack("<HI", 1, 4) + header + table + payload
+    decoded = decode_shape(data, parse_shape_table(data)[0])
+    assert decoded["pixels"] == bytes([0, 0x40, 0x41, 0x5C, 0x40, 0])
+
+
+def test_corrupt_table_is_rejected():
+    with pytest.raises(ValueError):
+        parse_shape_table(b"\x01")
+    with pytest.raises(ValueError):
+        parse_shape_table(struct.pack("<HI", 1, 5000) + bytes(20))
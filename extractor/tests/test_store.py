@@ -0,0 +1,102 @@
+import json
+import random
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from kyra.cache import BuildCache, run_cached
+from kyra.store import ContentStore, format_stats, frame_digest, merge_stats
+from kyra.synth import build_wsa, synth_frames
+from kyra.wsa import decode_wsa_frames, stored_frames
+
+EXTRACTOR = Path(__file__).resolve().parent.parent
+
+
+def test_put_encodes_each_digest_once(tmp_path):
+    store = ContentStore(tmp_path / "store")
+    calls = []
+
+    def encode():
+        calls.append(1)
+        return b"png bytes"
+
+    first = store.put("abc", ".png", encode)
+    second = store.put("abc", ".png", encode)
+    assert first == second == tmp_path / "store" / "abc.png"
+    assert len(calls) == 1
+    assert store.stats() == {"encoded": 1, "reused": 1, "bytesWritten": 9, "bytesSaved": 9}
+    assert merge_stats(store.stats(), store.stats())["reused"] == 2
+    assert "1 encoded, 1 reused" in format_stats(store.stats())
+
+
+def test_digest_covers_encoder_settings():
+    base = frame_digest(2, 2, b"\x01\x02\x03\x04", None, "png", 0, None)
+    assert base != frame_digest(2, 2, b"\x01\x02\x03\x04", None, "png", 1, None)
+    assert base != frame_digest(2, 2, b"\x01\x02\x03\x04", None, "webp", 0, None)
+    assert base != frame_digest(4, 1, b"\x01\x02\x03\x04", None, "png", 0, None)
+
+
+def write_looping_wsa(path):
+    frames = synth_frames(random.Random(5), 32, 24, 3)
+    # A loop: the last two frames repeat the first two
+    path.write_bytes(build_wsa(frames + frames[:2], 32, 24))
+
+
+def test_stored_frames_are_shared_and_listed(tmp_path):
+    src = tmp_path / "LOOP.WSA"
+    write_looping_wsa(src)
+    store = ContentStore(tmp_path / "store")
+    out = tmp_path / "out" / "loop"
+    decode_wsa_frames(src, None, out, 0, store=store)
+    frames = json.loads((out / "frames.json").read_text())["frames"]
+    assert [f["hash"] for f in frames[3:]] == [f["hash"] for f in frames[:2]]
+    assert store.stats()["encoded"] == 3 and store.stats()["reused"] == 2
+    assert stored_frames(out) == sorted(p.resolve() for p in (tmp_path / "store").iterdir())
+    assert stored_frames(tmp_path / "missing") == []
+
+
+def test_cache_hit_restores_store_objects(tmp_path):
+    src = tmp_path / "LOOP.WSA"
+    write_looping_wsa(src)
+    out = tmp_path / "out" / "loop"
+    store_dir = tmp_path / "store"
+    cache = BuildCache(tmp_path / "cache")
+    calls = []
+
+    def build():
+        calls.append(1)
+        decode_wsa_frames(src, None, out, 0, store=ContentStore(store_dir))
+
+    def run():
+        return run_cached(cache, __file__, [src], {"store": str(store_dir)}, [out], build, lambda: stored_frames(out))
+
+    assert run() is False
+    objects = {p.name: p.read_bytes() for p in store_dir.iterdir()}
+    shutil.rmtree(store_dir)
+    shutil.rmtree(out)
+    assert run() is True
+    assert len(calls) == 1
+    assert {p.name: p.read_bytes() for p in store_dir.iterdir()} == objects
+    for frame in json.loads((out / "frames.json").read_text())["frames"]:
+        assert (out / frame["file"]).is_file()
+
+
+def test_batch_cli_cache_hit_restores_store_objects(tmp_path):
+    src = tmp_path / "wsa"
+    src.mkdir()
+    write_looping_wsa(src / "LOOP.WSA")
+    out = tmp_path / "out"
+    store_dir = tmp_path / "store"
+    cmd = [sys.executable, str(EXTRACTOR / "wsa_to_png.py"), str(src), str(out), "--store", str(store_dir), "--cache", str(tmp_path / "cache"), "-j", "1"]
+
+    first = subprocess.run(cmd, capture_output=True, text=True)
+    assert first.returncode == 0, first.stderr
+    assert "1 converted" in first.stdout
+    objects = sorted(p.name for p in store_dir.iterdir())
+    shutil.rmtree(store_dir)
+
+    second = subprocess.run(cmd, capture_output=True, text=True)
+    assert second.returncode == 0, second.stderr
+    assert "0 converted, 1 up to date" in second.stdout
+    assert sorted(p.name for p in store_dir.iterdir()) == objects
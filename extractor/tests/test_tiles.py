@@ -0,0 +1,59 @@
+import random
+
+from kyra.pixels import crop
+from kyra.synth import build_wsa, synth_frames
+from kyra.tiles import Tileset, split_tiles
+from kyra.wsa import iter_wsa_frames
+
+
+def rebuild(tileset, name):
+    # Reassemble an image from its tile map to check the map is lossless
+    info = tileset.maps[name]
+    size = tileset.size
+    out = bytearray(info["cols"] * size * info["rows"] * size)
+    stride = info["cols"] * size
+    for n, tile in enumerate(info["map"]):
+        tx, ty = n % info["cols"], n // info["cols"]
+        for row in range(size):
+            start = (ty * size + row) * stride + tx * size
+            out[start:start + size] = tileset.tiles[tile][row * size:(row + 1) * size]
+    return crop(bytes(out), stride, info["rows"] * size, 0, 0, info["width"], info["height"])
+
+
+def test_split_tiles_pads_edges():
+    pixels = bytes(range(1, 13 * 10 + 1))
+    tiles = split_tiles(pixels, 13, 10, size=8, fill=0xFF)
+    assert len(tiles) == 4
+    assert all(len(tile) == 64 for tile in tiles)
+    assert tiles[1][:5] == pixels[8:13] and tiles[1][5:8] == b"\xff\xff\xff"
+    assert tiles[3][16:] == b"\xff" * 48
+
+
+def test_tileset_dedups_and_round_trips():
+    rng = random.Random(9)
+    frames = synth_frames(rng, 40, 24, 4)
+    tileset = Tileset(size=8)
+    for i, frame in enumerate(frames):
+        tileset.add_image(f"F{i}", 40, 24, bytes(frame))
+    tileset.add_image("copy", 40, 24, bytes(frames[0]))
+    for i, frame in enumerate(frames):
+        assert rebuild(tileset, f"F{i}") == bytes(frame)
+    assert tileset.maps["copy"]["map"] == tileset.maps["F0"]["map"]
+    stats = tileset.stats()
+    assert stats["tiles"] == 5 * 15 and stats["uniqueTiles"] == len(set(tileset.tiles))
+    assert stats["dedupRatio"] > 1
+
+
+def test_sheet_places_tiles_by_index():
+    tileset = Tileset(size=2)
+    tileset.add_image("a", 6, 2, bytes([1, 1, 2, 2, 1, 1, 1, 1, 2, 2, 1, 1]))
+    assert tileset.maps["a"]["map"] == [0, 1, 0]
+    width, height, pixels = tileset.sheet(columns=1)
+    assert (width, height) == (2, 4)
+    assert pixels == bytes([1, 1, 1, 1, 2, 2, 2, 2])
+
+
+def test_iter_wsa_frames_matches_source():
+    frames = synth_frames(random.Random(3), 24, 16, 3)
+    decoded = [(i, w, h, bytes(f)) for i, w, h, f in iter_wsa_frames(build_wsa(frames, 24, 16))]
+    assert decoded == [(i, 24, 16, bytes(f)) for i, f in enumerate(frames)]
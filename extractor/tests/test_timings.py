@@ -0,0 +1,71 @@
+import argparse
+
+import pytest
+
+from kyra import timings
+from kyra.output import write_json_file
+
+
+@pytest.fixture
+def trace(tmp_path, monkeypatch):
+    # start_timings sets module globals and environment variables; register
+    # both with monkeypatch so they are restored after the test
+    monkeypatch.setattr(timings, "_trace", None)
+    monkeypatch.setattr(timings, "_tool", "")
+    monkeypatch.setenv(timings.TIMINGS_ENV, "")
+    monkeypatch.setenv(f"{timings.TIMINGS_ENV}_TOOL", "")
+    path = tmp_path / "trace" / "t.jsonl"
+    timings.start_timings(str(path), "test_tool")
+    return path
+
+
+def test_stage_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(timings, "_trace", None)
+    assert not timings.enabled()
+    with timings.stage("read", "a", 10) as st:
+        st["bytesOut"] = 5
+    assert st == {"bytesIn": 10, "bytesOut": 5}
+
+
+def test_stage_appends_entries(trace):
+    with timings.stage("read", "A.CPS", 100) as st:
+        st["bytesOut"] = 64000
+    with timings.stage("write", "A.CPS") as st:
+        st["bytesIn"] = 7
+    entries = timings.load_trace(str(trace))
+    assert [(e["tool"], e["asset"], e["stage"]) for e in entries] == [("test_tool", "A.CPS", "read"), ("test_tool", "A.CPS", "write")]
+    assert entries[0]["bytesIn"] == 100 and entries[0]["bytesOut"] == 64000
+    assert entries[1]["bytesIn"] == 7
+    assert all(e["wall"] >= 0 and e["cpu"] >= 0 for e in entries)
+
+
+def test_stage_records_on_exception(trace):
+    with pytest.raises(RuntimeError):
+        with timings.stage("parse", "B.WSA"):
+            raise RuntimeError("boom")
+    assert [e["stage"] for e in timings.load_trace(str(trace))] == ["parse"]
+
+
+def test_summarize_orders_known_stages_first():
+    entries = [
+        {"stage": name, "wall": 1.0, "cpu": 0.5, "bytesIn": 1, "bytesOut": 2}
+        for name in ("zz", "write", "read", "write")
+    ]
+    summary = timings.summarize(entries)
+    assert list(summary) == ["read", "write", "zz"]
+    assert summary["write"] == {"count": 2, "wall": 2.0, "cpu": 1.0, "bytesIn": 2, "bytesOut": 4}
+
+
+def test_output_helpers_emit_json_and_write_stages(trace, tmp_path):
+    write_json_file(tmp_path / "out" / "x.json", {"a": 1}, "X")
+    stages = [e["stage"] for e in timings.load_trace(str(trace))]
+    assert stages == ["json", "write"]
+    assert (tmp_path / "out" / "x.json").read_text() == '{"a": 1}'
+
+
+def test_instrument_dumps_profile(tmp_path, capsys):
+    args = argparse.Namespace(timings=None, profile=str(tmp_path / "prof"))
+    with timings.instrument(args, "tool"):
+        sum(range(1000))
+    assert (tmp_path / "prof" / "tool.pstats").is_file()
+    assert "profile:" in capsys.readouterr().err
@@ -0,0 +1,76 @@
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from kyra.pixels import crop, trim_bounds
+from kyra.synth import build_wsa
+from kyra.wsa import decode_wsa_frames
+
+EXTRACTOR = Path(__file__).resolve().parent.parent
+
+
+def boxed(width, height, box, value=7):
+    x, y, w, h = box
+    pixels = bytearray(width * height)
+    for row in range(y, y + h):
+        pixels[row * width + x:row * width + x + w] = bytes([value]) * w
+    return bytes(pixels)
+
+
+def test_trim_bounds_finds_opaque_box():
+    pixels = boxed(20, 10, (3, 2, 5, 4))
+    assert trim_bounds(pixels, 20, 10, 0) == (3, 2, 5, 4)
+    assert trim_bounds(bytes(200), 20, 10, 0) is None
+    # With a different key colour the zero background is opaque
+    assert trim_bounds(pixels, 20, 10, 7) == (0, 0, 20, 10)
+
+
+def test_crop_clamps_to_image():
+    pixels = bytes(range(12))
+    assert crop(pixels, 4, 3, 1, 1, 2, 2) == bytes([5, 6, 9, 10])
+    assert crop(pixels, 4, 3, 3, 2, 5, 5) == bytes([11])
+    assert crop(pixels, 4, 3, 5, 0, 2, 2) == b""
+
+
+def test_trimmed_wsa_frames_and_sidecar(tmp_path):
+    frames = [boxed(32, 16, (4, 3, 6, 5)), bytes(32 * 16), boxed(32, 16, (0, 0, 32, 16), 9)]
+    src = tmp_path / "T.WSA"
+    src.write_bytes(build_wsa(frames, 32, 16))
+    out = tmp_path / "out"
+    decode_wsa_frames(src, None, out, 0, trim=True)
+    meta = json.loads((out / "frames.json").read_text())
+    assert (meta["width"], meta["height"]) == (32, 16)
+    assert meta["frames"] == [
+        {"index": 0, "file": "0000.png", "x": 4, "y": 3, "w": 6, "h": 5},
+        {"index": 1, "file": None, "x": 0, "y": 0, "w": 0, "h": 0},
+        {"index": 2, "file": "0002.png", "x": 0, "y": 0, "w": 32, "h": 16}
+    ]
+    with Image.open(out / "0000.png") as img:
+        assert img.size == (6, 5)
+    assert not (out / "0001.png").exists()
+
+
+@pytest.mark.parametrize("index", [None, -1, 256])
+def test_trim_rejects_invalid_transparent_index(tmp_path, index):
+    src = tmp_path / "T.WSA"
+    src.write_bytes(build_wsa([boxed(8, 8, (1, 1, 2, 2))], 8, 8))
+    with pytest.raises(ValueError, match="0..255"):
+        decode_wsa_frames(src, None, tmp_path / "out", index, trim=True)
+    assert not (tmp_path / "out").exists()
+
+
+def test_cli_reports_invalid_transparent_index(tmp_path):
+    src = tmp_path / "T.WSA"
+    src.write_bytes(build_wsa([boxed(8, 8, (1, 1, 2, 2))], 8, 8))
+    for script, flags in (
+        ("wsa_to_png.py", [str(src), str(tmp_path / "out"), "--trim", "--transparent-index", "-1"]),
+        ("kyra_extract.py", [str(tmp_path), "--out", str(tmp_path / "site"), "--trim-frames", "--transparent-index", "300"])
+    ):
+        result = subprocess.run([sys.executable, str(EXTRACTOR / script), *flags], capture_output=True, text=True)
+        assert result.returncode == 2
+        assert "0..255" in result.stderr
@@ -0,0 +1,49 @@
+import os
+import threading
+
+from kyra.watch import DirWatcher, snapshot
+
+
+def touch(path, data, mtime_ns):
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_snapshot_filters_and_skips_directories(tmp_path):
+    touch(tmp_path / "A.CPS", b"12", 1_000_000_000)
+    touch(tmp_path / "notes.txt", b"x", 1_000_000_000)
+    (tmp_path / "sub.CPS").mkdir()
+    state = snapshot(tmp_path, lambda p: p.suffix == ".CPS")
+    assert state == {tmp_path / "A.CPS": (1_000_000_000, 2)}
+
+
+def test_wait_reports_changes_and_removals(tmp_path):
+    touch(tmp_path / "A.CPS", b"1", 1_000_000_000)
+    touch(tmp_path / "B.WSA", b"1", 1_000_000_000)
+    watcher = DirWatcher(tmp_path, poll=0.01, debounce=0.02)
+
+    touch(tmp_path / "A.CPS", b"22", 2_000_000_000)
+    (tmp_path / "B.WSA").unlink()
+    touch(tmp_path / "C.PAK", b"3", 1_000_000_000)
+    changed, removed = watcher.wait()
+    assert changed == [tmp_path / "A.CPS", tmp_path / "C.PAK"]
+    assert removed == [tmp_path / "B.WSA"]
+    assert watcher.state == snapshot(tmp_path)
+
+
+def test_wait_debounces_a_burst_of_writes(tmp_path):
+    watcher = DirWatcher(tmp_path, poll=0.01, debounce=0.1)
+    target = tmp_path / "BIG.PAK"
+
+    def writer():
+        for i in range(5):
+            touch(target, bytes(i + 1), 1_000_000_000 + i)
+            threading.Event().wait(0.02)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    changed, removed = watcher.wait()
+    thread.join()
+    assert (changed, removed) == ([target], [])
+    # The burst settled before wait returned, so the final write is the state
+    assert watcher.state[target] == (1_000_000_004, 5)
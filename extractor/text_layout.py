@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List
+
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.emc import parse_emc_text_strings
+from kyra.layout import TALK_WIDTH, layout_strings, load_font_widths
+from kyra.output import write_json_file
+from kyra.timings import add_timing_arguments, instrument, stage
+
+
+def load_strings(path: Path) -> List[str]:
+    name = path.stem.upper()
+    with stage("read", name) as st:
+        data = path.read_bytes()
+        st["bytesOut"] = len(data)
+    if path.suffix.upper() == ".EMC":
+        return parse_emc_text_strings(data)
+    return json.loads(data.decode("utf-8"))["strings"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute line breaks and glyph positions for EMC text strings")
+    parser.add_argument("srcs", nargs="+", help=".EMC files or emc_text_to_json.py JSON files")
+    parser.add_argument("dst_dir", help="Output directory for <NAME>.layout.json")
+    parser.add_argument("--font", type=str, required=True, help=".FNT font or the JSON table from fnt_to_atlas.py")
+    parser.add_argument("--max-width", type=int, default=TALK_WIDTH, help="Talk box width in pixels")
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    font_path = Path(args.font)
+    dst_dir = Path(args.dst_dir)
+    cache = open_cache(args)
+    with instrument(args, "text_layout"):
+        for src in map(Path, args.srcs):
+            name = src.stem.upper()
+            dst = dst_dir / f"{name}.layout.json"
+
+            def build() -> None:
+                strings = load_strings(src)
+                widths, line_height = load_font_widths(font_path)
+                payload = layout_strings(strings, widths, line_height, args.max_width, src.name, font_path.stem.upper())
+                write_json_file(dst, payload, name)
+                lines = sum(len(entry["lines"]) for entry in payload["strings"])
+                print(f"Wrote {dst} ({len(strings)} strings, {lines} lines)")
+
+            if run_cached(cache, __file__, [src, font_path], {"maxWidth": args.max_width}, [dst], build):
+                print(f"Up to date: {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import List
+
+from kyra.cache import add_cache_arguments, open_cache, run_cached
+from kyra.cps import read_cps
+from kyra.frames import FRAMES_SUFFIX, is_frames_file, open_frames
+from kyra.output import IMAGE_FORMATS
+from kyra.palette import load_palette
+from kyra.tiles import TILE_SIZE, Tileset, write_tileset
+from kyra.timings import add_timing_arguments, instrument, stage
+from kyra.wsa import iter_wsa_frames
+
+
+def collect_inputs(srcs: List[str]) -> List[Path]:
+    paths: List[Path] = []
+    for src in srcs:
+        path = Path(src)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.iterdir() if p.suffix.upper() in (".CPS", ".WSA") or is_frames_file(p)))
+        else:
+            paths.append(path)
+    return paths
+
+
+def add_file(tileset: Tileset, path: Path) -> None:
+    name = path.stem.upper()
+    if path.suffix.upper() == ".CPS":
+        image = read_cps(path, None, None, None)
+        tileset.add_image(name, image["width"], image["height"], image["pixels"])
+        return
+    if is_frames_file(path):
+        with open_frames(path) as frames:
+            for index, width, height, frame in frames:
+                tileset.add_image(f"{name}/{index:04d}", width, height, frame)
+        return
+    with stage("read", name) as st:
+        data = path.read_bytes()
+        st["bytesOut"] = len(data)
+    for index, width, height, frame in iter_wsa_frames(data, name):
+        tileset.add_image(f"{name}/{index:04d}", width, height, bytes(frame))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Split CPS images and WSA frames into deduplicated tiles with per-image tile maps")
+    parser.add_argument("srcs", nargs="+", help=f".CPS/.WSA/{FRAMES_SUFFIX} files or directories with them")
+    parser.add_argument("dst_dir", help="Output directory for the tileset and tilemaps.json")
+    parser.add_argument("--palette", type=str, default=None, help="Optional .COL palette for the tileset image")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="Tile edge in pixels")
+    parser.add_argument("--columns", type=int, default=32, help="Tiles per row in the tileset image")
+    parser.add_argument("--format", choices=list(IMAGE_FORMATS), default="indexed-png", help="Tileset image backend")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=None, metavar="0-9", help="PNG zlib level / WebP effort (default: encoder default)")
+    add_cache_arguments(parser)
+    add_timing_arguments(parser)
+    args = parser.parse_args()
+
+    paths = collect_inputs(args.srcs)
+    if not paths:
+        parser.error(f"No .CPS, .WSA or {FRAMES_SUFFIX} inputs found")
+    dst_dir = Path(args.dst_dir)
+    palette_path = Path(args.palette) if args.palette else None
+    stats = {}
+
+    def build() -> None:
+        tileset = Tileset(args.tile_size)
+        for path in paths:
+            add_file(tileset, path)
+        write_tileset(tileset, dst_dir, load_palette(palette_path), args.format, args.columns, args.compress_level)
+        stats.update(tileset.stats())
+
+    inputs = paths + ([palette_path] if palette_path else [])
+    options = {"tileSize": args.tile_size, "columns": args.columns, "format": args.format, "level": args.compress_level}
+    out_paths = [dst_dir / f"tiles{IMAGE_FORMATS[args.format].suffix}", dst_dir / "tilemaps.json"]
+    with instrument(args, "tile_dedup"):
+        if run_cached(open_cache(args), __file__, inputs, options, out_paths, build):
+            print(f"Up to date: {dst_dir}")
+            return
+
+    print(
+        f"{stats['images']} images, {stats['tiles']} tiles -> {stats['uniqueTiles']} unique "
+        f"(dedup {stats['dedupRatio']:.2f}x, {stats['pixelBytes']} -> {stats['packedBytes']} bytes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+// Reader for .kbnd bundles written by extractor/asset_bundle.py: a 20-byte
+// header, a TOC of 24-byte entries plus a name table, then aligned data.
+// Everything is fetched with HTTP Range requests.
+
+export type AssetBundleEntry = {
+  offset: number;
+  length: number;
+  type: number;
+  hash: string;
+};
+
+export type AssetBundle = {
+  url: string;
+  entries: Map<string, AssetBundleEntry>;
+  read: (name: string) => Promise<ArrayBuffer>;
+  readMany: (names: string[]) => Promise<Map<string, ArrayBuffer>>;
+};
+
+const HEADER_SIZE = 20;
+const ENTRY_SIZE = 24;
+const TOC_GUESS = 16384;
+
+async function fetchRange(url: string, first: number, last: number): Promise<ArrayBuffer> {
+  const res = await fetch(url, { headers: { Range: `bytes=${first}-${last}` } });
+  if (!res.ok) {
+    throw new Error(`Failed to load bundle range ${first}-${last}: ${url}`);
+  }
+  const buffer = await res.arrayBuffer();
+  // A server without range support answers 200 with the whole file
+  return res.status === 206 ? buffer : buffer.slice(first, last + 1);
+}
+
+function parseToc(buffer: ArrayBuffer, url: string): Map<string, AssetBundleEntry> {
+  const view = new DataView(buffer);
+  const count = view.getUint32(8, true);
+  const namesStart = HEADER_SIZE + count * ENTRY_SIZE;
+  const decoder = new TextDecoder();
+  const entries = new Map<string, AssetBundleEntry>();
+  for (let i = 0; i < count; i++) {
+    const pos = HEADER_SIZE + i * ENTRY_SIZE;
+    const nameOffset = view.getUint32(pos + 8, true);
+    const nameLength = view.getUint16(pos + 12, true);
+    const name = decoder.decode(new Uint8Array(buffer, namesStart + nameOffset, nameLength));
+    const hash = Array.from(new Uint8Array(buffer, pos + 16, 8), (b) => b.toString(16).padStart(2, "0")).join("");
+    entries.set(name, {
+      offset: view.getUint32(pos, true),
+      length: view.getUint32(pos + 4, true),
+      type: view.getUint16(pos + 14, true),
+      hash
+    });
+  }
+  if (entries.size !== count) {
+    throw new Error(`Bundle TOC has duplicate names: ${url}`);
+  }
+  return entries;
+}
+
+export async function openAssetBundle(url: string): Promise<AssetBundle> {
+  let head = await fetchRange(url, 0, TOC_GUESS - 1);
+  const view = new DataView(head);
+  if (head.byteLength < HEADER_SIZE || String.fromCharCode(...new Uint8Array(head, 0, 4)) !== "KBND") {
+    throw new Error(`Not an asset bundle: ${url}`);
+  }
+  const tocEnd = HEADER_SIZE + view.getUint32(12, true);
+  if (head.byteLength < tocEnd) {
+    const rest = await fetchRange(url, head.byteLength, tocEnd - 1);
+    const joined = new Uint8Array(tocEnd);
+    joined.set(new Uint8Array(head), 0);
+    joined.set(new Uint8Array(rest), head.byteLength);
+    head = joined.buffer;
+  }
+  const entries = parseToc(head, url);
+
+  const entryFor = (name: string) => {
+    const entry = entries.get(name);
+    if (!entry) {
+      throw new Error(`Bundle has no entry ${name}: ${url}`);
+    }
+    return entry;
+  };
+
+  // Entries are stored in path order, so a scene or the intro is one
+  // contiguous run and readMany needs one request for it
+  const readMany = async (names: string[]) => {
+    const out = new Map<string, ArrayBuffer>();
+    const wanted: (readonly [string, AssetBundleEntry])[] = [];
+    for (const name of names) {
+      const entry = entryFor(name);
+      if (entry.length === 0) {
+        out.set(name, new ArrayBuffer(0));
+      } else {
+        wanted.push([name, entry]);
+      }
+    }
+    wanted.sort((a, b) => a[1].offset - b[1].offset);
+    const runs: { first: number; last: number; items: (readonly [string, AssetBundleEntry])[] }[] = [];
+    for (const item of wanted) {
+      const [, entry] = item;
+      const run = runs[runs.length - 1];
+      if (run && entry.offset - run.last - 1 <= 64) {
+        run.last = Math.max(run.last, entry.offset + entry.length - 1);
+        run.items.push(item);
+      } else {
+        runs.push({ first: entry.offset, last: entry.offset + entry.length - 1, items: [item] });
+      }
+    }
+    await Promise.all(
+      runs.map(async (run) => {
+        const buffer = await fetchRange(url, run.first, run.last);
+        for (const [name, entry] of run.items) {
+          out.set(name, buffer.slice(entry.offset - run.first, entry.offset - run.first + entry.length));
+        }
+      })
+    );
+    return out;
+  };
+
+  return {
+    url,
+    entries,
+    read: async (name: string) => {
+      const entry = entryFor(name);
+      if (entry.length === 0) {
+        return new ArrayBuffer(0);
+      }
+      return fetchRange(url, entry.offset, entry.offset + entry.length - 1);
+    },
+    readMany
+  };
+}
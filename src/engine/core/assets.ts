@@ -1,4 +1,4 @@
-import type { MaskData, SceneEmc, SceneMeta, SceneShapesData } from "./types";
+import type { AssetManifest, BitmapFont, FadeTable, MaskData, SceneEmc, SceneMeta, SceneShapesData, TextLayout } from "./types";
 
 export function withBase(path: string): string {
   const base = import.meta.env.BASE_URL || "/";
@@ -6,17 +6,44 @@ export function withBase(path: string): string {
   return `${base}${clean}`;
 }
 
-export function loadImage(src: string): Promise<HTMLImageElement> {
+const ASSET_ROOT = "assets/";
+const MANIFEST_NAME = "asset-manifest.json";
+let manifestPromise: Promise<AssetManifest | null> | null = null;
+
+// The manifest is optional: without one (dev server, unhashed builds) every
+// asset loads under its logical name.
+export function loadAssetManifest(): Promise<AssetManifest | null> {
+  if (!manifestPromise) {
+    manifestPromise = fetch(withBase(ASSET_ROOT + MANIFEST_NAME))
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => (data && data.assets ? (data as AssetManifest) : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+export async function resolveAsset(src: string): Promise<string> {
+  const manifest = await loadAssetManifest();
+  const root = withBase(ASSET_ROOT);
+  if (!manifest || !src.startsWith(root)) {
+    return src;
+  }
+  const entry = manifest.assets[src.slice(root.length)];
+  return entry ? root + entry.url : src;
+}
+
+export async function loadImage(src: string): Promise<HTMLImageElement> {
+  const url = await resolveAsset(src);
   return new Promise((resolve, reject) => {
     const img = new Image();
     img.onload = () => resolve(img);
     img.onerror = () => reject(new Error(`Failed to load image: ${src}`));
-    img.src = src;
+    img.src = url;
   });
 }
 
 export async function loadMask(src: string): Promise<MaskData> {
-  const res = await fetch(src);
+  const res = await fetch(await resolveAsset(src));
   if (!res.ok) {
     throw new Error(`Failed to load mask: ${src}`);
   }
@@ -29,7 +56,7 @@ export async function loadMask(src: string): Promise<MaskData> {
 }
 
 export async function loadSceneMeta(src: string): Promise<SceneMeta> {
-  const res = await fetch(src);
+  const res = await fetch(await resolveAsset(src));
   if (!res.ok) {
     throw new Error(`Failed to load scene meta: ${src}`);
   }
@@ -45,7 +72,7 @@ export async function loadSceneMeta(src: string): Promise<SceneMeta> {
 }
 
 export async function loadSceneShapes(src: string): Promise<SceneShapesData> {
-  const res = await fetch(src);
+  const res = await fetch(await resolveAsset(src));
   if (!res.ok) {
     throw new Error(`Failed to load scene shapes: ${src}`);
   }
@@ -58,8 +85,62 @@ export async function loadSceneShapes(src: string): Promise<SceneShapesData> {
   };
 }
 
+export async function loadBitmapFont(src: string): Promise<BitmapFont> {
+  const res = await fetch(await resolveAsset(src));
+  if (!res.ok) {
+    throw new Error(`Failed to load font: ${src}`);
+  }
+  const data = await res.json();
+  const dir = src.slice(0, src.lastIndexOf("/") + 1);
+  return {
+    image: await loadImage(dir + String(data.image)),
+    height: Number(data.height) || 0,
+    glyphs: Array.isArray(data.glyphs) ? data.glyphs : []
+  };
+}
+
+export async function loadTextLayout(src: string): Promise<TextLayout> {
+  const res = await fetch(await resolveAsset(src));
+  if (!res.ok) {
+    throw new Error(`Failed to load text layout: ${src}`);
+  }
+  const data = await res.json();
+  return {
+    maxWidth: Number(data.maxWidth) || 0,
+    lineHeight: Number(data.lineHeight) || 0,
+    strings: Array.isArray(data.strings) ? data.strings : []
+  };
+}
+
+// Binary tables from palette_fades.py / kyra_extract.py --fade-steps
+export async function loadFadeTable(src: string): Promise<FadeTable> {
+  const res = await fetch(await resolveAsset(src));
+  if (!res.ok) {
+    throw new Error(`Failed to load fade table: ${src}`);
+  }
+  const buffer = await res.arrayBuffer();
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "KFAD") {
+    throw new Error(`Not a fade table: ${src}`);
+  }
+  const steps = view.getUint16(6, true);
+  const flags = view.getUint16(8, true);
+  const size = view.getUint16(10, true) * 3;
+  const blackOffset = view.getUint32(12, true);
+  const targetOffset = view.getUint32(16, true);
+  const block = (offset: number) =>
+    Array.from({ length: steps }, (_, i) => new Uint8Array(buffer, offset + i * size, size));
+  return {
+    steps,
+    base: new Uint8Array(buffer, blackOffset - size, size),
+    toBlack: block(blackOffset),
+    toTarget: flags & 1 ? block(targetOffset) : []
+  };
+}
+
 export async function loadSceneEmc(src: string): Promise<SceneEmc> {
-  const res = await fetch(src);
+  const res = await fetch(await resolveAsset(src));
   if (!res.ok) {
     throw new Error(`Failed to load scene emc: ${src}`);
   }
@@ -70,7 +151,7 @@ export async function loadSceneEmc(src: string): Promise<SceneEmc> {
 }
 
 export async function loadEmcTextStrings(src: string): Promise<string[]> {
-  const res = await fetch(src);
+  const res = await fetch(await resolveAsset(src));
   if (!res.ok) {
     throw new Error(`Failed to load emc text: ${src}`);
   }
@@ -79,7 +160,7 @@ export async function loadEmcTextStrings(src: string): Promise<string[]> {
 }
 
 export async function loadNpcTextJson(src: string): Promise<string[]> {
-  const res = await fetch(src);
+  const res = await fetch(await resolveAsset(src));
   if (!res.ok) {
     throw new Error(`Failed to load npc text: ${src}`);
   }
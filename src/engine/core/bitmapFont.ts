@@ -0,0 +1,81 @@
+import type { BitmapFont, TextLayoutEntry } from "./types";
+
+const WHITE = "#ffffff";
+const tintCache = new WeakMap<BitmapFont, Map<string, CanvasImageSource>>();
+
+export function measureBitmapText(font: BitmapFont, text: string): number {
+  let width = 0;
+  for (let i = 0; i < text.length; i++) {
+    width += font.glyphs[text.charCodeAt(i)]?.[2] ?? 0;
+  }
+  return width;
+}
+
+// The atlas is white; other colours are rendered once per font and cached.
+function tintedAtlas(font: BitmapFont, color: string): CanvasImageSource {
+  if (color === WHITE) return font.image;
+  let byColor = tintCache.get(font);
+  if (!byColor) {
+    byColor = new Map();
+    tintCache.set(font, byColor);
+  }
+  const cached = byColor.get(color);
+  if (cached) return cached;
+  const canvas = document.createElement("canvas");
+  canvas.width = font.image.width;
+  canvas.height = font.image.height;
+  const tctx = canvas.getContext("2d");
+  if (!tctx) throw new Error("Canvas 2D context not available");
+  tctx.drawImage(font.image, 0, 0);
+  tctx.globalCompositeOperation = "source-in";
+  tctx.fillStyle = color;
+  tctx.fillRect(0, 0, canvas.width, canvas.height);
+  byColor.set(color, canvas);
+  return canvas;
+}
+
+export function drawBitmapText(
+  ctx: CanvasRenderingContext2D,
+  font: BitmapFont,
+  text: string,
+  x: number,
+  y: number,
+  color = WHITE
+): number {
+  const atlas = tintedAtlas(font, color);
+  let penX = x;
+  for (let i = 0; i < text.length; i++) {
+    const glyph = font.glyphs[text.charCodeAt(i)];
+    if (!glyph) continue;
+    const [gx, gy, w] = glyph;
+    if (gx >= 0 && w > 0) {
+      ctx.drawImage(atlas, gx, gy, w, font.height, penX, y, w, font.height);
+    }
+    penX += w;
+  }
+  return penX - x;
+}
+
+// Draws a precomputed layout (text_layout.py): every line centred on
+// centerX, no measuring at draw time.
+export function drawTextLayout(
+  ctx: CanvasRenderingContext2D,
+  font: BitmapFont,
+  text: string,
+  layout: TextLayoutEntry,
+  centerX: number,
+  y: number,
+  lineHeight: number,
+  color = WHITE
+) {
+  const atlas = tintedAtlas(font, color);
+  layout.lines.forEach(([start, end, width], line) => {
+    const lineX = centerX - (width >> 1);
+    const lineY = y + line * lineHeight;
+    for (let i = start; i < end; i++) {
+      const glyph = font.glyphs[text.charCodeAt(i)];
+      if (!glyph || glyph[0] < 0 || glyph[2] <= 0) continue;
+      ctx.drawImage(atlas, glyph[0], glyph[1], glyph[2], font.height, lineX + layout.x[i], lineY, glyph[2], font.height);
+    }
+  });
+}
@@ -37,6 +37,46 @@ export type SceneMeta = {
   anims: SceneAnimDef[];
 };
 
+export type BitmapFont = {
+  image: HTMLImageElement;
+  height: number;
+  // [x, y, width] per character code, x = -1 when there is nothing to draw
+  glyphs: [number, number, number][];
+};
+
+export type TextLayoutEntry = {
+  // [start, end, width] per line, indices into the source string
+  lines: [number, number, number][];
+  // Pen x of every character relative to the start of its line
+  x: number[];
+};
+
+export type TextLayout = {
+  maxWidth: number;
+  lineHeight: number;
+  strings: TextLayoutEntry[];
+};
+
+export type FadeTable = {
+  steps: number;
+  base: Uint8Array;
+  // 8-bit RGB palettes for steps 1..N; the last one is black / the target
+  toBlack: Uint8Array[];
+  toTarget: Uint8Array[];
+};
+
+export type AssetManifestEntry = {
+  // Content-hashed path relative to the assets root
+  url: string;
+  size: number;
+  hash: string;
+};
+
+export type AssetManifest = {
+  version: number;
+  assets: Record<string, AssetManifestEntry>;
+};
+
 export type SceneShapesData = {
   width: number;
   height: number;